@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 
 # from dotenv import load_dotenv
 
@@ -104,6 +105,48 @@ DATABASES = {
 }
 
 
+# Caches
+# The package catalog is cached in two tiers: a small per-process LocMem
+# cache in front of a file-based cache shared by every gunicorn worker.
+# Expired entries are served for CATALOG_CACHE_STALE_TTL more seconds while
+# one request per process refreshes them.
+
+CATALOG_CACHE_DIR = os.getenv(
+    "CATALOG_CACHE_DIR", os.path.join(tempfile.gettempdir(), "adventurestay-catalog-cache")
+)
+CATALOG_CACHE_NEGATIVE_TTL = int(os.getenv("CATALOG_CACHE_NEGATIVE_TTL", "60"))
+CATALOG_CACHE_STALE_TTL = int(os.getenv("CATALOG_CACHE_STALE_TTL", "600"))
+CATALOG_CACHE_STALE_WHILE_REVALIDATE = os.getenv("CATALOG_CACHE_STALE_WHILE_REVALIDATE", "1") == "1"
+
+# Catalog version stamp (experiences.services.catalog_version): cached catalog
+# entries from an older version are dropped once a node re-reads the stamp.
+CATALOG_VERSION_CHECK_INTERVAL = float(os.getenv("CATALOG_VERSION_CHECK_INTERVAL", "3"))
+
+# Optional catalog snapshot (manage.py export_catalog_snapshot). When set,
+# workers serve package reads from this file and re-stat it at most every
+# CATALOG_SNAPSHOT_CHECK_INTERVAL seconds to pick up a newly exported one.
+CATALOG_SNAPSHOT_PATH = os.getenv("CATALOG_SNAPSHOT_PATH", "")
+CATALOG_SNAPSHOT_CHECK_INTERVAL = float(os.getenv("CATALOG_SNAPSHOT_CHECK_INTERVAL", "5"))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog_local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'adventurestay-catalog',
+        'TIMEOUT': int(os.getenv("CATALOG_CACHE_LOCAL_TTL", "30")),
+        'OPTIONS': {'MAX_ENTRIES': 256},
+    },
+    'catalog_shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CATALOG_CACHE_DIR,
+        'TIMEOUT': int(os.getenv("CATALOG_CACHE_TTL", "300")),
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -171,6 +214,19 @@ AWS_REGION = os.getenv(
 DDB_BOOKINGS_TABLE_NAME = os.getenv("DDB_BOOKINGS_TABLE_NAME", "adventurestay_bookings")
 DDB_PACKAGES_TABLE_NAME = os.getenv("DDB_PACKAGES_TABLE_NAME", "adventurestay_packages")
 
+# Shared boto3 client pool (see experiences.services.aws_clients).
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50"))
+AWS_CONNECT_TIMEOUT = float(os.getenv("AWS_CONNECT_TIMEOUT", "3"))
+AWS_READ_TIMEOUT = float(os.getenv("AWS_READ_TIMEOUT", "10"))
+
+# Shared per-night availability counters (experiences.services.availability_store).
+# Empty disables the store and leaves availability to the local database.
+DDB_AVAILABILITY_TABLE_NAME = os.getenv("DDB_AVAILABILITY_TABLE_NAME", "")
+DDB_AVAILABILITY_SHARDS = int(os.getenv("DDB_AVAILABILITY_SHARDS", "4"))
+
+# Parallel scan segments used when reading the whole packages table.
+DDB_SCAN_SEGMENTS = int(os.getenv("DDB_SCAN_SEGMENTS", "1"))
+
 # You can keep these empty or also give safe defaults if you want
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME", "")
 SQS_BOOKING_QUEUE_URL = os.getenv("SQS_BOOKING_QUEUE_URL", "")
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import AdventureBookingModel, AdventurePackageModel
+from .models import AdventureBookingModel, AdventurePackageModel, BookingOutboxEvent
 
 
 @admin.register(AdventurePackageModel)
@@ -20,6 +20,14 @@ class AdventureBookingAdmin(admin.ModelAdmin):
         "end_date",
         "num_guests",
         "status",
+        "capacity_conflict",
     )
-    list_filter = ("status", "package__category")
+    list_filter = ("status", "capacity_conflict", "package__category")
     search_fields = ("package__package_code",)
+
+
+@admin.register(BookingOutboxEvent)
+class BookingOutboxEventAdmin(admin.ModelAdmin):
+    list_display = ("booking", "kind", "status", "attempts", "next_attempt_at", "delivered_at")
+    list_filter = ("status", "kind")
+    search_fields = ("booking__package__package_code", "last_error")
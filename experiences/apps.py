@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ExperiencesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'experiences'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .services import catalog_snapshot
+
+        # Load the snapshot before gunicorn forks so workers share its pages.
+        catalog_snapshot.current()
@@ -16,6 +16,7 @@ from adventurestay_utils import (
 )
 
 from .models import AdventureBookingModel, AdventurePackageModel
+from .services import occupancy
 
 
 def to_domain_package(package_model: AdventurePackageModel) -> AdventurePackage:
@@ -54,6 +55,25 @@ def to_domain_booking(booking_model: AdventureBookingModel) -> AdventureBooking:
     )
 
 
+def occupancy_as_bookings(
+    package: AdventurePackage, start_date, end_date, guests_booked: int
+) -> list[AdventureBooking]:
+    """Represent ledger occupancy as a booking the domain checker understands."""
+
+    if not guests_booked:
+        return []
+    return [
+        AdventureBooking(
+            package=package,
+            start_date=start_date,
+            end_date=end_date,
+            num_guests=guests_booked,
+            nights=(end_date - start_date).days,
+            total_price=0.0,
+        )
+    ]
+
+
 class BookingForm(forms.Form):
     """Validates guest info plus date and guest selections for a package."""
 
@@ -100,7 +120,8 @@ class BookingForm(forms.Form):
             booking_request = PackageBookingValidator.create_booking_request(
                 package, start_date, end_date, num_guests
             )
-            existing = [to_domain_booking(b) for b in self.package.bookings.all()]
+            guests_booked = occupancy.peak_occupancy(self.package.pk, start_date, end_date)
+            existing = occupancy_as_bookings(package, start_date, end_date, guests_booked)
             self.availability_checker.check_availability(
                 booking_request, package, existing
             )
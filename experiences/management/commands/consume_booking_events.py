@@ -0,0 +1,71 @@
+"""Long-running worker that consumes booking events from the SQS queue."""
+
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from experiences.services import aws_sqs, booking_events
+
+
+class Command(BaseCommand):
+    help = "Long-poll the booking SQS queue and process booking events on a worker pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=booking_events.MAX_BATCH,
+            help="Concurrent handlers; may exceed the SQS batch size of 10.",
+        )
+        parser.add_argument(
+            "--wait-time", type=int, default=20, help="Long-poll wait per receive call (0-20 seconds)."
+        )
+        parser.add_argument(
+            "--visibility-timeout",
+            type=int,
+            default=30,
+            help="Seconds a received message stays hidden; extended while it is still running.",
+        )
+        parser.add_argument("--max-messages", type=int, help="Stop after receiving this many messages.")
+        parser.add_argument(
+            "--report-every", type=float, default=30.0, help="Seconds between throughput reports."
+        )
+        parser.add_argument("--once", action="store_true", help="Drain the queue and exit.")
+
+    def handle(self, *args, **options):
+        queue_url = getattr(settings, "SQS_BOOKING_QUEUE_URL", "")
+        if not queue_url:
+            raise CommandError("SQS_BOOKING_QUEUE_URL is not set.")
+        client = aws_sqs.get_sqs_client(
+            read_timeout=options["wait_time"] + booking_events.LONG_POLL_READ_MARGIN
+        )
+        if client is None:
+            raise CommandError("AWS is disabled (USE_AWS=0); nothing to consume.")
+
+        consumer = booking_events.BookingEventConsumer(
+            queue_url,
+            client=client,
+            max_workers=options["workers"],
+            wait_time_seconds=options["wait_time"],
+            visibility_timeout=options["visibility_timeout"],
+        )
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Consuming booking events from {queue_url}..."))
+        try:
+            stats = consumer.run(
+                max_messages=options["max_messages"],
+                stop_when_empty=options["once"],
+                report=self._report,
+                report_every=options["report_every"],
+            )
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Stopping booking event consumer."))
+            stats = consumer.stats
+
+        self._report(stats)
+
+    def _report(self, stats: booking_events.ConsumeStats) -> None:
+        self.stdout.write(
+            f"Received {stats.received}, processed {stats.processed}, failed {stats.failed} "
+            f"({stats.throughput:.1f} msg/s)."
+        )
@@ -0,0 +1,51 @@
+"""Long-running worker that delivers queued post-booking side effects."""
+
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from experiences.services import booking_outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver booking outbox events (DynamoDB, SQS, SNS) with retries and dead-lettering."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50, help="Events claimed per poll.")
+        parser.add_argument("--workers", type=int, default=8, help="Concurrent deliveries.")
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=booking_outbox.DEFAULT_MAX_ATTEMPTS,
+            help="Attempts before an event is dead-lettered.",
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=2.0, help="Seconds to sleep when nothing is due."
+        )
+        parser.add_argument("--once", action="store_true", help="Drain due events and exit.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING("Dispatching booking outbox..."))
+        try:
+            while True:
+                result = booking_outbox.dispatch_due_events(
+                    batch_size=options["batch_size"],
+                    max_workers=options["workers"],
+                    max_attempts=options["max_attempts"],
+                )
+                handled = result["delivered"] + result["failed"]
+                if handled:
+                    self.stdout.write(
+                        f"Delivered {result['delivered']} event(s), {result['failed']} failed."
+                    )
+                if handled < options["batch_size"]:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Stopping outbox dispatcher."))
+            return
+
+        self.stdout.write(self.style.SUCCESS("Outbox drained."))
@@ -0,0 +1,32 @@
+"""Export the package catalog to the snapshot file served by web workers."""
+
+from __future__ import annotations
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.core.management.base import BaseCommand, CommandError
+
+from experiences.services import catalog_snapshot, catalog_version, packages_repository
+
+
+class Command(BaseCommand):
+    help = "Write the package catalog to CATALOG_SNAPSHOT_PATH (or --output), replacing it atomically."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="Snapshot path; defaults to CATALOG_SNAPSHOT_PATH.")
+
+    def handle(self, *args, **options):
+        path = options["output"] or catalog_snapshot.snapshot_path()
+        if not path:
+            raise CommandError("Set CATALOG_SNAPSHOT_PATH or pass --output.")
+
+        try:
+            snapshot = catalog_snapshot.export(packages_repository.iter_catalog_for_snapshot(), path)
+        except (BotoCoreError, ClientError) as exc:
+            raise CommandError(f"Could not read the catalog: {exc}") from exc
+        catalog_version.bump()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote snapshot {snapshot.version} with {len(snapshot.packages)} package(s) to {path}."
+            )
+        )
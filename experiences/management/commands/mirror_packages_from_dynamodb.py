@@ -0,0 +1,33 @@
+"""Mirror the DynamoDB package catalog into the local packages table."""
+
+from __future__ import annotations
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.core.management.base import BaseCommand, CommandError
+
+from experiences.services import dynamodb_repository, packages_repository
+
+
+class Command(BaseCommand):
+    help = "Bulk-sync every DynamoDB package into AdventurePackageModel, writing only changed rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Rows per bulk INSERT/UPDATE.")
+
+    def handle(self, *args, **options):
+        if not packages_repository._should_use_dynamodb():
+            raise CommandError("DynamoDB packages are not enabled (USE_AWS / DDB_PACKAGES_TABLE_NAME).")
+
+        try:
+            result = packages_repository.sync_package_models(
+                dynamodb_repository.iter_packages_from_dynamodb(), batch_size=options["batch_size"]
+            )
+        except (BotoCoreError, ClientError) as exc:
+            raise CommandError(f"Could not read the packages table: {exc}") from exc
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {result['created']}, updated {result['updated']}, "
+                f"unchanged {result['unchanged']} package(s)."
+            )
+        )
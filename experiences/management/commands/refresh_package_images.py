@@ -2,30 +2,103 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
 import os
-import uuid
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
 
 from django.core.management.base import BaseCommand
 
-from experiences.services import dynamodb_repository, packages_repository
+from experiences.services import catalog_version, dynamodb_repository, packages_repository
 from experiences.services import image_fetcher
-from experiences.services.aws_s3 import upload_package_image, resolve_image_url
+from experiences.services.aws_s3 import upload_package_image
 from experiences.services import aws_enabled
 
+# S3 user metadata is capped at 2 KB, so one upload names at most this many
+# packages for the thumbnail Lambda; larger groups get another copy.
+MAX_CODES_PER_UPLOAD = 100
+
+
+class Checkpoint:
+    """Packages already refreshed, saved after each one so a rerun can resume.
+
+    Written atomically; removed once a run finishes without failures.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.done: Dict[str, str] = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as handle:
+                self.done = json.load(handle).get("done", {})
+
+    def record(self, code: str, key: str) -> None:
+        self.done[code] = key
+        self.save()
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix=".refresh-", suffix=".json", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump({"done": self.done}, handle)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def clear(self) -> None:
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+
 
 class Command(BaseCommand):
     help = "Fetch missing package images and upload them to S3."
 
+    def add_arguments(self, parser):
+        parser.add_argument("--fetch-workers", type=int, default=8, help="Concurrent image downloads.")
+        parser.add_argument("--upload-workers", type=int, default=4, help="Concurrent S3 uploads.")
+        parser.add_argument(
+            "--checkpoint",
+            default="",
+            help="Progress file; an interrupted run started with the same path resumes where it stopped.",
+        )
+
     def handle(self, *args, **options):
         if not aws_enabled():
             self.stdout.write(self.style.WARNING("USE_AWS disabled; skipping image refresh."))
             return
 
+        checkpoint = Checkpoint(options.get("checkpoint") or None)
         packages = dynamodb_repository.list_packages_from_dynamodb()
         total = len(packages)
-        updated = 0
         self.stdout.write(f"Found {total} packages")
+        if checkpoint.done:
+            self.stdout.write(f"Resuming: {len(checkpoint.done)} packages already refreshed")
 
+        pending = self._pending(packages, checkpoint)
+        # One catalog version bump for the whole run, not one per package.
+        with catalog_version.batched():
+            updated, uploaded, failed = self._refresh(
+                pending, checkpoint, options.get("fetch_workers") or 8, options.get("upload_workers") or 4
+            )
+
+        summary = f"Updated {updated} packages from {uploaded} uploaded images."
+        if failed:
+            self.stdout.write(self.style.WARNING(f"{summary} {failed} failed; rerun to retry them."))
+        else:
+            checkpoint.clear()
+            self.stdout.write(self.style.SUCCESS(summary))
+
+    def _pending(self, packages, checkpoint: Checkpoint) -> Dict[str, str]:
+        """Map package code to category for every package that still needs an image."""
+
+        pending = {}
         for package in packages:
             code = package.get("package_code") or package.get("package_id")
             image_url = package.get("image_url", "")
@@ -35,13 +108,88 @@ class Command(BaseCommand):
             if not code:
                 self.stdout.write("Package missing code; skipped")
                 continue
+            if code in checkpoint.done:
+                continue
+            pending[code] = package.get("category", "LODGING")
+        return pending
+
+    def _refresh(self, pending: Dict[str, str], checkpoint: Checkpoint, fetch_workers: int, upload_workers: int):
+        """Fetch and upload on two pools at once, then point each package at its upload.
+
+        Fetched images are grouped by content hash until more than
+        fetch_workers + upload_workers distinct images are waiting; the
+        oldest group then goes to the upload pool while fetching carries
+        on. New fetches are only started while that many images are in
+        flight, so memory stays bounded however large the catalog is.
+        Packages sharing an image share one upload unless their group was
+        already sent, in which case they get a copy of their own.
+        DynamoDB updates and checkpoint writes stay on this thread.
+        """
+
+        limit = fetch_workers + upload_workers
+        queued = iter(pending.items())
+        groups: "OrderedDict[str, dict]" = OrderedDict()
+        fetches: Dict[Future, str] = {}
+        uploads: Dict[Future, List[str]] = {}
+        updated = uploaded = failed = 0
+
+        def send(digest: str) -> None:
+            group = groups.pop(digest)
+            codes = sorted(group["codes"])
+            uploads[uploaders.submit(self._upload_group, group["bytes"], digest, codes)] = codes
+
+        fetchers = ThreadPoolExecutor(max_workers=fetch_workers)
+        uploaders = ThreadPoolExecutor(max_workers=upload_workers)
+        with fetchers, uploaders:
+            while True:
+                while len(fetches) + len(uploads) < limit:
+                    code, category = next(queued, (None, None))
+                    if code is None:
+                        break
+                    fetches[fetchers.submit(image_fetcher.fetch_image_for_category, category)] = code
+                if not fetches:
+                    for digest in list(groups):
+                        send(digest)
+                    if not uploads:
+                        break
+
+                done, _not_done = wait([*fetches, *uploads], return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in fetches:
+                        code = fetches.pop(future)
+                        try:
+                            image_bytes = future.result()
+                        except Exception as exc:
+                            self.stdout.write(self.style.WARNING(f"{code} -> fetch failed: {exc}"))
+                            failed += 1
+                            continue
+                        digest = hashlib.sha256(image_bytes).hexdigest()
+                        group = groups.setdefault(digest, {"bytes": image_bytes, "codes": []})
+                        group["codes"].append(code)
+                        if len(group["codes"]) >= MAX_CODES_PER_UPLOAD:
+                            send(digest)
+                        while len(groups) > limit:
+                            send(next(iter(groups)))
+                        continue
 
-            category = package.get("category", "LODGING")
-            image_bytes = image_fetcher.fetch_image_for_category(category)
-            filename = f"{code.lower()}-{uuid.uuid4().hex}.jpg"
-            s3_url = upload_package_image(image_bytes, filename)
-            packages_repository.update_package_image_url(code, s3_url)
-            self.stdout.write(f"{code} -> updated image {s3_url}")
-            updated += 1
+                    codes = uploads.pop(future)
+                    try:
+                        s3_url = future.result()
+                    except Exception as exc:
+                        self.stdout.write(self.style.WARNING(f"{', '.join(codes)} -> upload failed: {exc}"))
+                        failed += len(codes)
+                        continue
+                    uploaded += 1
+                    for code in codes:
+                        packages_repository.update_package_image_url(code, s3_url)
+                        checkpoint.record(code, s3_url)
+                        self.stdout.write(f"{code} -> updated image {s3_url}")
+                        updated += 1
+        return updated, uploaded, failed
 
-        self.stdout.write(self.style.SUCCESS(f"Updated {updated} packages."))
+    @staticmethod
+    def _upload_group(image_bytes: bytes, digest: str, codes: List[str]) -> str:
+        # The thumbnail Lambda reads package-codes to update every package
+        # sharing the image; the name keeps the first code for its fallback.
+        filename = f"{codes[0].lower()}-{digest[:16]}.jpg"
+        return upload_package_image(image_bytes, filename, metadata={"package-codes": ",".join(codes)})
@@ -8,6 +8,7 @@ import boto3
 from botocore.exceptions import ClientError
 from django.core.management.base import BaseCommand
 
+from experiences.services import catalog_version
 from infra.seed_packages import PACKAGES
 
 
@@ -37,4 +38,5 @@ class Command(BaseCommand):
             for pkg in PACKAGES:
                 batch.put_item(Item=pkg)
 
+        catalog_version.bump()
         self.stdout.write(self.style.SUCCESS(f"Seeded {len(PACKAGES)} packages into {table_name}."))
@@ -0,0 +1,45 @@
+"""Copy ORM bookings into the DynamoDB bookings table, or repair drift between them."""
+
+from __future__ import annotations
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from experiences.services import bookings_sync
+
+
+class Command(BaseCommand):
+    help = "Backfill the DynamoDB bookings table from the ORM, or reconcile only diverged key ranges."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reconcile",
+            action="store_true",
+            help="Compare per-range hashes and rewrite only the ranges that differ.",
+        )
+        parser.add_argument("--workers", type=int, default=4, help="Concurrent DynamoDB batch workers.")
+        parser.add_argument(
+            "--range-size",
+            type=int,
+            default=bookings_sync.DEFAULT_RANGE_SIZE,
+            help="Bookings (by primary key) per hashed range.",
+        )
+
+    def handle(self, *args, **options):
+        sync = bookings_sync.reconcile if options["reconcile"] else bookings_sync.backfill
+        try:
+            stats = sync(workers=options["workers"], range_size=options["range_size"])
+        except (ImproperlyConfigured, bookings_sync.UnprocessedItemsError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        if options["reconcile"]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Checked {stats.ranges} range(s); {stats.diverged} diverged, "
+                    f"{stats.written} booking(s) rewritten."
+                )
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"Wrote {stats.written} booking(s) in {stats.ranges} range(s).")
+            )
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.26 on 2026-10-17 01:41
+
+from collections import Counter
+from datetime import timedelta
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_occupancy(apps, schema_editor):
+    Booking = apps.get_model('experiences', 'AdventureBookingModel')
+    Occupancy = apps.get_model('experiences', 'PackageNightOccupancy')
+
+    totals = Counter()
+    bookings = Booking.objects.exclude(status='CANCELLED').values_list(
+        'package_id', 'start_date', 'end_date', 'num_guests'
+    )
+    for package_id, start_date, end_date, num_guests in bookings.iterator():
+        for offset in range((end_date - start_date).days):
+            totals[(package_id, start_date + timedelta(days=offset))] += num_guests
+
+    Occupancy.objects.bulk_create(
+        [
+            Occupancy(package_id=package_id, night=night, guests_booked=guests)
+            for (package_id, night), guests in totals.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('experiences', '0002_adventurebookingmodel_guest_email_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PackageNightOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('night', models.DateField()),
+                ('guests_booked', models.PositiveIntegerField(default=0)),
+                ('package', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='night_occupancy', to='experiences.adventurepackagemodel')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='packagenightoccupancy',
+            constraint=models.UniqueConstraint(fields=('package', 'night'), name='unique_package_night'),
+        ),
+        migrations.RunPython(backfill_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.26 on 2026-10-17 01:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('experiences', '0003_packagenightoccupancy'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='adventurebookingmodel',
+            index=models.Index(fields=['package', 'start_date', 'end_date', 'status'], name='booking_package_window_idx'),
+        ),
+    ]
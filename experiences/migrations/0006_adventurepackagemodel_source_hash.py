@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-17 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('experiences', '0005_bookingoutboxevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adventurepackagemodel',
+            name='source_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-17 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('experiences', '0007_catalogversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adventurebookingmodel',
+            name='itinerary',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
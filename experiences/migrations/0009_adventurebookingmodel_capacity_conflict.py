@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-17 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('experiences', '0008_adventurebookingmodel_itinerary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adventurebookingmodel',
+            name='capacity_conflict',
+            field=models.BooleanField(default=False),
+        ),
+    ]
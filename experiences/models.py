@@ -1,6 +1,12 @@
 """Django models for AdventureStay."""
 
+from datetime import date, timedelta
+from typing import Dict
+
 from django.db import models
+from django.utils import timezone
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
 
 
 class AdventurePackageModel(models.Model):
@@ -35,18 +41,55 @@ class AdventurePackageModel(models.Model):
     includes_guide = models.BooleanField(default=False)
     image_url = models.URLField(blank=True)
     is_active = models.BooleanField(default=True)
+    # Hash of the upstream catalog fields last mirrored into this row.
+    source_hash = models.CharField(max_length=64, blank=True, default="")
 
     def __str__(self) -> str:
         return f"{self.name} ({self.package_code})"
 
 
+class AdventureBookingQuerySet(models.QuerySet):
+    """Query helpers for availability lookups on bookings."""
+
+    def active(self):
+        return self.exclude(status=AdventureBookingModel.CANCELLED)
+
+    def overlapping(self, start_date: date, end_date: date):
+        return self.filter(start_date__lt=end_date, end_date__gt=start_date)
+
+    def nightly_guest_totals(self, start_date: date, end_date: date) -> Dict[date, int]:
+        """Sum guests per night of the range in a single aggregate query.
+
+        Only active bookings overlapping the range are read, which the
+        (package, start_date, end_date, status) index serves directly.
+        """
+
+        nights = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days)]
+        if not nights:
+            return {}
+
+        totals = self.active().overlapping(start_date, end_date).aggregate(
+            **{
+                f"night_{index}": Coalesce(
+                    Sum("num_guests", filter=Q(start_date__lte=night, end_date__gt=night)), 0
+                )
+                for index, night in enumerate(nights)
+            }
+        )
+        return {night: totals[f"night_{index}"] for index, night in enumerate(nights)}
+
+
 class AdventureBookingModel(models.Model):
     """Stores bookings confirmed via the website."""
 
+    CONFIRMED = "CONFIRMED"
+    PENDING = "PENDING"
+    CANCELLED = "CANCELLED"
+
     STATUS_CHOICES = [
-        ("CONFIRMED", "Confirmed"),
-        ("PENDING", "Pending"),
-        ("CANCELLED", "Cancelled"),
+        (CONFIRMED, "Confirmed"),
+        (PENDING, "Pending"),
+        (CANCELLED, "Cancelled"),
     ]
 
     package = models.ForeignKey(
@@ -59,10 +102,109 @@ class AdventureBookingModel(models.Model):
     num_guests = models.PositiveIntegerField()
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
-    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="CONFIRMED")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=CONFIRMED)
+    # Itinerary summary computed when the booking is made; rebuilt by a
+    # signal when its dates, guests, package or price change.
+    itinerary = models.TextField(blank=True, default="")
+    # Set when an edit no longer fits the shared availability store; the
+    # booking keeps its previous nights there until someone resolves it.
+    capacity_conflict = models.BooleanField(default=False)
+
+    objects = AdventureBookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["package", "start_date", "end_date", "status"],
+                name="booking_package_window_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return (
             f"{self.package.package_code} booking for {self.guest_name} "
             f"({self.start_date} - {self.end_date})"
         )
+
+
+class PackageNightOccupancy(models.Model):
+    """Guests booked per package and night, kept in step with bookings.
+
+    Availability for a stay reads at most one row per night instead of every
+    booking the package has ever had.
+    """
+
+    package = models.ForeignKey(
+        AdventurePackageModel, on_delete=models.CASCADE, related_name="night_occupancy"
+    )
+    night = models.DateField()
+    guests_booked = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["package", "night"], name="unique_package_night"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.package.package_code} {self.night}: {self.guests_booked} guest(s)"
+
+
+class BookingOutboxEvent(models.Model):
+    """A post-booking AWS side effect, written in the booking's transaction.
+
+    The dispatch_booking_outbox command delivers these in the background so
+    the booking request returns as soon as the local commit succeeds.
+    """
+
+    DYNAMODB = "DYNAMODB"
+    SQS = "SQS"
+    SNS = "SNS"
+
+    KIND_CHOICES = [
+        (DYNAMODB, "DynamoDB booking record"),
+        (SQS, "SQS booking_created event"),
+        (SNS, "SNS confirmation"),
+    ]
+
+    PENDING = "PENDING"
+    DELIVERED = "DELIVERED"
+    DEAD = "DEAD"
+
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (DELIVERED, "Delivered"),
+        (DEAD, "Dead-lettered"),
+    ]
+
+    booking = models.ForeignKey(
+        AdventureBookingModel, on_delete=models.CASCADE, related_name="outbox_events"
+    )
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind} for booking {self.booking_id} ({self.status})"
+
+
+class CatalogVersion(models.Model):
+    """Local stand-in for the DynamoDB catalog version item.
+
+    A single row whose version is bumped on every catalog mutation; see
+    experiences.services.catalog_version.
+    """
+
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self) -> str:
+        return f"Catalog v{self.version}"
@@ -0,0 +1,75 @@
+"""Whole-page caching with conditional GET for catalog-driven views."""
+
+from __future__ import annotations
+
+import hashlib
+from functools import wraps
+from typing import Callable, Optional
+
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+
+from .services import catalog_cache, catalog_version
+
+
+def page_key(name: str) -> str:
+    return f"page:{name}"
+
+
+def catalog_page(name: str) -> Callable:
+    """Cache a view's rendered body under the current catalog version.
+
+    The page is rendered once per catalog version (and cache TTL) and shared
+    by every request. Responses carry a strong ETag, the hash of the body,
+    and a matching If-None-Match gets a 304 from the cached page without
+    calling the view. No Last-Modified is sent: the body embeds presigned
+    image URLs that expire while the catalog stays unchanged, so only the
+    body hash says whether a client's copy is still current. Responses
+    other than a plain 200 are returned as rendered and not cached. Only
+    use this for views whose output does not depend on the user, session
+    or query string.
+    """
+
+    key = page_key(name)
+
+    def etag(request, *args, **kwargs) -> Optional[str]:
+        entry = catalog_cache.lookup(key, catalog_version.current().version)
+        page = entry.result if entry is not None else None
+        return page["etag"] if page else None
+
+    def decorator(view):
+        @condition(etag_func=etag)
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            rendered = []
+
+            def load() -> dict:
+                response = view(request, *args, **kwargs)
+                rendered.append(response)
+                return _page(response)
+
+            page = catalog_cache.get_or_load(key, load)
+            if not page:
+                # Uncacheable responses come back empty and are not stored;
+                # return the one this request rendered rather than render again.
+                return rendered[0] if rendered else view(request, *args, **kwargs)
+            response = HttpResponse(page["body"], content_type=page["content_type"])
+            response["ETag"] = page["etag"]
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _page(response) -> dict:
+    """Return the cacheable parts of a response, or {} for one not worth caching."""
+
+    if response.status_code != 200 or getattr(response, "streaming", False):
+        return {}
+    body = response.content
+    return {
+        "body": body,
+        "content_type": response["Content-Type"],
+        "etag": f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+    }
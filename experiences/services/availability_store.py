@@ -0,0 +1,325 @@
+"""Per-night guest counters in DynamoDB, shared by every app instance.
+
+Each package night is split into shards, items keyed
+"<package_code>#<night>#<shard>", and the package's capacity is divided
+between them. A reservation reads the night's shards, spreads its guests
+over shards that have room (starting at a random shard, so bursts on a
+hot package land on different partitions), and applies every increment
+in one TransactWriteItems call. Each increment carries a condition that
+keeps its shard within its share of capacity. The same transaction puts
+a reservation item recording the allocation, so a release can undo
+exactly what was taken.
+
+Reservations run on request threads, so every call goes through the
+shared low-level client rather than a per-thread resource, with
+attribute values written in DynamoDB's typed form.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+from datetime import date
+from typing import Dict, List, Optional
+
+from adventurestay_utils import PackageNotAvailableError
+from botocore.exceptions import ClientError
+from django.conf import settings
+
+from ..models import AdventureBookingModel, AdventurePackageModel
+from . import aws_clients, aws_enabled, occupancy
+
+logger = logging.getLogger(__name__)
+
+# TransactWriteItems accepts at most 100 actions; one is the reservation item.
+MAX_TRANSACTION_ITEMS = 100
+MAX_ATTEMPTS = 5
+
+Allocation = Dict[str, int]
+
+
+def is_enabled() -> bool:
+    return aws_enabled() and bool(getattr(settings, "DDB_AVAILABILITY_TABLE_NAME", ""))
+
+
+def shard_count(package: AdventurePackageModel) -> int:
+    """Shards per night: the configured count, but never more than the capacity."""
+
+    return max(1, min(getattr(settings, "DDB_AVAILABILITY_SHARDS", 4), package.max_guests))
+
+
+def shard_capacities(package: AdventurePackageModel) -> List[int]:
+    shards = shard_count(package)
+    share, extra = divmod(package.max_guests, shards)
+    return [share + (1 if index < extra else 0) for index in range(shards)]
+
+
+def counter_key(package_code: str, night: date, shard: int) -> str:
+    return f"{package_code}#{night.isoformat()}#{shard}"
+
+
+def reservation_key(booking_id) -> str:
+    return f"reservation#{booking_id}"
+
+
+def reserve(booking: AdventureBookingModel) -> Allocation:
+    """Take the booking's guests from every night it covers.
+
+    Raises PackageNotAvailableError when any night lacks room. A condition
+    failure caused by a concurrent reservation is retried against fresh
+    counts.
+    """
+
+    package = booking.package
+    capacities = shard_capacities(package)
+    nights = occupancy.nights_between(booking.start_date, booking.end_date)
+    if not nights or not booking.num_guests:
+        return {}
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        counts = _read_counts(package.package_code, nights, len(capacities))
+        allocation = _allocate(package.package_code, nights, capacities, counts, booking.num_guests)
+        if len(allocation) + 1 > MAX_TRANSACTION_ITEMS:
+            raise ValueError(
+                f"Booking {booking.pk} needs {len(allocation)} counter updates; "
+                f"at most {MAX_TRANSACTION_ITEMS - 1} fit in one transaction."
+            )
+        try:
+            _transact(_reserve_actions(booking, allocation, capacities))
+            return allocation
+        except ClientError as exc:
+            reasons = _cancellation_codes(exc)
+            if not reasons:
+                raise
+            if reasons[0] == "ConditionalCheckFailed" and not any(reasons[1:]):
+                # Only the reservation item failed: this booking already holds its nights.
+                return _allocation(_get_reservation(booking.pk))
+            logger.info("Availability transaction for booking %s lost a race (attempt %s).", booking.pk, attempt)
+
+    raise PackageNotAvailableError("Requested nights are being booked concurrently; please retry.")
+
+
+def replace(booking: AdventureBookingModel) -> Allocation:
+    """Move the booking's reservation to its current package, dates and guests.
+
+    The new nights are taken and the old ones given back in one
+    transaction, so the old nights are only given up if the new ones fit.
+    Nights the booking already holds count as free for the new allocation.
+    Raises PackageNotAvailableError, leaving the old reservation in place,
+    when the new footprint does not fit.
+    """
+
+    package = booking.package
+    capacities = shard_capacities(package)
+    nights = occupancy.nights_between(booking.start_date, booking.end_date)
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        held_item = _get_reservation(booking.pk)
+        held = _allocation(held_item) if held_item else {}
+        wanted: Allocation = {}
+        if nights and booking.num_guests:
+            counts = _read_counts(package.package_code, nights, len(capacities))
+            for key, taken in held.items():
+                if key in counts:
+                    counts[key] -= taken
+            wanted = _allocate(package.package_code, nights, capacities, counts, booking.num_guests)
+        if wanted == held:
+            return held
+
+        actions = _replace_actions(booking, held_item, wanted, capacities)
+        if len(actions) > MAX_TRANSACTION_ITEMS:
+            raise ValueError(
+                f"Booking {booking.pk} needs {len(actions)} actions to move; "
+                f"at most {MAX_TRANSACTION_ITEMS} fit in one transaction."
+            )
+        try:
+            _transact(actions)
+            return wanted
+        except ClientError as exc:
+            if not _cancellation_codes(exc):
+                raise
+            logger.info("Availability move for booking %s lost a race (attempt %s).", booking.pk, attempt)
+
+    raise PackageNotAvailableError("Requested nights are being booked concurrently; please retry.")
+
+
+def release(booking_id) -> bool:
+    """Give back whatever the booking reserved; return False if it held nothing."""
+
+    item = _get_reservation(booking_id)
+    if not item:
+        return False
+
+    table_name = _table_name()
+    actions = [
+        {
+            "Delete": {
+                "TableName": table_name,
+                "Key": {"pk": {"S": reservation_key(booking_id)}},
+                "ConditionExpression": "attribute_exists(pk)",
+            }
+        }
+    ]
+    actions.extend(
+        {
+            "Update": {
+                "TableName": table_name,
+                "Key": {"pk": {"S": key}},
+                "UpdateExpression": "ADD guests :released",
+                "ExpressionAttributeValues": {":released": {"N": str(-taken)}},
+            }
+        }
+        for key, taken in _allocation(item).items()
+    )
+    try:
+        _transact(actions)
+    except ClientError as exc:
+        if _cancellation_codes(exc):
+            return False
+        raise
+    return True
+
+
+def booked_guests(package_code: str, night: date, shards: int) -> int:
+    counts = _read_counts(package_code, [night], shards)
+    return sum(counts.values())
+
+
+def _read_counts(package_code: str, nights: List[date], shards: int) -> Dict[str, int]:
+    keys = [counter_key(package_code, night, shard) for night in nights for shard in range(shards)]
+    client = _client()
+    counts = {key: 0 for key in keys}
+    for start in range(0, len(keys), 100):
+        batch = [{"pk": {"S": key}} for key in keys[start : start + 100]]
+        pending = {_table_name(): {"Keys": batch, "ConsistentRead": True}}
+        while pending:
+            response = client.batch_get_item(RequestItems=pending)
+            for item in response.get("Responses", {}).get(_table_name(), []):
+                counts[item["pk"]["S"]] = int(item.get("guests", {}).get("N", 0))
+            pending = response.get("UnprocessedKeys") or {}
+    return counts
+
+
+def _allocate(
+    package_code: str,
+    nights: List[date],
+    capacities: List[int],
+    counts: Dict[str, int],
+    guests: int,
+) -> Allocation:
+    allocation: Allocation = {}
+    shards = len(capacities)
+    for night in nights:
+        remaining = guests
+        first = random.randrange(shards)
+        for offset in range(shards):
+            shard = (first + offset) % shards
+            key = counter_key(package_code, night, shard)
+            take = min(remaining, capacities[shard] - counts[key])
+            if take > 0:
+                allocation[key] = take
+                remaining -= take
+            if not remaining:
+                break
+        if remaining:
+            raise PackageNotAvailableError("Requested guests exceed capacity for overlapping bookings.")
+    return allocation
+
+
+def _reserve_actions(booking: AdventureBookingModel, allocation: Allocation, capacities: List[int]) -> List[dict]:
+    actions = [_put_reservation(booking, allocation, {"ConditionExpression": "attribute_not_exists(pk)"})]
+    actions.extend(_counter_update(key, take, capacities) for key, take in allocation.items())
+    return actions
+
+
+def _replace_actions(
+    booking: AdventureBookingModel, held_item: Optional[dict], wanted: Allocation, capacities: List[int]
+) -> List[dict]:
+    """Swap the held allocation for the wanted one, netting counters touched by both.
+
+    The reservation item is only replaced if it still records what was
+    read, so two resyncs of one booking cannot both apply.
+    """
+
+    held = _allocation(held_item) if held_item else {}
+    if held_item:
+        guard = {
+            "ConditionExpression": "allocation = :held",
+            "ExpressionAttributeValues": {":held": held_item["allocation"]},
+        }
+    else:
+        guard = {"ConditionExpression": "attribute_not_exists(pk)"}
+
+    if wanted:
+        actions = [_put_reservation(booking, wanted, guard)]
+    else:
+        actions = [{"Delete": {"TableName": _table_name(), "Key": {"pk": {"S": reservation_key(booking.pk)}}, **guard}}]
+    for key in sorted(set(held) | set(wanted)):
+        delta = wanted.get(key, 0) - held.get(key, 0)
+        if delta:
+            actions.append(_counter_update(key, delta, capacities))
+    return actions
+
+
+def _put_reservation(booking: AdventureBookingModel, allocation: Allocation, condition: dict) -> dict:
+    return {
+        "Put": {
+            "TableName": _table_name(),
+            "Item": {
+                "pk": {"S": reservation_key(booking.pk)},
+                "package_id": {"S": booking.package.package_code},
+                "allocation": {"M": {key: {"N": str(take)} for key, take in allocation.items()}},
+            },
+            **condition,
+        }
+    }
+
+
+def _counter_update(key: str, delta: int, capacities: List[int]) -> dict:
+    """ADD delta guests to a counter; increases must stay within the shard's capacity."""
+
+    update = {
+        "TableName": _table_name(),
+        "Key": {"pk": {"S": key}},
+        "UpdateExpression": "ADD guests :delta",
+        "ExpressionAttributeValues": {":delta": {"N": str(delta)}},
+    }
+    if delta > 0:
+        shard = int(key.rsplit("#", 1)[1])
+        update["ConditionExpression"] = "attribute_not_exists(guests) OR guests <= :limit"
+        update["ExpressionAttributeValues"][":limit"] = {"N": str(capacities[shard] - delta)}
+    return {"Update": update}
+
+
+def _transact(actions: List[dict]) -> None:
+    _client().transact_write_items(TransactItems=actions)
+
+
+def _get_reservation(booking_id) -> Optional[dict]:
+    response = _client().get_item(
+        TableName=_table_name(), Key={"pk": {"S": reservation_key(booking_id)}}, ConsistentRead=True
+    )
+    return response.get("Item")
+
+
+def _allocation(item: dict) -> Allocation:
+    return {key: int(taken["N"]) for key, taken in item["allocation"]["M"].items()}
+
+
+def _cancellation_codes(exc: ClientError) -> List[Optional[str]]:
+    """Return per-action cancellation codes, or [] for any other error."""
+
+    if exc.response.get("Error", {}).get("Code") != "TransactionCanceledException":
+        return []
+    return [
+        reason.get("Code") if reason.get("Code") != "None" else None
+        for reason in exc.response.get("CancellationReasons", [])
+    ] or [None]
+
+
+def _table_name() -> str:
+    return settings.DDB_AVAILABILITY_TABLE_NAME
+
+
+def _client():
+    return aws_clients.client("dynamodb")
@@ -0,0 +1,131 @@
+"""Process-wide registry of pooled boto3 clients and resources.
+
+Every service module gets its AWS handles from here instead of calling
+boto3 directly, so credential resolution, endpoint setup and the HTTP
+connection pool are paid once per process rather than once per call.
+
+Clients are thread-safe and shared by all threads. Resources are not, so
+each thread gets its own, built from the same session and config. Code
+that fans resource calls out to worker threads uses executor(), whose
+pools live as long as the process, so each worker builds its resources
+once instead of once per call. The registry notices when it is used in a forked child (gunicorn --preload)
+and starts over there, because sockets must not be shared across
+processes.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+from django.conf import settings
+
+_lock = threading.Lock()
+_pid = os.getpid()
+_session = None
+_clients: Dict[Tuple[str, Optional[float]], Any] = {}
+_resources = threading.local()
+_executors: Dict[Tuple[str, int], ThreadPoolExecutor] = {}
+
+
+def client(service_name: str, read_timeout: Optional[float] = None):
+    """Return the shared client for an AWS service.
+
+    Long polls must outlast the read timeout, so callers that make them
+    ask for a longer one and get a separate shared client.
+    """
+
+    _reset_if_forked()
+    key = (service_name, read_timeout)
+    cached = _clients.get(key)
+    if cached is not None:
+        return cached
+
+    with _lock:
+        cached = _clients.get(key)
+        if cached is None:
+            config = _config()
+            if read_timeout is not None:
+                config = config.merge(Config(read_timeout=read_timeout))
+            cached = _clients[key] = _session_locked().client(service_name, config=config)
+        return cached
+
+
+def resource(service_name: str):
+    """Return this thread's resource for an AWS service."""
+
+    _reset_if_forked()
+    per_thread = getattr(_resources, "by_service", None)
+    if per_thread is None or getattr(_resources, "pid", None) != _pid:
+        per_thread = _resources.by_service = {}
+        _resources.pid = _pid
+
+    cached = per_thread.get(service_name)
+    if cached is None:
+        with _lock:
+            cached = per_thread[service_name] = _session_locked().resource(
+                service_name, config=_config()
+            )
+    return cached
+
+
+def executor(name: str, max_workers: int) -> ThreadPoolExecutor:
+    """Return the long-lived worker pool for one kind of fan-out."""
+
+    _reset_if_forked()
+    key = (name, max_workers)
+    cached = _executors.get(key)
+    if cached is None:
+        with _lock:
+            cached = _executors.get(key)
+            if cached is None:
+                cached = _executors[key] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+    return cached
+
+
+def reset() -> None:
+    """Drop every cached session, client, resource and worker pool."""
+
+    _reset(forked=False)
+
+
+def _reset(forked: bool) -> None:
+    global _session, _pid
+    with _lock:
+        _session = None
+        _clients.clear()
+        _pid = os.getpid()
+        executors = list(_executors.values())
+        _executors.clear()
+    _resources.by_service = {}
+    _resources.pid = _pid
+    # A forked child inherits the pools but none of their threads.
+    if not forked:
+        for pool in executors:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _reset_if_forked() -> None:
+    if os.getpid() != _pid:
+        _reset(forked=True)
+
+
+def _session_locked():
+    global _session
+    if _session is None:
+        _session = boto3.session.Session(region_name=getattr(settings, "AWS_REGION", None))
+    return _session
+
+
+def _config() -> Config:
+    return Config(
+        max_pool_connections=getattr(settings, "AWS_MAX_POOL_CONNECTIONS", 50),
+        connect_timeout=getattr(settings, "AWS_CONNECT_TIMEOUT", 3),
+        read_timeout=getattr(settings, "AWS_READ_TIMEOUT", 10),
+        tcp_keepalive=True,
+        retries={"mode": "standard", "max_attempts": 3},
+    )
@@ -2,10 +2,23 @@
 
 from __future__ import annotations
 
-import boto3
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple
+
 from django.conf import settings
 
-from . import aws_enabled, log_local_fallback
+from . import aws_clients, aws_enabled, log_local_fallback
+
+PRESIGNED_URL_TTL = 3600 * 12
+# Cached URLs are replaced this long before they expire, so a page (or a
+# cached catalog entry) never hands out a link that is about to go dead.
+PRESIGNED_URL_REFRESH_MARGIN = 3600
+PRESIGNED_URL_CACHE_SIZE = 1024
+
+_presigned_urls: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()
+_presigned_urls_lock = threading.Lock()
 
 
 def get_s3_client():
@@ -13,8 +26,7 @@ def get_s3_client():
         log_local_fallback("s3")
         return None
 
-    region = getattr(settings, "AWS_REGION", None)
-    return boto3.client("s3", region_name=region)
+    return aws_clients.client("s3")
 
 
 def build_package_image_url(package_code: str) -> str:
@@ -56,17 +68,43 @@ def resolve_image_url(image_key: str | None) -> str:
     if not bucket:
         return image_key
 
-    s3 = boto3.client("s3")
+    cache_key = (bucket, image_key)
+    now = time.time()
+    with _presigned_urls_lock:
+        cached = _presigned_urls.get(cache_key)
+        if cached and cached[1] > now:
+            _presigned_urls.move_to_end(cache_key)
+            return cached[0]
 
-    url = s3.generate_presigned_url(
+    url = aws_clients.client("s3").generate_presigned_url(
         "get_object",
         Params={"Bucket": bucket, "Key": image_key},
-        ExpiresIn=3600 * 12,   # 12 hours
+        ExpiresIn=PRESIGNED_URL_TTL,
     )
 
+    with _presigned_urls_lock:
+        _presigned_urls[cache_key] = (url, now + PRESIGNED_URL_TTL - PRESIGNED_URL_REFRESH_MARGIN)
+        _presigned_urls.move_to_end(cache_key)
+        while len(_presigned_urls) > PRESIGNED_URL_CACHE_SIZE:
+            _presigned_urls.popitem(last=False)
+
     return url
 
 
+def resolve_image_srcset(renditions: dict | None) -> dict:
+    """Map each rendition format to a srcset string of resolved URLs.
+
+    renditions is the image_renditions attribute written by the thumbnail
+    Lambda: {"jpeg": [{"width": 300, "key": "thumbnails/..."}, ...], ...}.
+    """
+
+    return {
+        fmt: ", ".join(f"{resolve_image_url(item['key'])} {int(item['width'])}w" for item in items)
+        for fmt, items in (renditions or {}).items()
+        if items
+    }
+
+
 # def upload_package_image(image_bytes: bytes, filename: str) -> str:
 #     """Upload image bytes to S3 under packages/ and return the public URL."""
 
@@ -81,8 +119,8 @@ def resolve_image_url(image_key: str | None) -> str:
 #     region = getattr(settings, "AWS_REGION", "ap-south-1")
 #     return f"https://{bucket}.s3.{region}.amazonaws.com/{key}"
 
-def upload_package_image(image_bytes: bytes, filename: str) -> str:
-    client = boto3.client("s3")
+def upload_package_image(image_bytes: bytes, filename: str, metadata: dict | None = None) -> str:
+    client = aws_clients.client("s3")
     bucket = settings.S3_BUCKET_NAME
     key = f"packages/{filename}"
 
@@ -91,6 +129,7 @@ def upload_package_image(image_bytes: bytes, filename: str) -> str:
         Key=key,
         Body=image_bytes,
         ContentType="image/jpeg",
+        Metadata=metadata or {},
     )
 
     # return ONLY key, not URL
@@ -4,16 +4,19 @@ from __future__ import annotations
 
 import json
 import logging
+from typing import Iterable
 
-import boto3
 from botocore.exceptions import BotoCoreError, ClientError
 from django.conf import settings
 
 from ..models import AdventureBookingModel
-from . import aws_enabled, log_local_fallback
+from . import aws_clients, aws_enabled, log_local_fallback
+from .batch_publisher import BatchPublisher, BatchPublishError, utf8_size
 
 logger = logging.getLogger(__name__)
 
+CONFIRMATION_SUBJECT = "AdventureStay Booking Confirmed"
+
 
 # def get_sns_client():
 #     if not aws_enabled():
@@ -29,13 +32,15 @@ def get_sns_client():
         log_local_fallback("sns")
         return None
 
-    region = getattr(settings, "AWS_REGION", None)
-    return boto3.client("sns", region_name=region)
+    return aws_clients.client("sns")
+
 
 
+def publish_booking_confirmation(booking: AdventureBookingModel, raise_errors: bool = False) -> None:
+    """Publish a confirmation notification for the booking.
 
-def publish_booking_confirmation(booking: AdventureBookingModel) -> None:
-    """Publish a confirmation notification for the booking."""
+    AWS errors are logged and swallowed unless raise_errors is set.
+    """
 
     topic_arn = getattr(settings, "SNS_BOOKING_TOPIC_ARN", "")
     if not topic_arn:
@@ -46,22 +51,67 @@ def publish_booking_confirmation(booking: AdventureBookingModel) -> None:
     if not client:
         return
 
-    message = {
-        "package": booking.package.name,
-        "location": booking.package.location,
-        "start_date": booking.start_date.isoformat(),
-        "end_date": booking.end_date.isoformat(),
-        "num_guests": booking.num_guests,
-        "total_price": float(booking.total_price),
-        "booking_id": str(booking.id),
-    }
+    message = _booking_confirmation_message(booking)
 
     try:
         response = client.publish(
             TopicArn=topic_arn,
-            Subject="AdventureStay Booking Confirmed",
+            Subject=CONFIRMATION_SUBJECT,
             Message=json.dumps(message),
         )
         logger.info("Published booking confirmation to SNS. MessageId=%s", response.get("MessageId"))
     except (BotoCoreError, ClientError) as exc:
         logger.exception("Failed to publish booking to SNS: %s", exc)
+        if raise_errors:
+            raise
+
+
+def publish_booking_confirmations(
+    bookings: Iterable[AdventureBookingModel], raise_errors: bool = False
+) -> int:
+    """Publish confirmations for many bookings with publish_batch.
+
+    Returns how many messages were accepted. Entries that still fail after
+    retries are logged, and raised as BatchPublishError if raise_errors is set.
+    """
+
+    topic_arn = getattr(settings, "SNS_BOOKING_TOPIC_ARN", "")
+    if not topic_arn:
+        logger.warning("SNS_BOOKING_TOPIC_ARN not set; skipping SNS notification.")
+        return 0
+
+    client = get_sns_client()
+    if not client:
+        return 0
+
+    publisher = BatchPublisher(
+        send_batch=lambda entries: client.publish_batch(
+            TopicArn=topic_arn, PublishBatchRequestEntries=entries
+        ),
+        size_of=lambda entry: utf8_size(entry["Message"], entry["Subject"]),
+    )
+    with publisher:
+        for booking in bookings:
+            publisher.add(
+                {
+                    "Subject": CONFIRMATION_SUBJECT,
+                    "Message": json.dumps(_booking_confirmation_message(booking)),
+                }
+            )
+
+    logger.info("Published %s booking confirmations to SNS.", publisher.sent)
+    if publisher.failed and raise_errors:
+        raise BatchPublishError(publisher.failed)
+    return publisher.sent
+
+
+def _booking_confirmation_message(booking: AdventureBookingModel) -> dict:
+    return {
+        "package": booking.package.name,
+        "location": booking.package.location,
+        "start_date": booking.start_date.isoformat(),
+        "end_date": booking.end_date.isoformat(),
+        "num_guests": booking.num_guests,
+        "total_price": float(booking.total_price),
+        "booking_id": str(booking.id),
+    }
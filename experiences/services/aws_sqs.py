@@ -4,28 +4,31 @@ from __future__ import annotations
 
 import json
 import logging
+from typing import Iterable, Optional
 
-import boto3
 from botocore.exceptions import BotoCoreError, ClientError
 from django.conf import settings
 
 from ..models import AdventureBookingModel
-from . import aws_enabled, log_local_fallback
+from . import aws_clients, aws_enabled, log_local_fallback
+from .batch_publisher import BatchPublisher, BatchPublishError, utf8_size
 
 logger = logging.getLogger(__name__)
 
 
-def get_sqs_client():
+def get_sqs_client(read_timeout: Optional[float] = None):
     if not aws_enabled():
         log_local_fallback("sqs")
         return None
 
-    region = getattr(settings, "AWS_REGION", None)
-    return boto3.client("sqs", region_name=region)
+    return aws_clients.client("sqs", read_timeout=read_timeout)
 
 
-def send_booking_created_message(booking: AdventureBookingModel) -> None:
-    """Send a booking_created event to the configured SQS queue."""
+def send_booking_created_message(booking: AdventureBookingModel, raise_errors: bool = False) -> None:
+    """Send a booking_created event to the configured SQS queue.
+
+    AWS errors are logged and swallowed unless raise_errors is set.
+    """
 
     queue_url = getattr(settings, "SQS_BOOKING_QUEUE_URL", "")
     if not queue_url:
@@ -36,7 +39,51 @@ def send_booking_created_message(booking: AdventureBookingModel) -> None:
     if not client:
         return
 
-    message = {
+    message = _booking_created_message(booking)
+
+    try:
+        response = client.send_message(QueueUrl=queue_url, MessageBody=json.dumps(message))
+        logger.info("Sent booking_created message to SQS. MessageId=%s", response.get("MessageId"))
+    except (BotoCoreError, ClientError) as exc:
+        logger.exception("Failed to send booking message to SQS: %s", exc)
+        if raise_errors:
+            raise
+
+
+def send_booking_created_messages(
+    bookings: Iterable[AdventureBookingModel], raise_errors: bool = False
+) -> int:
+    """Send booking_created events for many bookings with send_message_batch.
+
+    Returns how many messages were accepted. Entries that still fail after
+    retries are logged, and raised as BatchPublishError if raise_errors is set.
+    """
+
+    queue_url = getattr(settings, "SQS_BOOKING_QUEUE_URL", "")
+    if not queue_url:
+        logger.warning("SQS_BOOKING_QUEUE_URL not set; skipping SQS publish.")
+        return 0
+
+    client = get_sqs_client()
+    if not client:
+        return 0
+
+    publisher = BatchPublisher(
+        send_batch=lambda entries: client.send_message_batch(QueueUrl=queue_url, Entries=entries),
+        size_of=lambda entry: utf8_size(entry["MessageBody"]),
+    )
+    with publisher:
+        for booking in bookings:
+            publisher.add({"MessageBody": json.dumps(_booking_created_message(booking))})
+
+    logger.info("Sent %s booking_created messages to SQS.", publisher.sent)
+    if publisher.failed and raise_errors:
+        raise BatchPublishError(publisher.failed)
+    return publisher.sent
+
+
+def _booking_created_message(booking: AdventureBookingModel) -> dict:
+    return {
         "event_type": "booking_created",
         "booking_id": str(booking.id),
         "package_code": booking.package.package_code,
@@ -46,9 +93,3 @@ def send_booking_created_message(booking: AdventureBookingModel) -> None:
         "num_guests": booking.num_guests,
         "total_price": float(booking.total_price),
     }
-
-    try:
-        response = client.send_message(QueueUrl=queue_url, MessageBody=json.dumps(message))
-        logger.info("Sent booking_created message to SQS. MessageId=%s", response.get("MessageId"))
-    except (BotoCoreError, ClientError) as exc:
-        logger.exception("Failed to send booking message to SQS: %s", exc)
@@ -0,0 +1,113 @@
+"""Size-aware batching for SQS send_message_batch and SNS publish_batch."""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Callable, Dict, List
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+logger = logging.getLogger(__name__)
+
+# Both APIs cap a batch at 10 entries and 256 KiB of payload in total.
+MAX_BATCH_ENTRIES = 10
+MAX_BATCH_BYTES = 256 * 1024
+
+Entry = Dict[str, Any]
+
+
+class BatchPublishError(Exception):
+    """Raised when some entries could not be delivered after every retry."""
+
+    def __init__(self, failed: List[Entry]):
+        super().__init__(f"{len(failed)} entr{'y' if len(failed) == 1 else 'ies'} could not be published.")
+        self.failed = failed
+
+
+class BatchPublisher:
+    """Buffers entries and flushes them in batches that fit the API limits.
+
+    send_batch receives a list of entries, each with a batch-unique Id, and
+    returns the service's Successful/Failed response. Entries the service
+    rejected for a transient reason, or every entry of a batch whose call
+    raised, are retried on their own with backoff. Sender faults are not
+    retried. Entries that never succeed are collected in `failed`.
+
+    Use it as a context manager so the last partial batch is flushed.
+    """
+
+    def __init__(
+        self,
+        send_batch: Callable[[List[Entry]], Dict[str, Any]],
+        size_of: Callable[[Entry], int],
+        max_attempts: int = 3,
+        backoff_seconds: float = 0.2,
+    ):
+        self.send_batch = send_batch
+        self.size_of = size_of
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.sent = 0
+        self.failed: List[Entry] = []
+        self._buffer: List[Entry] = []
+        self._buffer_bytes = 0
+
+    def __enter__(self) -> "BatchPublisher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
+    def add(self, entry: Entry) -> None:
+        size = self.size_of(entry)
+        if size > MAX_BATCH_BYTES:
+            raise ValueError(f"Entry of {size} bytes exceeds the {MAX_BATCH_BYTES}-byte batch limit.")
+        if len(self._buffer) == MAX_BATCH_ENTRIES or self._buffer_bytes + size > MAX_BATCH_BYTES:
+            self._send_buffer()
+        self._buffer.append(entry)
+        self._buffer_bytes += size
+
+    def flush(self) -> List[Entry]:
+        """Send whatever is buffered and return every entry that failed so far."""
+
+        if self._buffer:
+            self._send_buffer()
+        return self.failed
+
+    def _send_buffer(self) -> None:
+        batch, self._buffer, self._buffer_bytes = self._buffer, [], 0
+        for attempt in range(1, self.max_attempts + 1):
+            batch = self._send_once(batch, final=attempt == self.max_attempts)
+            if not batch:
+                return
+            time.sleep(self.backoff_seconds * 2 ** (attempt - 1))
+
+    def _send_once(self, batch: List[Entry], final: bool) -> List[Entry]:
+        """Send one batch and return the entries worth retrying."""
+
+        by_id = {str(index): entry for index, entry in enumerate(batch)}
+        try:
+            response = self.send_batch([{"Id": key, **entry} for key, entry in by_id.items()])
+        except (BotoCoreError, ClientError) as exc:
+            logger.warning("Batch of %s entries failed: %s", len(batch), exc)
+            return self._give_up(batch, str(exc)) if final else batch
+
+        self.sent += len(response.get("Successful", []))
+        retry = []
+        for failure in response.get("Failed", []):
+            entry = by_id[failure["Id"]]
+            if failure.get("SenderFault") or final:
+                self._give_up([entry], f"{failure.get('Code')}: {failure.get('Message', '')}")
+            else:
+                retry.append(entry)
+        return retry
+
+    def _give_up(self, entries: List[Entry], error: str) -> List[Entry]:
+        logger.error("Dropping %s batch entries: %s", len(entries), error)
+        self.failed.extend({**entry, "Error": error} for entry in entries)
+        return []
+
+
+def utf8_size(*values: str) -> int:
+    return sum(len(value.encode("utf-8")) for value in values if value)
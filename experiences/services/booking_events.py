@@ -0,0 +1,257 @@
+"""Consumer for booking events published to the SQS booking queue."""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.db import connections
+
+from . import aws_sqs
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH = 10
+# How long to wait for a worker to finish before receiving again while
+# some messages are in flight and the pool still has room.
+IDLE_POLL_SECONDS = 1.0
+# Extra read time on top of the long-poll wait, so an empty poll returns
+# before the HTTP read times out.
+LONG_POLL_READ_MARGIN = 10
+# Backoff after a failed receive, doubled per consecutive failure.
+RECEIVE_BACKOFF_SECONDS = 1.0
+MAX_RECEIVE_BACKOFF_SECONDS = 30.0
+
+
+def handle_booking_created(event: Dict[str, Any]) -> None:
+    logger.info(
+        "booking_created: booking=%s package=%s %s..%s guests=%s",
+        event.get("booking_id"),
+        event.get("package_code"),
+        event.get("start_date"),
+        event.get("end_date"),
+        event.get("num_guests"),
+    )
+
+
+HANDLERS: Dict[str, Callable[[Dict[str, Any]], None]] = {
+    "booking_created": handle_booking_created,
+}
+
+
+def dispatch_event(event: Dict[str, Any]) -> None:
+    """Route a decoded event to its handler; unknown types are logged and dropped."""
+
+    handler = HANDLERS.get(event.get("event_type"))
+    if handler is None:
+        logger.warning("No handler for booking event type %r; dropping.", event.get("event_type"))
+        return
+    handler(event)
+
+
+@dataclass
+class ConsumeStats:
+    received: int = 0
+    processed: int = 0
+    failed: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def throughput(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+
+class BookingEventConsumer:
+    """Long-polls the booking queue and processes messages on a worker pool.
+
+    Whenever workers are free the consumer receives up to that many more
+    messages (at most ten per call), so a slow message only holds its own
+    worker and max_workers may exceed the SQS batch size. Messages still
+    running are kept invisible with change_message_visibility_batch every
+    heartbeat_interval seconds. Successful messages are removed with
+    delete_message_batch as they finish. Failed ones are left to reappear
+    after their visibility timeout, so the queue's redrive policy decides
+    when they are dead-lettered.
+    """
+
+    def __init__(
+        self,
+        queue_url: str,
+        client=None,
+        handler: Callable[[Dict[str, Any]], None] = dispatch_event,
+        max_workers: int = MAX_BATCH,
+        wait_time_seconds: int = 20,
+        visibility_timeout: int = 30,
+        heartbeat_interval: Optional[float] = None,
+    ):
+        self.queue_url = queue_url
+        self.client = client or aws_sqs.get_sqs_client(read_timeout=wait_time_seconds + LONG_POLL_READ_MARGIN)
+        self.handler = handler
+        self.max_workers = max_workers
+        self.wait_time_seconds = wait_time_seconds
+        self.visibility_timeout = visibility_timeout
+        self.heartbeat_interval = heartbeat_interval or visibility_timeout / 2
+        self.stats = ConsumeStats()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sqs-consumer")
+        # future -> (message, monotonic time its visibility is next extended)
+        self._in_flight: Dict[Future, Tuple[Dict[str, Any], float]] = {}
+        self._receive_failures = 0
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def poll_once(self) -> int:
+        """Top the pool up from the queue and settle finished messages.
+
+        Returns how many messages arrived. With messages in flight the
+        receive does not long-poll, so finished ones are deleted and
+        running ones extended on time.
+        """
+
+        received = self._receive()
+        if len(self._in_flight) >= self.max_workers:
+            timeout = self._until_heartbeat()
+        elif received:
+            timeout = 0
+        else:
+            timeout = min(self._until_heartbeat(), IDLE_POLL_SECONDS)
+        self._settle(timeout)
+        return received
+
+    def drain(self) -> None:
+        """Wait for every message in flight to finish and settle it."""
+
+        while self._in_flight:
+            self._settle(self._until_heartbeat())
+
+    def run(
+        self,
+        max_messages: Optional[int] = None,
+        stop_when_empty: bool = False,
+        report: Optional[Callable[[ConsumeStats], None]] = None,
+        report_every: float = 30.0,
+    ) -> ConsumeStats:
+        last_report = time.monotonic()
+        try:
+            while max_messages is None or self.stats.received < max_messages:
+                received = self.poll_once()
+                if report and time.monotonic() - last_report >= report_every:
+                    report(self.stats)
+                    last_report = time.monotonic()
+                if not received and not self._in_flight and stop_when_empty:
+                    break
+            self.drain()
+        finally:
+            self.close()
+        return self.stats
+
+    def _receive(self) -> int:
+        free = self.max_workers - len(self._in_flight)
+        if free <= 0:
+            return 0
+        try:
+            response = self.client.receive_message(
+                QueueUrl=self.queue_url,
+                MaxNumberOfMessages=min(free, MAX_BATCH),
+                WaitTimeSeconds=0 if self._in_flight else self.wait_time_seconds,
+                VisibilityTimeout=self.visibility_timeout,
+            )
+        except (BotoCoreError, ClientError):
+            self._receive_failures += 1
+            delay = min(MAX_RECEIVE_BACKOFF_SECONDS, RECEIVE_BACKOFF_SECONDS * 2 ** (self._receive_failures - 1))
+            logger.warning("Could not receive booking events; retrying in %.1fs.", delay, exc_info=True)
+            time.sleep(delay)
+            return 0
+        self._receive_failures = 0
+        messages = response.get("Messages", [])
+        self.stats.received += len(messages)
+        heartbeat_at = time.monotonic() + self.heartbeat_interval
+        for message in messages:
+            self._in_flight[self._executor.submit(self._process, message)] = (message, heartbeat_at)
+        return len(messages)
+
+    def _settle(self, timeout: float) -> None:
+        """Delete messages that finished within timeout and extend those due a heartbeat."""
+
+        if not self._in_flight:
+            return
+        done, _ = wait(self._in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+        succeeded: List[Dict[str, Any]] = []
+        for future in done:
+            message, _heartbeat_at = self._in_flight.pop(future)
+            if future.result():
+                succeeded.append(message)
+            else:
+                self.stats.failed += 1
+        self.stats.processed += len(succeeded)
+        self._delete(succeeded)
+
+        now = time.monotonic()
+        due = [future for future, (_message, heartbeat_at) in self._in_flight.items() if heartbeat_at <= now]
+        if due:
+            self._extend_visibility([self._in_flight[future][0] for future in due])
+            for future in due:
+                self._in_flight[future] = (self._in_flight[future][0], now + self.heartbeat_interval)
+
+    def _until_heartbeat(self) -> float:
+        if not self._in_flight:
+            return 0.0
+        next_heartbeat = min(heartbeat_at for _message, heartbeat_at in self._in_flight.values())
+        return max(0.0, next_heartbeat - time.monotonic())
+
+    def _process(self, message: Dict[str, Any]) -> bool:
+        try:
+            self.handler(json.loads(message["Body"]))
+            return True
+        except Exception:
+            logger.exception("Failed to process booking event %s", message.get("MessageId"))
+            return False
+        finally:
+            connections.close_all()
+
+    def _extend_visibility(self, messages: List[Dict[str, Any]]) -> None:
+        for chunk in _chunks(messages):
+            try:
+                response = self.client.change_message_visibility_batch(
+                    QueueUrl=self.queue_url,
+                    Entries=[
+                        {
+                            "Id": str(index),
+                            "ReceiptHandle": message["ReceiptHandle"],
+                            "VisibilityTimeout": self.visibility_timeout,
+                        }
+                        for index, message in enumerate(chunk)
+                    ],
+                )
+            except ClientError:
+                logger.warning("Could not extend visibility of %s booking events", len(chunk), exc_info=True)
+                continue
+            for failure in response.get("Failed", []):
+                logger.warning("Could not extend visibility of booking event: %s", failure)
+
+    def _delete(self, messages: List[Dict[str, Any]]) -> None:
+        for chunk in _chunks(messages):
+            try:
+                response = self.client.delete_message_batch(
+                    QueueUrl=self.queue_url,
+                    Entries=[
+                        {"Id": str(index), "ReceiptHandle": message["ReceiptHandle"]}
+                        for index, message in enumerate(chunk)
+                    ],
+                )
+            except ClientError:
+                logger.warning("Could not delete %s booking events", len(chunk), exc_info=True)
+                continue
+            for failure in response.get("Failed", []):
+                logger.warning("Could not delete booking event: %s", failure)
+
+
+def _chunks(items: List[Any], size: int = MAX_BATCH):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
@@ -0,0 +1,125 @@
+"""Transactional outbox for post-booking AWS side effects."""
+
+from __future__ import annotations
+
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, Dict, List
+
+from django.db import connections
+from django.utils import timezone
+
+from ..models import AdventureBookingModel, BookingOutboxEvent
+from . import aws_sns, aws_sqs, dynamodb_repository
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 8
+BASE_BACKOFF_SECONDS = 5
+MAX_BACKOFF_SECONDS = 15 * 60
+# How long a dispatcher owns a claimed event before another may retry it.
+CLAIM_LEASE_SECONDS = 5 * 60
+
+HANDLERS: Dict[str, Callable[[AdventureBookingModel], None]] = {
+    BookingOutboxEvent.DYNAMODB: lambda booking: dynamodb_repository.save_booking_to_dynamodb(
+        booking, raise_errors=True
+    ),
+    BookingOutboxEvent.SQS: lambda booking: aws_sqs.send_booking_created_message(
+        booking, raise_errors=True
+    ),
+    BookingOutboxEvent.SNS: lambda booking: aws_sns.publish_booking_confirmation(
+        booking, raise_errors=True
+    ),
+}
+
+
+def enqueue_booking_side_effects(booking: AdventureBookingModel) -> List[BookingOutboxEvent]:
+    """Record every side effect of a new booking; call inside its transaction."""
+
+    return BookingOutboxEvent.objects.bulk_create(
+        [BookingOutboxEvent(booking=booking, kind=kind) for kind in HANDLERS]
+    )
+
+
+def claim_due_events(limit: int) -> List[BookingOutboxEvent]:
+    """Lease up to `limit` due events to this dispatcher.
+
+    Each claim is a conditional update on the event's next_attempt_at, so
+    several dispatchers can run side by side without delivering an event
+    twice, and events held by a crashed dispatcher come back once their
+    lease runs out.
+    """
+
+    now = timezone.now()
+    due = BookingOutboxEvent.objects.filter(
+        status=BookingOutboxEvent.PENDING, next_attempt_at__lte=now
+    ).order_by("next_attempt_at", "pk")[:limit]
+
+    lease_until = now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+    claimed = []
+    for event in due:
+        won = BookingOutboxEvent.objects.filter(
+            pk=event.pk, status=BookingOutboxEvent.PENDING, next_attempt_at=event.next_attempt_at
+        ).update(next_attempt_at=lease_until)
+        if won:
+            event.next_attempt_at = lease_until
+            claimed.append(event)
+    return claimed
+
+
+def deliver(event: BookingOutboxEvent, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> bool:
+    """Run one claimed event's handler and record the outcome."""
+
+    event.attempts += 1
+    try:
+        booking = AdventureBookingModel.objects.select_related("package").get(pk=event.booking_id)
+        HANDLERS[event.kind](booking)
+    except Exception as exc:
+        event.last_error = f"{type(exc).__name__}: {exc}"
+        if event.attempts >= max_attempts:
+            event.status = BookingOutboxEvent.DEAD
+            logger.error(
+                "Dead-lettered %s after %s attempts: %s", event, event.attempts, event.last_error
+            )
+        else:
+            event.next_attempt_at = timezone.now() + backoff_delay(event.attempts)
+            logger.warning("Delivery of %s failed (attempt %s); will retry.", event, event.attempts)
+        event.save(update_fields=["attempts", "status", "next_attempt_at", "last_error"])
+        return False
+
+    event.status = BookingOutboxEvent.DELIVERED
+    event.delivered_at = timezone.now()
+    event.last_error = ""
+    event.save(update_fields=["attempts", "status", "delivered_at", "last_error"])
+    return True
+
+
+def dispatch_due_events(
+    batch_size: int = 50, max_workers: int = 8, max_attempts: int = DEFAULT_MAX_ATTEMPTS
+) -> Dict[str, int]:
+    """Claim one batch of due events and deliver them concurrently."""
+
+    events = claim_due_events(batch_size)
+    if not events:
+        return {"delivered": 0, "failed": 0}
+
+    def run(event: BookingOutboxEvent) -> bool:
+        try:
+            return deliver(event, max_attempts)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="outbox") as executor:
+        results = list(executor.map(run, events))
+
+    delivered = sum(results)
+    return {"delivered": delivered, "failed": len(results) - delivered}
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    """Exponential backoff with jitter, capped at MAX_BACKOFF_SECONDS."""
+
+    ceiling = min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** (attempts - 1))
+    return timedelta(seconds=random.uniform(ceiling / 2, ceiling))
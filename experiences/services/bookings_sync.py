@@ -0,0 +1,198 @@
+"""Bulk copy and reconciliation of ORM bookings into the DynamoDB bookings table."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from ..models import AdventureBookingModel
+from . import aws_clients
+from .dynamodb_repository import _serialize_booking, get_dynamodb_client
+
+logger = logging.getLogger(__name__)
+
+# DynamoDB limits: 25 puts per BatchWriteItem, 100 keys per BatchGetItem.
+WRITE_BATCH = 25
+GET_BATCH = 100
+DEFAULT_RANGE_SIZE = 500
+MAX_ATTEMPTS = 6
+BASE_BACKOFF_SECONDS = 0.1
+
+Item = Dict[str, Any]
+
+
+class UnprocessedItemsError(Exception):
+    """Raised when DynamoDB keeps returning unprocessed items or keys."""
+
+
+@dataclass
+class SyncStats:
+    ranges: int = 0
+    diverged: int = 0
+    written: int = 0
+
+
+def iter_booking_ranges(range_size: int = DEFAULT_RANGE_SIZE) -> Iterator[Tuple[int, List[Item]]]:
+    """Yield (range number, serialized bookings) for consecutive primary-key ranges.
+
+    Bookings are streamed with .iterator(), so only one range is held in
+    memory at a time. Range n covers primary keys [n * range_size, (n + 1) * range_size).
+    """
+
+    bookings = AdventureBookingModel.objects.select_related("package").order_by("pk")
+    current, items = None, []
+    for booking in bookings.iterator(chunk_size=range_size):
+        number = booking.pk // range_size
+        if number != current and items:
+            yield current, items
+            items = []
+        current = number
+        items.append(_serialize_booking(booking))
+    if items:
+        yield current, items
+
+
+def backfill(workers: int = 4, range_size: int = DEFAULT_RANGE_SIZE) -> SyncStats:
+    """Write every ORM booking to DynamoDB with parallel BatchWriteItem calls."""
+
+    table_name = _table_name()
+    stats = SyncStats()
+
+    def write(range_items: Tuple[int, List[Item]]) -> int:
+        return write_items(table_name, range_items[1])
+
+    for written in _bounded_map(write, iter_booking_ranges(range_size), workers):
+        stats.ranges += 1
+        stats.written += written
+    return stats
+
+
+def reconcile(workers: int = 4, range_size: int = DEFAULT_RANGE_SIZE) -> SyncStats:
+    """Rewrite only the key ranges whose DynamoDB copy differs from the ORM.
+
+    Each range's ORM rows are hashed and compared with a hash of the same
+    keys read back through BatchGetItem. Items deleted from the ORM are not
+    removed from DynamoDB; bookings are cancelled, not deleted.
+    """
+
+    table_name = _table_name()
+    stats = SyncStats()
+
+    def check(range_items: Tuple[int, List[Item]]) -> int:
+        number, items = range_items
+        stored = fetch_items(table_name, [{"booking_id": item["booking_id"]} for item in items])
+        if range_digest(items) == range_digest(stored):
+            return -1
+        logger.info("Booking range %s diverged; rewriting %s items.", number, len(items))
+        return write_items(table_name, items)
+
+    for written in _bounded_map(check, iter_booking_ranges(range_size), workers):
+        stats.ranges += 1
+        if written >= 0:
+            stats.diverged += 1
+            stats.written += written
+    return stats
+
+
+def write_items(table_name: str, items: List[Item]) -> int:
+    """Put items in batches of 25, retrying UnprocessedItems with backoff."""
+
+    client = _client()
+    for start in range(0, len(items), WRITE_BATCH):
+        requests = [{"PutRequest": {"Item": item}} for item in items[start : start + WRITE_BATCH]]
+        _with_retries(
+            lambda pending: client.batch_write_item(RequestItems={table_name: pending}).get(
+                "UnprocessedItems", {}
+            ).get(table_name, []),
+            requests,
+        )
+    return len(items)
+
+
+def fetch_items(table_name: str, keys: List[Item]) -> List[Item]:
+    """Read items by key in batches of 100, retrying UnprocessedKeys with backoff."""
+
+    client = _client()
+    found: List[Item] = []
+
+    def get(pending: List[Item]) -> List[Item]:
+        response = client.batch_get_item(RequestItems={table_name: {"Keys": pending}})
+        found.extend(response.get("Responses", {}).get(table_name, []))
+        return response.get("UnprocessedKeys", {}).get(table_name, {}).get("Keys", [])
+
+    for start in range(0, len(keys), GET_BATCH):
+        _with_retries(get, keys[start : start + GET_BATCH])
+    return found
+
+
+def range_digest(items: Iterable[Item]) -> str:
+    """Hash a set of booking items independently of order and number types."""
+
+    digest = hashlib.sha256()
+    for item in sorted(items, key=lambda item: item["booking_id"]):
+        canonical = {key: _canonical(value) for key, value in item.items()}
+        digest.update(json.dumps(canonical, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _canonical(value: Any) -> Any:
+    # DynamoDB hands numbers back as Decimal without trailing zeros.
+    if isinstance(value, (int, Decimal)) and not isinstance(value, bool):
+        return format(Decimal(value).normalize(), "f")
+    return value
+
+
+def _with_retries(send: Callable[[List[Item]], List[Item]], pending: List[Item]) -> None:
+    for attempt in range(MAX_ATTEMPTS):
+        pending = send(pending)
+        if not pending:
+            return
+        time.sleep(BASE_BACKOFF_SECONDS * 2**attempt)
+    raise UnprocessedItemsError(f"{len(pending)} items still unprocessed after {MAX_ATTEMPTS} attempts.")
+
+
+def _bounded_map(fn: Callable[[Any], Any], iterable: Iterable[Any], workers: int) -> Iterator[Any]:
+    """Like executor.map, but keeps at most 2 * workers inputs in flight.
+
+    The pool outlives the call, so its threads keep their DynamoDB
+    resources from one sync to the next.
+    """
+
+    executor = aws_clients.executor("ddb-sync", workers)
+    pending = set()
+    try:
+        for value in iterable:
+            pending.add(executor.submit(fn, value))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from (future.result() for future in done)
+        for future in list(pending):
+            pending.discard(future)
+            yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        wait(pending)
+
+
+def _table_name() -> str:
+    table_name = getattr(settings, "DDB_BOOKINGS_TABLE_NAME", "")
+    if not table_name:
+        raise ImproperlyConfigured("DDB_BOOKINGS_TABLE_NAME is not set.")
+    return table_name
+
+
+def _client():
+    resource = get_dynamodb_client()
+    if resource is None:
+        raise ImproperlyConfigured("AWS is disabled (USE_AWS=0).")
+    return resource
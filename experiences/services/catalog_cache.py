@@ -0,0 +1,239 @@
+"""Two-tier cache for package catalog reads.
+
+Lookups go to a per-process LocMem cache first and then to a file-based
+cache shared by all workers on the host. Both tiers are regular Django
+cache aliases, so TTLs and size-bounded culling come from their settings.
+
+Entries stay fresh for CATALOG_CACHE_TTL seconds and may then be served
+stale for CATALOG_CACHE_STALE_TTL more. Each entry also records the
+catalog version it was loaded under; once catalog_version reports a newer
+stamp, entries from older versions are treated as misses on every node.
+Refreshes are single-flight per process: one caller reloads a key while
+the others reuse the stale value or wait for that caller's result.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+from . import catalog_version
+
+logger = logging.getLogger(__name__)
+
+LOCAL_ALIAS = "catalog_local"
+SHARED_ALIAS = "catalog_shared"
+
+ALL_PACKAGES_KEY = "packages:all"
+BY_CATEGORY_KEY = "packages:by-category"
+
+# Stored in place of a value when the loader found nothing, so unknown
+# package codes do not reach the backing store on every request.
+MISSING = "__catalog_missing__"
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    value: Any
+    fresh_until: float
+    version: int = 0
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.fresh_until
+
+    @property
+    def result(self) -> Any:
+        return None if self.value == MISSING else self.value
+
+
+class _Flight:
+    """An in-progress load that other callers for the same key can wait on."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+_flights: Dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+
+
+def package_key(package_code: str) -> str:
+    return f"package:{package_code}"
+
+
+def lookup(key: str, version: Optional[int] = None) -> Optional[CacheEntry]:
+    """Return the cached entry for key, fresh or stale, or None on a miss.
+
+    A stale local entry is checked against the shared tier first, since
+    another worker may already have refreshed it. With a version, entries
+    recorded under any other catalog version count as misses.
+    """
+
+    local = _matching(caches[LOCAL_ALIAS].get(key), version)
+    if local is not None and local.is_fresh:
+        return local
+
+    try:
+        shared = _matching(caches[SHARED_ALIAS].get(key), version)
+    except OSError:
+        logger.warning("Shared catalog cache unavailable; reading through.", exc_info=True)
+        return local
+    if shared is None or (local is not None and shared.fresh_until <= local.fresh_until):
+        return local
+
+    caches[LOCAL_ALIAS].set(key, shared, _local_timeout(shared))
+    return shared
+
+
+def store(key: str, value: Any, version: int = 0) -> CacheEntry:
+    """Store a value in both tiers; None is stored as a negative entry."""
+
+    if value is None:
+        fresh_for, keep_for = _negative_timeout(), _negative_timeout()
+        value = MISSING
+    else:
+        fresh_for = _fresh_timeout()
+        keep_for = fresh_for + _stale_timeout()
+
+    entry = CacheEntry(value=value, fresh_until=time.time() + fresh_for, version=version)
+    caches[LOCAL_ALIAS].set(key, entry, _local_timeout(entry))
+    try:
+        caches[SHARED_ALIAS].set(key, entry, keep_for)
+    except OSError:
+        logger.warning("Shared catalog cache unavailable; not storing %s.", key, exc_info=True)
+    return entry
+
+
+def get_or_load(key: str, loader: Callable[[], Any]) -> Any:
+    """Return the cached value for key, calling loader when it is missing or stale.
+
+    A None result is cached negatively and returned as None. Empty results
+    are returned but not cached, so a failed backend read is retried.
+    """
+
+    version = catalog_version.current().version
+    entry = lookup(key, version)
+    if entry is not None and entry.is_fresh:
+        return entry.result
+
+    if entry is not None and _serve_stale_while_revalidating():
+        _refresh_in_background(key, loader, version)
+        return entry.result
+
+    flight, leader = _join_flight(key)
+    if leader:
+        return _run_flight(key, loader, flight, version)
+    if entry is not None:
+        return entry.result
+
+    flight.done.wait()
+    if flight.error is not None:
+        raise flight.error
+    return flight.value
+
+
+def invalidate(*keys: str) -> None:
+    for key in keys:
+        caches[LOCAL_ALIAS].delete(key)
+        try:
+            caches[SHARED_ALIAS].delete(key)
+        except OSError:
+            logger.warning("Shared catalog cache unavailable; could not drop %s.", key, exc_info=True)
+
+
+def invalidate_package(package_code: str, bump_version: bool = True) -> None:
+    """Drop one package and the catalog listings that include it.
+
+    After an upstream change the catalog version is bumped too, so other
+    nodes drop theirs once they next read the stamp. Pass
+    bump_version=False when only this node's copy was out of date.
+    """
+
+    invalidate(package_key(package_code), ALL_PACKAGES_KEY, BY_CATEGORY_KEY)
+    if bump_version:
+        catalog_version.bump()
+
+
+def clear() -> None:
+    caches[LOCAL_ALIAS].clear()
+    caches[SHARED_ALIAS].clear()
+
+
+def _join_flight(key: str):
+    with _flights_lock:
+        flight = _flights.get(key)
+        if flight is not None:
+            return flight, False
+        flight = _flights[key] = _Flight()
+        return flight, True
+
+
+def _run_flight(key: str, loader: Callable[[], Any], flight: _Flight, version: int = 0) -> Any:
+    try:
+        value = loader()
+        if value is None or value:
+            store(key, value, version)
+        flight.value = value
+        return value
+    except BaseException as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+def _refresh_in_background(key: str, loader: Callable[[], Any], version: int = 0) -> None:
+    flight, leader = _join_flight(key)
+    if not leader:
+        return
+
+    def refresh():
+        try:
+            _run_flight(key, loader, flight, version)
+        except Exception:
+            logger.exception("Background refresh of %s failed; serving stale data.", key)
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=refresh, name=f"catalog-refresh-{key}", daemon=True).start()
+
+
+def _matching(entry: Optional[CacheEntry], version: Optional[int]) -> Optional[CacheEntry]:
+    if entry is None or version is None or entry.version == version:
+        return entry
+    return None
+
+
+def _serve_stale_while_revalidating() -> bool:
+    return getattr(settings, "CATALOG_CACHE_STALE_WHILE_REVALIDATE", True)
+
+
+def _fresh_timeout() -> int:
+    return caches[SHARED_ALIAS].default_timeout
+
+
+def _stale_timeout() -> int:
+    return getattr(settings, "CATALOG_CACHE_STALE_TTL", 600)
+
+
+def _negative_timeout() -> int:
+    return getattr(settings, "CATALOG_CACHE_NEGATIVE_TTL", 60)
+
+
+def _local_timeout(entry: CacheEntry) -> int:
+    remaining = int(entry.fresh_until - time.time()) + 1
+    if entry.value != MISSING:
+        remaining += _stale_timeout()
+    return max(1, min(caches[LOCAL_ALIAS].default_timeout, remaining))
@@ -0,0 +1,172 @@
+"""Read-only catalog snapshot file served to web workers without AWS reads.
+
+export_catalog_snapshot writes the whole catalog as one compact JSON
+document to CATALOG_SNAPSHOT_PATH. Workers load it on first use (or at
+startup via AppConfig.ready) and keep it in memory. At most every
+CATALOG_SNAPSHOT_CHECK_INTERVAL seconds they stat the file and reload it
+when a new one has been swapped in, so publishing a snapshot is just
+another export. Image URLs are stored unsigned and presigned on read.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from .aws_s3 import resolve_image_srcset, resolve_image_url
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+PackageDTO = Dict[str, object]
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    version: str
+    generated_at: str
+    packages: Tuple[PackageDTO, ...]
+    by_code: Dict[str, PackageDTO] = field(repr=False)
+
+    @classmethod
+    def from_document(cls, document: dict) -> "Snapshot":
+        if document.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported catalog snapshot format {document.get('format')!r}")
+        packages = tuple(document["packages"])
+        return cls(
+            version=document["version"],
+            generated_at=document["generated_at"],
+            packages=packages,
+            by_code={package["package_code"]: package for package in packages},
+        )
+
+    def all_packages(self) -> List[PackageDTO]:
+        return [_with_resolved_image(package) for package in self.packages]
+
+    def package(self, package_code: str) -> Optional[PackageDTO]:
+        package = self.by_code.get(package_code)
+        return _with_resolved_image(package) if package else None
+
+    def packages_by_category(self, categories: Iterable[str], limit: int) -> Dict[str, List[PackageDTO]]:
+        ordered = sorted(self.packages, key=lambda package: package["package_code"])
+        return {
+            category: [_with_resolved_image(p) for p in ordered if p["category"] == category][:limit]
+            for category in categories
+        }
+
+
+class _State:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.snapshot: Optional[Snapshot] = None
+        self.signature: Optional[Tuple[int, int, int]] = None
+        self.checked_at = 0.0
+
+
+_state = _State()
+
+
+def snapshot_path() -> str:
+    return getattr(settings, "CATALOG_SNAPSHOT_PATH", "")
+
+
+def export(packages: Iterable[PackageDTO], path: Optional[str] = None) -> Snapshot:
+    """Write packages to a new snapshot file and atomically swap it into place."""
+
+    path = path or snapshot_path()
+    if not path:
+        raise ValueError("CATALOG_SNAPSHOT_PATH is not set.")
+
+    packages = sorted(packages, key=lambda package: str(package.get("package_code")))
+    body = json.dumps(packages, sort_keys=True, separators=(",", ":"), default=str)
+    document = {
+        "format": FORMAT_VERSION,
+        "version": hashlib.sha256(body.encode("utf-8")).hexdigest()[:16],
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "packages": json.loads(body),
+    }
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".catalog-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(document, handle, separators=(",", ":"))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return Snapshot.from_document(document)
+
+
+def current() -> Optional[Snapshot]:
+    """Return the loaded snapshot, reloading it if the file was replaced.
+
+    Returns None when no snapshot is configured or none has been exported
+    yet. A file that fails to parse is logged and the previous snapshot
+    keeps being served.
+    """
+
+    path = snapshot_path()
+    if not path:
+        return None
+
+    now = time.monotonic()
+    if _state.snapshot is not None and now - _state.checked_at < _check_interval():
+        return _state.snapshot
+
+    with _state.lock:
+        if _state.snapshot is not None and now - _state.checked_at < _check_interval():
+            return _state.snapshot
+        _state.checked_at = now
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return _state.snapshot
+
+        signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if signature != _state.signature:
+            try:
+                with open(path, encoding="utf-8") as handle:
+                    _state.snapshot = Snapshot.from_document(json.load(handle))
+                logger.info("Loaded catalog snapshot %s from %s", _state.snapshot.version, path)
+            except (OSError, ValueError, KeyError) as exc:
+                logger.error("Ignoring unreadable catalog snapshot %s: %s", path, exc)
+            _state.signature = signature
+        return _state.snapshot
+
+
+def reset() -> None:
+    """Forget the loaded snapshot; the next current() call reads the file again."""
+
+    with _state.lock:
+        _state.snapshot = None
+        _state.signature = None
+        _state.checked_at = 0.0
+
+
+def _check_interval() -> float:
+    return getattr(settings, "CATALOG_SNAPSHOT_CHECK_INTERVAL", 5)
+
+
+def _with_resolved_image(package: PackageDTO) -> PackageDTO:
+    return {
+        **package,
+        "image_url": resolve_image_url(package.get("image_url")),
+        "image_key": package.get("image_url", ""),
+        "image_srcset": resolve_image_srcset(package.get("image_renditions")),
+    }
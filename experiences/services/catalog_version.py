@@ -0,0 +1,169 @@
+"""Cluster-wide catalog version stamp used to invalidate cached catalog data.
+
+Every catalog mutation calls bump(); a bulk job wraps its writes in
+batched() so it bumps once at the end instead of per item. With DynamoDB packages enabled the
+stamp is a single item in the packages table, so every node sees it;
+locally it is the CatalogVersion row. Readers call current(), which goes
+to the store at most once every CATALOG_VERSION_CHECK_INTERVAL seconds
+per process and otherwise returns the last stamp seen.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import CatalogVersion
+from . import aws_enabled, dynamodb_repository
+
+logger = logging.getLogger(__name__)
+
+LOCAL_ROW_ID = 1
+
+
+@dataclass(frozen=True)
+class Stamp:
+    version: int
+    changed_at: Optional[datetime]
+
+
+UNKNOWN = Stamp(version=0, changed_at=None)
+
+_lock = threading.Lock()
+_stamp: Stamp = UNKNOWN
+_checked_at: Optional[float] = None
+# Set inside batched(): True once a bump has been deferred.
+_pending_bump: ContextVar[Optional[bool]] = ContextVar("pending_catalog_bump", default=None)
+
+
+def current() -> Stamp:
+    """Return the catalog stamp, re-reading it when the local copy has aged out.
+
+    A failed read is logged and the last known stamp is returned, so a
+    store outage degrades to TTL-only cache expiry rather than errors.
+    """
+
+    global _stamp, _checked_at
+    now = time.monotonic()
+    if _checked_at is not None and now - _checked_at < _check_interval():
+        return _stamp
+
+    with _lock:
+        if _checked_at is not None and now - _checked_at < _check_interval():
+            return _stamp
+        _checked_at = now
+        try:
+            _stamp = _read()
+        except Exception:
+            logger.warning("Could not read the catalog version; keeping v%s.", _stamp.version, exc_info=True)
+        return _stamp
+
+
+def bump() -> Stamp:
+    """Record a catalog change and return the new stamp."""
+
+    global _stamp, _checked_at
+    if _pending_bump.get() is not None:
+        _pending_bump.set(True)
+        return _stamp
+
+    changed_at = timezone.now()
+    try:
+        stamp = _bump_dynamodb(changed_at) if _use_dynamodb() else _bump_local(changed_at)
+    except Exception:
+        logger.exception("Could not bump the catalog version; caches expire by TTL only.")
+        return _stamp
+
+    with _lock:
+        if stamp.version >= _stamp.version:
+            _stamp = stamp
+        _checked_at = time.monotonic()
+    return stamp
+
+
+@contextmanager
+def batched() -> Iterator[None]:
+    """Collapse the bump() calls made in the block into one at its end.
+
+    Nothing is bumped when the block made no bump() call. Nested blocks
+    defer to the outermost one.
+    """
+
+    if _pending_bump.get() is not None:
+        yield
+        return
+
+    token = _pending_bump.set(False)
+    try:
+        yield
+    finally:
+        pending = _pending_bump.get()
+        _pending_bump.reset(token)
+        if pending:
+            bump()
+
+
+def reset() -> None:
+    """Forget the cached stamp; the next current() call reads the store."""
+
+    global _stamp, _checked_at
+    with _lock:
+        _stamp = UNKNOWN
+        _checked_at = None
+
+
+def _read() -> Stamp:
+    if _use_dynamodb():
+        item = dynamodb_repository._package_table().get_item(
+            Key={"package_id": dynamodb_repository.CATALOG_VERSION_ITEM_ID},
+            ProjectionExpression="version, changed_at",
+        ).get("Item")
+        return _stamp_from_item(item) if item else UNKNOWN
+
+    row = CatalogVersion.objects.filter(pk=LOCAL_ROW_ID).values_list("version", "changed_at").first()
+    return Stamp(*row) if row else UNKNOWN
+
+
+def _bump_dynamodb(changed_at: datetime) -> Stamp:
+    response = dynamodb_repository._package_table().update_item(
+        Key={"package_id": dynamodb_repository.CATALOG_VERSION_ITEM_ID},
+        UpdateExpression="ADD version :one SET changed_at = :changed_at",
+        ExpressionAttributeValues={":one": 1, ":changed_at": changed_at.isoformat()},
+        ReturnValues="ALL_NEW",
+    )
+    return _stamp_from_item(response["Attributes"])
+
+
+def _bump_local(changed_at: datetime) -> Stamp:
+    updated = CatalogVersion.objects.filter(pk=LOCAL_ROW_ID).update(
+        version=F("version") + 1, changed_at=changed_at
+    )
+    if not updated:
+        CatalogVersion.objects.get_or_create(pk=LOCAL_ROW_ID, defaults={"version": 1, "changed_at": changed_at})
+    return Stamp(*CatalogVersion.objects.values_list("version", "changed_at").get(pk=LOCAL_ROW_ID))
+
+
+def _stamp_from_item(item: dict) -> Stamp:
+    changed_at = item.get("changed_at")
+    return Stamp(
+        version=int(item.get("version", 0)),
+        changed_at=datetime.fromisoformat(changed_at) if changed_at else None,
+    )
+
+
+def _use_dynamodb() -> bool:
+    return aws_enabled() and bool(getattr(settings, "DDB_PACKAGES_TABLE_NAME", ""))
+
+
+def _check_interval() -> float:
+    return getattr(settings, "CATALOG_VERSION_CHECK_INTERVAL", 3)
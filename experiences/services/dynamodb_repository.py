@@ -3,19 +3,50 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict, List, Optional
+import queue
+import threading
+from concurrent.futures import wait
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional
 from decimal import Decimal
 
-import boto3
+from boto3.dynamodb.conditions import Attr, Key
 from botocore.exceptions import BotoCoreError, ClientError
 from django.conf import settings
 
 from ..models import AdventureBookingModel
-from . import aws_enabled, log_local_fallback
-from .aws_s3 import resolve_image_url
+from . import aws_clients, aws_enabled, log_local_fallback
+from .aws_s3 import resolve_image_srcset, resolve_image_url
 
 logger = logging.getLogger(__name__)
 
+PACKAGES_CATEGORY_INDEX = "category-index"
+# Catalog version stamp kept in the packages table; never a real package.
+CATALOG_VERSION_ITEM_ID = "__catalog_version__"
+BOOKINGS_PACKAGE_INDEX = "package_id-start_date-index"
+# Shared by every request's category queries, four per page view.
+CATEGORY_QUERY_WORKERS = 16
+
+# Attributes read by _build_package_dto; scans fetch nothing else.
+PACKAGE_ATTRIBUTES = (
+    "package_id",
+    "package_code",
+    "category",
+    "name",
+    "description",
+    "location",
+    "region",
+    "base_price_per_night",
+    "base_price_per_person",
+    "min_nights",
+    "max_nights",
+    "max_guests",
+    "image_url",
+    "image_renditions",
+    "includes_meals",
+    "includes_guide",
+)
+
 
 def get_dynamodb_client():
     """Return a DynamoDB resource when AWS integration is active."""
@@ -24,8 +55,7 @@ def get_dynamodb_client():
         log_local_fallback("dynamodb")
         return None
 
-    region = getattr(settings, "AWS_REGION", None)
-    return boto3.resource("dynamodb", region_name=region)
+    return aws_clients.resource("dynamodb")
 
 
 def _serialize_booking(booking: AdventureBookingModel) -> Dict[str, Any]:
@@ -39,6 +69,7 @@ def _serialize_booking(booking: AdventureBookingModel) -> Dict[str, Any]:
 
     return {
         "booking_id": str(booking.id),
+        "package_id": booking.package.package_code,
         "package_code": booking.package.package_code,
         "package_name": booking.package.name,
         "category": booking.package.category,
@@ -50,8 +81,11 @@ def _serialize_booking(booking: AdventureBookingModel) -> Dict[str, Any]:
     }
 
 
-def save_booking_to_dynamodb(booking: AdventureBookingModel) -> None:
-    """Persist the booking to the configured DynamoDB table."""
+def save_booking_to_dynamodb(booking: AdventureBookingModel, raise_errors: bool = False) -> None:
+    """Persist the booking to the configured DynamoDB table.
+
+    AWS errors are logged and swallowed unless raise_errors is set.
+    """
 
     table_name = getattr(settings, "DDB_BOOKINGS_TABLE_NAME", "")
     if not table_name:
@@ -69,30 +103,60 @@ def save_booking_to_dynamodb(booking: AdventureBookingModel) -> None:
         logger.info("Stored booking %s in DynamoDB table %s", item["booking_id"], table_name)
     except (BotoCoreError, ClientError) as exc:
         logger.exception("Failed to save booking to DynamoDB: %s", exc)
+        if raise_errors:
+            raise
 
 
 def list_bookings_for_package(package_code: str) -> List[Dict[str, Any]]:
     """Fetch bookings for a given package from DynamoDB (best-effort)."""
 
+    try:
+        return list(iter_bookings_for_package(package_code))
+    except (BotoCoreError, ClientError) as exc:
+        logger.exception("Failed to fetch bookings from DynamoDB: %s", exc)
+        return []
+
+
+def iter_bookings_for_package(
+    package_code: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    page_size: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Yield a package's bookings from a paginated query on the package GSI.
+
+    With start_date and end_date only bookings overlapping [start_date,
+    end_date) are returned: the index sort key bounds start_date and a
+    filter drops stays that ended before the range. AWS errors are raised
+    to the caller.
+    """
+
     table_name = getattr(settings, "DDB_BOOKINGS_TABLE_NAME", "")
     if not table_name:
         logger.warning("DDB_BOOKINGS_TABLE_NAME not set; cannot query DynamoDB.")
-        return []
+        return
 
     client = get_dynamodb_client()
     if not client:
-        return []
+        return
+
+    key_condition = Key("package_id").eq(package_code)
+    if end_date is not None:
+        key_condition &= Key("start_date").lt(end_date.isoformat())
+    kwargs: Dict[str, Any] = {"IndexName": BOOKINGS_PACKAGE_INDEX, "KeyConditionExpression": key_condition}
+    if start_date is not None:
+        kwargs["FilterExpression"] = Attr("end_date").gt(start_date.isoformat())
+    if page_size:
+        kwargs["Limit"] = page_size
 
     table = client.Table(table_name)
-    try:
-        response = table.scan(
-            FilterExpression="package_code = :pkg",
-            ExpressionAttributeValues={":pkg": package_code},
-        )
-        return response.get("Items", [])
-    except (BotoCoreError, ClientError) as exc:
-        logger.exception("Failed to fetch bookings from DynamoDB: %s", exc)
-        return []
+    while True:
+        response = table.query(**kwargs)
+        yield from response.get("Items", [])
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
 
 
 def _package_table():
@@ -132,11 +196,11 @@ def _safe_bool(value) -> bool:
     return bool(value)
 
 
-def _build_package_dto(item: Dict[str, Any]) -> Dict[str, Any]:
+def _build_package_dto(item: Dict[str, Any], resolve_images: bool = True) -> Dict[str, Any]:
     if not item:
         return {}
 
-    image_url = resolve_image_url(item.get("image_url"))
+    image_url = resolve_image_url(item.get("image_url")) if resolve_images else item.get("image_url", "")
     dto = {
         "package_code": item.get("package_id") or item.get("package_code"),
         "category": item.get("category", ""),
@@ -149,30 +213,175 @@ def _build_package_dto(item: Dict[str, Any]) -> Dict[str, Any]:
         "max_nights": _safe_int(item.get("max_nights"), 7),
         "max_guests": _safe_int(item.get("max_guests"), 4),
         "image_url": image_url,
+        "image_key": item.get("image_url", ""),
+        "image_renditions": _image_renditions(item.get("image_renditions")),
         "includes_meals": _safe_bool(item.get("includes_meals", False)),
         "includes_guide": _safe_bool(item.get("includes_guide", False)),
     }
+    if resolve_images:
+        dto["image_srcset"] = resolve_image_srcset(dto["image_renditions"])
     return dto
 
 
+def _image_renditions(value) -> Dict[str, List[Dict[str, Any]]]:
+    """Normalize the Lambda's rendition map: int widths, narrowest first."""
+
+    if not isinstance(value, dict):
+        return {}
+    return {
+        fmt: sorted(
+            ({"width": _safe_int(item.get("width"), 0), "key": item.get("key", "")} for item in items or []),
+            key=lambda item: item["width"],
+        )
+        for fmt, items in value.items()
+    }
+
+
 def list_packages_from_dynamodb() -> List[Dict[str, Any]]:
+    try:
+        return list(iter_packages_from_dynamodb())
+    except (BotoCoreError, ClientError) as exc:
+        logger.exception("Failed to scan packages table: %s", exc)
+        return []
+
+
+def iter_packages_from_dynamodb(
+    segments: Optional[int] = None, page_size: Optional[int] = None, resolve_images: bool = True
+) -> Iterator[Dict[str, Any]]:
+    """Yield package DTOs from a fully paginated, projected scan.
+
+    With more than one segment the table is read as a DynamoDB parallel
+    scan on a thread pool. Pages are handed over through a small bounded
+    queue, so memory stays flat however large the catalog grows. AWS
+    errors are raised to the caller. With resolve_images off, image_url is
+    the stored S3 key or URL rather than a presigned link.
+    """
+
+    if not _package_table():
+        return
+
+    segments = segments or getattr(settings, "DDB_SCAN_SEGMENTS", 1)
+    if segments <= 1:
+        for items in _scan_pages(None, page_size):
+            yield from _package_dtos(items, resolve_images)
+        return
+
+    yield from _parallel_scan(segments, page_size, resolve_images)
+
+
+def _package_projection() -> Dict[str, Any]:
+    names = {f"#p{index}": attribute for index, attribute in enumerate(PACKAGE_ATTRIBUTES)}
+    return {
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names,
+    }
+
+
+def _scan_pages(segment: Optional[tuple], page_size: Optional[int]) -> Iterator[List[Dict[str, Any]]]:
+    table = _package_table()
+    kwargs = _package_projection()
+    if segment is not None:
+        kwargs["Segment"], kwargs["TotalSegments"] = segment
+    if page_size:
+        kwargs["Limit"] = page_size
+
+    while True:
+        response = table.scan(**kwargs)
+        yield response.get("Items", [])
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def _package_dtos(items: List[Dict[str, Any]], resolve_images: bool = True) -> Iterator[Dict[str, Any]]:
+    for item in items:
+        if item and item.get("package_id") != CATALOG_VERSION_ITEM_ID:
+            yield _build_package_dto(item, resolve_images)
+
+
+_SEGMENT_DONE = object()
+
+
+def _parallel_scan(
+    segments: int, page_size: Optional[int], resolve_images: bool = True
+) -> Iterator[Dict[str, Any]]:
+    pages: "queue.Queue[Any]" = queue.Queue(maxsize=segments * 2)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan_segment(segment: int) -> None:
+        try:
+            for items in _scan_pages((segment, segments), page_size):
+                if not put(items):
+                    return
+        except Exception as exc:
+            put(exc)
+        finally:
+            put(_SEGMENT_DONE)
+
+    executor = aws_clients.executor("ddb-scan", segments)
+    futures = [executor.submit(scan_segment, segment) for segment in range(segments)]
+    try:
+        remaining = segments
+        while remaining:
+            page = pages.get()
+            if page is _SEGMENT_DONE:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield from _package_dtos(page, resolve_images)
+    finally:
+        stop.set()
+        wait(futures)
+
+
+def list_packages_by_category(category: str, limit: int) -> List[Dict[str, Any]]:
+    """Return the first `limit` packages of a category from the category GSI."""
+
     table = _package_table()
     if not table:
         return []
 
+    response = table.query(
+        IndexName=PACKAGES_CATEGORY_INDEX,
+        KeyConditionExpression=Key("category").eq(category),
+        Limit=limit,
+        **_package_projection(),
+    )
+    return list(_package_dtos(response.get("Items", [])))
+
+
+def list_top_packages_by_category(categories: List[str], limit: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Query every category at once, returning {} if any query fails."""
+
+    if not categories:
+        return {}
+
+    executor = aws_clients.executor("ddb-category", CATEGORY_QUERY_WORKERS)
+    futures = {
+        category: executor.submit(list_packages_by_category, category, limit)
+        for category in categories
+    }
     try:
-        response = table.scan()
+        return {category: future.result() for category, future in futures.items()}
     except (BotoCoreError, ClientError) as exc:
-        logger.exception("Failed to scan packages table: %s", exc)
-        return []
-
-    items = response.get("Items", [])
-    return [_build_package_dto(item) for item in items if item]
+        logger.exception("Failed to query packages by category: %s", exc)
+        return {}
 
 
 def get_package_from_dynamodb(package_code: str) -> Optional[Dict[str, Any]]:
     table = _package_table()
-    if not table:
+    if not table or package_code == CATALOG_VERSION_ITEM_ID:
         return None
 
     try:
@@ -1,11 +1,27 @@
-"""Simple image fetcher that returns bytes for given package categories."""
+"""Simple image fetcher that returns bytes for given package categories.
+
+Downloads share one pooled requests.Session with retries. Each URL is
+downloaded at most once while it stays in a small in-process cache, and
+concurrent requests for the same URL wait for the one in flight, so a
+bulk refresh where many packages pick the same curated image fetches it
+once.
+"""
 
 from __future__ import annotations
 
 import random
-from typing import Dict, List
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+POOL_SIZE = 16
+DOWNLOAD_CACHE_SIZE = 32
+TIMEOUT_SECONDS = 15
 
 
 CATEGORY_IMAGES = {
@@ -56,16 +72,81 @@ CATEGORY_IMAGES = {
 }
 
 
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_downloads: "OrderedDict[str, Future]" = OrderedDict()
+_downloads_lock = threading.Lock()
+
+
 def fetch_image_for_category(category: str) -> bytes:
     """Return raw image bytes for the given category using curated Unsplash URLs."""
 
+    return fetch_image(image_url_for_category(category))
+
+
+def image_url_for_category(category: str) -> str:
     urls = CATEGORY_IMAGES.get(category.upper())
     if not urls:
         urls = CATEGORY_IMAGES["LODGING"]
-    url = random.choice(urls) + "?auto=format&fit=crop&w=1600&q=80"
-    response = requests.get(url, timeout=15)
-    response.raise_for_status()
-    return response.content
+    return random.choice(urls) + "?auto=format&fit=crop&w=1600&q=80"
+
+
+def fetch_image(url: str) -> bytes:
+    """Download url once; later and concurrent callers share the result."""
+
+    with _downloads_lock:
+        download = _downloads.get(url)
+        owner = download is None
+        if owner:
+            download = _downloads[url] = Future()
+            while len(_downloads) > DOWNLOAD_CACHE_SIZE:
+                _downloads.popitem(last=False)
+        else:
+            _downloads.move_to_end(url)
+
+    if owner:
+        try:
+            response = get_session().get(url, timeout=TIMEOUT_SECONDS)
+            response.raise_for_status()
+            download.set_result(response.content)
+        except BaseException as exc:
+            with _downloads_lock:
+                if _downloads.get(url) is download:
+                    del _downloads[url]
+            download.set_exception(exc)
+    return download.result()
+
+
+def get_session() -> requests.Session:
+    """Return the shared session, sized for the refresh command's fetch pool."""
+
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            retries = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET",),
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=retries)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def reset() -> None:
+    """Drop cached downloads and close the shared session."""
+
+    global _session
+    with _downloads_lock:
+        _downloads.clear()
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
 
 
 ##====== from chatgpt rayari =============
@@ -0,0 +1,230 @@
+"""Per-night occupancy ledger used for availability checks."""
+
+from __future__ import annotations
+
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Iterator, List, Optional
+
+from adventurestay_utils import PackageNotAvailableError
+from django.db import transaction
+from django.db.models import F, Max
+
+from ..models import AdventureBookingModel, AdventurePackageModel, PackageNightOccupancy
+from . import availability_store
+
+logger = logging.getLogger(__name__)
+
+# Booking ids reserved in the DynamoDB store inside the active
+# releasing_reservations_on_error() block.
+_reserved_in_block: ContextVar[Optional[List[int]]] = ContextVar("reserved_in_block", default=None)
+
+
+@dataclass(frozen=True)
+class BookingFootprint:
+    """The part of a booking that occupies package capacity."""
+
+    package_id: int
+    start_date: date
+    end_date: date
+    num_guests: int
+    active: bool
+
+    @classmethod
+    def of(cls, booking: AdventureBookingModel) -> "BookingFootprint":
+        return cls(
+            package_id=booking.package_id,
+            start_date=booking.start_date,
+            end_date=booking.end_date,
+            num_guests=booking.num_guests,
+            active=booking.status != AdventureBookingModel.CANCELLED,
+        )
+
+
+def nights_between(start_date: date, end_date: date) -> List[date]:
+    """Return every night of a stay (the checkout day is not a night)."""
+
+    return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days)]
+
+
+def peak_occupancy(package_id: int, start_date: date, end_date: date) -> int:
+    """Return the most guests already booked on any night of the range."""
+
+    result = PackageNightOccupancy.objects.filter(
+        package_id=package_id, night__gte=start_date, night__lt=end_date
+    ).aggregate(peak=Max("guests_booked"))
+    return result["peak"] or 0
+
+
+def apply_footprint(footprint: BookingFootprint) -> None:
+    """Add a booking's guests to every night it covers."""
+
+    span = (footprint.package_id, footprint.start_date, footprint.end_date)
+    if not footprint.num_guests or not _ensure_night_rows(*span):
+        return
+    _night_rows(*span).update(guests_booked=F("guests_booked") + footprint.num_guests)
+
+
+def reserve_booking(package: AdventurePackageModel, **fields) -> AdventureBookingModel:
+    """Create a booking only if every night it covers still has room.
+
+    The package's ledger rows for the requested nights are locked (in night
+    order, so overlapping stays cannot deadlock), the booking is saved,
+    which adds its guests to those rows, and the nights are re-checked
+    before commit. On backends with row locks, such as PostgreSQL, bookings
+    for other packages or non-overlapping nights touch different rows and
+    do not wait on each other. SQLite ignores select_for_update and allows
+    one writer at a time, so there every booking waits for the one before.
+
+    When the DynamoDB availability store is configured the nights are also
+    taken there, so instances with separate databases still share capacity.
+    DynamoDB writes do not roll back with the database: callers that wrap
+    this in a larger transaction must put releasing_reservations_on_error()
+    around their outermost atomic block.
+
+    Raises PackageNotAvailableError, rolling the booking back, when the
+    stay would push any night over the package's capacity.
+    """
+
+    booking = AdventureBookingModel(package=package, **fields)
+    footprint = BookingFootprint.of(booking)
+    span = (package.pk, footprint.start_date, footprint.end_date)
+
+    with releasing_reservations_on_error(), transaction.atomic():
+        if footprint.active and _ensure_night_rows(*span):
+            list(_night_rows(*span).select_for_update().order_by("night").values_list("pk", flat=True))
+        booking.save()
+        if footprint.active and peak_occupancy(
+            package.pk, footprint.start_date, footprint.end_date
+        ) > package.max_guests:
+            raise PackageNotAvailableError("Requested guests exceed capacity for overlapping bookings.")
+        if footprint.active and availability_store.is_enabled():
+            availability_store.reserve(booking)
+            _reserved_in_block.get().append(booking.pk)
+    return booking
+
+
+@contextmanager
+def releasing_reservations_on_error() -> Iterator[None]:
+    """Give back DynamoDB nights reserved in the block if the block raises.
+
+    Wrap the outermost transaction.atomic() so that a rollback, whether
+    from a later error or from the commit itself failing, also releases
+    the store. Nested uses defer to the outermost one.
+    """
+
+    if _reserved_in_block.get() is not None:
+        yield
+        return
+
+    reserved: List[int] = []
+    token = _reserved_in_block.set(reserved)
+    try:
+        yield
+    except BaseException:
+        for booking_id in reserved:
+            try:
+                availability_store.release(booking_id)
+            except Exception:
+                logger.exception("Could not release DynamoDB availability for rolled back booking %s", booking_id)
+        raise
+    finally:
+        _reserved_in_block.reset(token)
+
+
+def resync_availability(booking_id: int) -> None:
+    """Move a committed booking's reservation in the store to match its current row.
+
+    Used after a cancelled booking is confirmed again or an active one
+    changes dates or guests. The new nights are reserved before the old
+    ones are released. If the store has no room for the edit, the booking
+    keeps its previous nights there and is flagged with
+    ``capacity_conflict`` for staff to resolve; it is never cancelled here.
+    """
+
+    booking = AdventureBookingModel.objects.select_related("package").filter(pk=booking_id).first()
+    if booking is None or booking.status == AdventureBookingModel.CANCELLED:
+        availability_store.release(booking_id)
+        return
+    try:
+        availability_store.replace(booking)
+    except PackageNotAvailableError:
+        logger.error(
+            "No shared capacity for the edit to booking %s; it keeps its previous nights and is flagged.",
+            booking_id,
+        )
+        conflict = True
+    else:
+        conflict = False
+    if booking.capacity_conflict != conflict:
+        AdventureBookingModel.objects.filter(pk=booking_id).update(capacity_conflict=conflict)
+
+
+def rebuild_nights(package_id: int, start_date: date, end_date: date) -> None:
+    """Recompute ledger rows for a range from the bookings that overlap it.
+
+    The range's rows are locked in night order before the totals are read,
+    as in reserve_booking, so a reservation committing in between cannot
+    have its increment overwritten by stale totals.
+    """
+
+    with transaction.atomic():
+        if not _ensure_night_rows(package_id, start_date, end_date):
+            return
+        rows = {
+            row.night: row
+            for row in _night_rows(package_id, start_date, end_date).select_for_update().order_by("night")
+        }
+        totals = AdventureBookingModel.objects.filter(package_id=package_id).nightly_guest_totals(
+            start_date, end_date
+        )
+        changed = []
+        for night, row in rows.items():
+            guests = totals.get(night, 0)
+            if row.guests_booked != guests:
+                row.guests_booked = guests
+                changed.append(row)
+        if changed:
+            PackageNightOccupancy.objects.bulk_update(changed, ["guests_booked"])
+
+
+def record_change(
+    previous: Optional[BookingFootprint], current: Optional[BookingFootprint]
+) -> None:
+    """Bring the ledger in line with a booking that was created, edited or removed.
+
+    New bookings only add to their nights. Any other change recomputes the
+    affected nights from the bookings table, so cancellations and edits
+    cannot leave the ledger drifting.
+    """
+
+    if previous == current:
+        return
+    if previous is None:
+        if current and current.active:
+            apply_footprint(current)
+        return
+
+    for footprint in (previous, current):
+        if footprint is not None:
+            rebuild_nights(footprint.package_id, footprint.start_date, footprint.end_date)
+
+
+def _ensure_night_rows(package_id: int, start_date: date, end_date: date) -> bool:
+    nights = nights_between(start_date, end_date)
+    if not nights:
+        return False
+    PackageNightOccupancy.objects.bulk_create(
+        [PackageNightOccupancy(package_id=package_id, night=night) for night in nights],
+        ignore_conflicts=True,
+    )
+    return True
+
+
+def _night_rows(package_id: int, start_date: date, end_date: date):
+    return PackageNightOccupancy.objects.filter(
+        package_id=package_id, night__gte=start_date, night__lt=end_date
+    )
@@ -2,14 +2,21 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
 from decimal import Decimal
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 
 from django.conf import settings
+from django.db import transaction
 
 from ..models import AdventurePackageModel
 from . import aws_enabled
-from . import dynamodb_repository
+from . import catalog_cache, catalog_snapshot, catalog_version, dynamodb_repository
+from .aws_s3 import resolve_image_url
+
+
+PACKAGES_PER_CATEGORY = 5
 
 
 def _should_use_dynamodb() -> bool:
@@ -17,8 +24,64 @@ def _should_use_dynamodb() -> bool:
 
 
 def get_all_packages() -> List[Dict[str, object]]:
-    """Return package DTOs sourced from DynamoDB when enabled or Django ORM otherwise."""
+    """Return package DTOs from the catalog snapshot when one is configured,
+    else sourced from DynamoDB when enabled or Django ORM otherwise."""
+
+    snapshot = catalog_snapshot.current()
+    if snapshot is not None:
+        return snapshot.all_packages()
+    return catalog_cache.get_or_load(catalog_cache.ALL_PACKAGES_KEY, _load_all_packages)
+
+
+def get_package_by_code(package_code: str) -> Optional[Dict[str, object]]:
+    snapshot = catalog_snapshot.current()
+    if snapshot is not None:
+        package = snapshot.package(package_code)
+        if package is not None:
+            return package
+    return catalog_cache.get_or_load(
+        catalog_cache.package_key(package_code), lambda: _load_package(package_code)
+    )
+
+
+def get_packages_by_category() -> Dict[str, List[Dict[str, object]]]:
+    """Return up to PACKAGES_PER_CATEGORY package DTOs for each category."""
+
+    snapshot = catalog_snapshot.current()
+    if snapshot is not None:
+        categories = [key for key, _ in AdventurePackageModel.CATEGORY_CHOICES]
+        return snapshot.packages_by_category(categories, PACKAGES_PER_CATEGORY)
+    return catalog_cache.get_or_load(catalog_cache.BY_CATEGORY_KEY, _load_packages_by_category)
+
+
+def iter_catalog_for_snapshot() -> Iterable[Dict[str, object]]:
+    """Yield every active package with unsigned image URLs, bypassing caches."""
+
+    if _should_use_dynamodb():
+        return dynamodb_repository.iter_packages_from_dynamodb(resolve_images=False)
+    return (
+        {**_model_to_dto(pkg), "image_url": pkg.image_url}
+        for pkg in AdventurePackageModel.objects.filter(is_active=True)
+    )
+
+
+def _load_packages_by_category() -> Dict[str, List[Dict[str, object]]]:
+    categories = [key for key, _ in AdventurePackageModel.CATEGORY_CHOICES]
+    if _should_use_dynamodb():
+        grouped = dynamodb_repository.list_top_packages_by_category(categories, PACKAGES_PER_CATEGORY)
+        if any(grouped.values()):
+            return grouped
+
+    active = AdventurePackageModel.objects.filter(is_active=True).order_by("package_code")
+    return {
+        category: [
+            _model_to_dto(pkg) for pkg in active.filter(category=category)[:PACKAGES_PER_CATEGORY]
+        ]
+        for category in categories
+    }
 
+
+def _load_all_packages() -> List[Dict[str, object]]:
     if _should_use_dynamodb():
         packages = dynamodb_repository.list_packages_from_dynamodb()
         if packages:
@@ -26,7 +89,7 @@ def get_all_packages() -> List[Dict[str, object]]:
     return [_model_to_dto(pkg) for pkg in AdventurePackageModel.objects.filter(is_active=True)]
 
 
-def get_package_by_code(package_code: str) -> Optional[Dict[str, object]]:
+def _load_package(package_code: str) -> Optional[Dict[str, object]]:
     if _should_use_dynamodb():
         dto = dynamodb_repository.get_package_from_dynamodb(package_code)
         if dto:
@@ -40,30 +103,110 @@ def get_package_by_code(package_code: str) -> Optional[Dict[str, object]]:
 
 
 def ensure_package_model(dto: Dict[str, object]) -> AdventurePackageModel:
-    """Ensure a local AdventurePackageModel exists so bookings can FK safely."""
+    """Ensure a local AdventurePackageModel exists so bookings can FK safely.
+
+    The row is only written when the DTO's source hash differs from the
+    one stored with it, so repeated page views cost a single SELECT. The
+    package's post_save handler drops its cached copies.
+    """
+
+    fields = _model_fields(dto)
+    package_code = dto.get("package_code")
+    # get_or_create falls back to a read if a concurrent first request
+    # inserts the row between its lookup and its create.
+    package, created = AdventurePackageModel.objects.get_or_create(package_code=package_code, defaults=fields)
+    if created:
+        return package
+
+    if package.source_hash == fields["source_hash"]:
+        return package
+
+    changed = [field for field, value in fields.items() if getattr(package, field) != value]
+    for field in changed:
+        setattr(package, field, fields[field])
+    package.save(update_fields=changed)
+    return package
+
+
+def sync_package_models(dtos: Iterable[Dict[str, object]], batch_size: int = 500) -> Dict[str, int]:
+    """Mirror many package DTOs into the local table with bulk writes.
+
+    Rows whose source hash already matches are left alone; the rest are
+    created or updated in batches. Returns created/updated/unchanged counts.
+    """
+
+    stored = dict(AdventurePackageModel.objects.values_list("package_code", "source_hash"))
+    ids = dict(AdventurePackageModel.objects.values_list("package_code", "pk"))
+    to_create: List[AdventurePackageModel] = []
+    to_update: List[AdventurePackageModel] = []
+    unchanged = 0
 
-    base_price_per_night = dto.get("base_price_per_night")
-    base_price_per_person = dto.get("base_price_per_person")
+    for dto in dtos:
+        package_code = dto.get("package_code")
+        fields = _model_fields(dto)
+        if package_code not in stored:
+            to_create.append(AdventurePackageModel(package_code=package_code, **fields))
+            stored[package_code] = fields["source_hash"]
+        elif stored[package_code] == fields["source_hash"]:
+            unchanged += 1
+        else:
+            to_update.append(AdventurePackageModel(pk=ids[package_code], package_code=package_code, **fields))
+            stored[package_code] = fields["source_hash"]
 
-    defaults = {
+    with transaction.atomic():
+        AdventurePackageModel.objects.bulk_create(to_create, batch_size=batch_size)
+        AdventurePackageModel.objects.bulk_update(to_update, list(_MODEL_FIELDS), batch_size=batch_size)
+
+    for package in to_create + to_update:
+        catalog_cache.invalidate(catalog_cache.package_key(package.package_code))
+    if to_create or to_update:
+        catalog_cache.invalidate(catalog_cache.ALL_PACKAGES_KEY, catalog_cache.BY_CATEGORY_KEY)
+        catalog_version.bump()
+    return {"created": len(to_create), "updated": len(to_update), "unchanged": unchanged}
+
+
+_MODEL_FIELDS = (
+    "category",
+    "name",
+    "location",
+    "base_price_per_night",
+    "base_price_per_person",
+    "max_guests",
+    "min_nights",
+    "max_nights",
+    "includes_meals",
+    "includes_guide",
+    "image_url",
+    "is_active",
+    "source_hash",
+)
+
+
+def _model_fields(dto: Dict[str, object]) -> Dict[str, object]:
+    """Map a package DTO onto model fields, including its source hash.
+
+    The stored image key is used rather than image_url, which is presigned
+    and so differs between processes and over time; hashing it would make
+    every package look changed.
+    """
+
+    fields = {
         "category": dto.get("category", AdventurePackageModel.LODGING),
         "name": dto.get("name", ""),
         "location": dto.get("location", ""),
-        "base_price_per_night": _to_decimal_for_model(base_price_per_night),
-        "base_price_per_person": _to_decimal_for_model(base_price_per_person),
+        "base_price_per_night": _to_decimal_for_model(dto.get("base_price_per_night")),
+        "base_price_per_person": _to_decimal_for_model(dto.get("base_price_per_person")),
         "max_guests": dto.get("max_guests") or 1,
         "min_nights": dto.get("min_nights") or 1,
         "max_nights": dto.get("max_nights") or 7,
         "includes_meals": dto.get("includes_meals", False),
         "includes_guide": dto.get("includes_guide", False),
-        "image_url": dto.get("image_url", ""),
+        "image_url": dto.get("image_key", dto.get("image_url", "")),
         "is_active": True,
     }
-
-    package, _ = AdventurePackageModel.objects.update_or_create(
-        package_code=dto.get("package_code"), defaults=defaults
-    )
-    return package
+    canonical = json.dumps(fields, sort_keys=True, default=str)
+    fields["source_hash"] = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    return fields
 
 
 def _model_to_dto(package: AdventurePackageModel) -> Dict[str, object]:
@@ -78,7 +221,8 @@ def _model_to_dto(package: AdventurePackageModel) -> Dict[str, object]:
         "min_nights": package.min_nights,
         "max_nights": package.max_nights,
         "max_guests": package.max_guests,
-        "image_url": package.image_url,
+        "image_url": resolve_image_url(package.image_url) if aws_enabled() else package.image_url,
+        "image_key": package.image_url,
         "includes_meals": package.includes_meals,
         "includes_guide": package.includes_guide,
     }
@@ -116,3 +260,4 @@ def update_package_image_url(package_code: str, new_url: str) -> None:
         UpdateExpression="SET image_url = :url",
         ExpressionAttributeValues={":url": new_url},
     )
+    catalog_cache.invalidate_package(package_code)
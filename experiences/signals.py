@@ -0,0 +1,135 @@
+"""Signal handlers keeping derived booking and catalog data in step with the ORM."""
+
+from __future__ import annotations
+
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from adventurestay_utils import build_itinerary_summary
+
+from .forms import to_domain_booking
+from .models import AdventureBookingModel, AdventurePackageModel
+from .services import availability_store, catalog_cache, occupancy, packages_repository
+
+logger = logging.getLogger(__name__)
+
+
+# Booking fields the stored itinerary summary is built from.
+ITINERARY_FIELDS = ("package_id", "start_date", "end_date", "num_guests", "total_price")
+
+
+@receiver(pre_save, sender=AdventureBookingModel)
+def remember_booking_footprint(sender, instance, raw=False, **kwargs):
+    """Capture the stored footprint so post_save can diff against it."""
+
+    instance._previous_footprint = None
+    instance._previous_itinerary_inputs = None
+    if raw or instance.pk is None:
+        return
+
+    try:
+        stored = sender.objects.only(
+            "package_id", "start_date", "end_date", "num_guests", "status", "total_price"
+        ).get(pk=instance.pk)
+    except sender.DoesNotExist:
+        return
+    instance._previous_footprint = occupancy.BookingFootprint.of(stored)
+    instance._previous_itinerary_inputs = _itinerary_inputs(stored)
+
+
+@receiver(post_save, sender=AdventureBookingModel)
+def update_occupancy_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, "_previous_footprint", None)
+    current = occupancy.BookingFootprint.of(instance)
+    occupancy.record_change(previous, current)
+    if previous and previous.active and not current.active:
+        _release_availability(instance.pk)
+    elif previous and current.active and previous != current:
+        _resync_availability(instance.pk)
+
+
+@receiver(post_save, sender=AdventureBookingModel)
+def refresh_itinerary_on_save(sender, instance, created, raw=False, **kwargs):
+    """Rebuild the stored itinerary when the dates, guests, package or price change."""
+
+    previous = None if created else getattr(instance, "_previous_itinerary_inputs", None)
+    if raw or previous is None or previous == _itinerary_inputs(instance):
+        return
+    itinerary = build_itinerary_summary(to_domain_booking(instance))
+    if itinerary != instance.itinerary:
+        sender.objects.filter(pk=instance.pk).update(itinerary=itinerary)
+        instance.itinerary = itinerary
+
+
+@receiver(post_delete, sender=AdventureBookingModel)
+def update_occupancy_on_delete(sender, instance, **kwargs):
+    footprint = occupancy.BookingFootprint.of(instance)
+    occupancy.record_change(footprint, None)
+    if footprint.active:
+        _release_availability(instance.pk)
+
+
+@receiver(post_save, sender=AdventurePackageModel)
+def invalidate_package_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Drop cached copies of a package saved through the ORM, e.g. in the admin.
+
+    A save of the source hash alone changes nothing a page shows.
+    """
+
+    if raw or (update_fields is not None and set(update_fields) == {"source_hash"}):
+        return
+    _invalidate_package(instance.package_code)
+
+
+@receiver(post_delete, sender=AdventurePackageModel)
+def invalidate_package_on_delete(sender, instance, **kwargs):
+    _invalidate_package(instance.package_code)
+
+
+def _invalidate_package(package_code: str) -> None:
+    # With DynamoDB as the source the row is only a mirror, so other nodes
+    # have nothing to drop and the catalog version stays put.
+    catalog_cache.invalidate_package(package_code, bump_version=not packages_repository._should_use_dynamodb())
+
+
+def _itinerary_inputs(booking) -> tuple:
+    # total_price may still hold whatever was assigned, e.g. a str or float.
+    values = {field: getattr(booking, field) for field in ITINERARY_FIELDS}
+    values["total_price"] = Decimal(str(values["total_price"]))
+    return tuple(values.values())
+
+
+def _release_availability(booking_id) -> None:
+    """Hand a cancelled or deleted booking's nights back to DynamoDB after commit."""
+
+    if not availability_store.is_enabled():
+        return
+
+    def release():
+        try:
+            availability_store.release(booking_id)
+        except Exception:
+            logger.exception("Could not release DynamoDB availability for booking %s", booking_id)
+
+    transaction.on_commit(release)
+
+
+def _resync_availability(booking_id) -> None:
+    """Reserve a re-confirmed or edited booking's nights in DynamoDB after commit."""
+
+    if not availability_store.is_enabled():
+        return
+
+    def resync():
+        try:
+            occupancy.resync_availability(booking_id)
+        except Exception:
+            logger.exception("Could not resync DynamoDB availability for booking %s", booking_id)
+
+    transaction.on_commit(resync)
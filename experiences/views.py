@@ -2,22 +2,42 @@
 
 from __future__ import annotations
 
+import hashlib
 import logging
 from decimal import Decimal
+from typing import Sequence
 
+from django.core.cache import cache
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
-from django.http import Http404
+from django.http import Http404, HttpResponse
 
-from adventurestay_utils import build_itinerary_summary
+from adventurestay_utils import PackageNotAvailableError, build_itinerary_summary
 
 from .forms import BookingForm, to_domain_booking
 from .models import AdventureBookingModel, AdventurePackageModel
+from .page_cache import catalog_page
 from .services import aws_enabled
-from .services import aws_sqs, aws_sns, dynamodb_repository, packages_repository
+from .services import booking_outbox, catalog_version, occupancy, packages_repository
 
 
 logger = logging.getLogger(__name__)
 
+# Confirmation pages are keyed by every booking field they show, so they
+# never go stale.
+BOOKING_PAGE_TTL = 24 * 60 * 60
+BOOKING_PAGE_FIELDS = (
+    "status",
+    "guest_name",
+    "guest_email",
+    "package_id",
+    "start_date",
+    "end_date",
+    "num_guests",
+    "total_price",
+    "itinerary",
+)
+
 
 CATEGORY_DESCRIPTIONS = {
     AdventurePackageModel.TREKKING: "Multi-day guided treks with campsite support and alpine thrills.",
@@ -27,6 +47,7 @@ CATEGORY_DESCRIPTIONS = {
 }
 
 
+@catalog_page("home")
 def home(request):
     return render(
         request,
@@ -48,13 +69,13 @@ def home(request):
 
 
 
+@catalog_page("package_list")
 def package_list(request):
     sections = []
-    all_packages = packages_repository.get_all_packages()
+    packages_by_category = packages_repository.get_packages_by_category()
     for key, label in AdventurePackageModel.CATEGORY_CHOICES:
         cards = []
-        category_packages = [pkg for pkg in all_packages if pkg.get("category") == key][:5]
-        for package in category_packages:
+        for package in packages_by_category.get(key, []):
             price = package.get("base_price_per_night") or package.get("base_price_per_person") or Decimal("0")
             pricing_text = (
                 f"From Rs {price} / night"
@@ -70,13 +91,11 @@ def package_list(request):
                 "packages": cards,
             }
         )
-        
-    print(sections)  ## rayari 
 
     return render(
         request,
         "experiences/package_list.html",
-        {"sections": sections},
+        {"sections": sections, "catalog_version": catalog_version.current().version},
     )
 
 
@@ -90,43 +109,8 @@ def booking_form(request, package_code: str):
 
     if request.method == "POST":
         form = BookingForm(package, request.POST)
-        if form.is_valid():
-            booking = AdventureBookingModel.objects.create(
-                package=package,
-                guest_name=form.cleaned_data["guest_name"],
-                guest_email=form.cleaned_data["guest_email"],
-                start_date=form.cleaned_data["start_date"],
-                end_date=form.cleaned_data["end_date"],
-                num_guests=form.cleaned_data["num_guests"],
-                total_price=Decimal(str(form.total_price)),
-                status="CONFIRMED",
-            )
-            booking_payload = {
-                "booking_id": str(booking.id),
-                "package_code": package.package_code,
-                "guest_name": booking.guest_name,
-                "guest_email": booking.guest_email,
-                "start_date": booking.start_date.isoformat(),
-                "end_date": booking.end_date.isoformat(),
-                "num_guests": booking.num_guests,
-                "total_price": float(booking.total_price),
-                "itinerary": build_itinerary_summary(to_domain_booking(booking)),
-            }
-            try:
-                dynamodb_repository.save_booking_to_dynamodb(booking)
-            except Exception:
-                logger.exception("Failed to persist booking %s to DynamoDB.", booking.id)
-
-            try:
-                aws_sqs.send_booking_created_message(booking)
-            except Exception:
-                logger.exception("Failed to send booking %s to SQS.", booking.id)
-
-            try:
-                aws_sns.publish_booking_confirmation(booking)
-            except Exception:
-                logger.exception("Failed to publish booking %s to SNS.", booking.id)
-
+        booking = _reserve_booking(package, form) if form.is_valid() else None
+        if booking is not None:
             return redirect("experiences:booking_success", booking_id=booking.id)
     else:
         form = BookingForm(package)
@@ -143,14 +127,69 @@ def booking_form(request, package_code: str):
     )
 
 
+def _reserve_booking(package: AdventurePackageModel, form: BookingForm):
+    """Commit the validated booking, reporting a lost capacity race on the form.
+
+    The booking and its outbox events (DynamoDB, SQS, SNS) are written in
+    one transaction; dispatch_booking_outbox delivers them afterwards. If
+    that transaction does not commit, nights already taken in the DynamoDB
+    availability store are released.
+    """
+
+    fields = {
+        "guest_name": form.cleaned_data["guest_name"],
+        "guest_email": form.cleaned_data["guest_email"],
+        "start_date": form.cleaned_data["start_date"],
+        "end_date": form.cleaned_data["end_date"],
+        "num_guests": form.cleaned_data["num_guests"],
+        "total_price": Decimal(str(form.total_price)),
+        "status": AdventureBookingModel.CONFIRMED,
+    }
+    fields["itinerary"] = build_itinerary_summary(
+        to_domain_booking(AdventureBookingModel(package=package, **fields))
+    )
+
+    try:
+        with occupancy.releasing_reservations_on_error(), transaction.atomic():
+            booking = occupancy.reserve_booking(package, **fields)
+            booking_outbox.enqueue_booking_side_effects(booking)
+    except PackageNotAvailableError as exc:
+        form.add_error(None, str(exc))
+        return None
+    return booking
+
+
 def booking_success(request, booking_id: int):
+    """Serve the confirmation page, rendered once per version of the booking.
+
+    Revisits cost one primary-key lookup of the fields the page shows; the
+    page is re-rendered when any of them changes, such as the status after
+    a cancellation or the dates and guests after an edit.
+    """
+
+    values = AdventureBookingModel.objects.filter(pk=booking_id).values_list(*BOOKING_PAGE_FIELDS).first()
+    if values is None:
+        raise Http404("Booking not found")
+
+    key = booking_success_cache_key(booking_id, values)
+    body = cache.get(key)
+    if body is not None:
+        return HttpResponse(body)
+
     booking = get_object_or_404(
         AdventureBookingModel.objects.select_related("package"), pk=booking_id
     )
-    domain_booking = to_domain_booking(booking)
-    itinerary = build_itinerary_summary(domain_booking)
-    return render(
+    itinerary = booking.itinerary or build_itinerary_summary(to_domain_booking(booking))
+    response = render(
         request,
         "experiences/booking_success.html",
         {"booking": booking, "itinerary": itinerary},
     )
+    values = tuple(getattr(booking, field) for field in BOOKING_PAGE_FIELDS)
+    cache.set(booking_success_cache_key(booking_id, values), response.content, BOOKING_PAGE_TTL)
+    return response
+
+
+def booking_success_cache_key(booking_id: int, values: Sequence[object]) -> str:
+    digest = hashlib.sha256(repr(tuple(values)).encode("utf-8")).hexdigest()[:16]
+    return f"booking-success:{booking_id}:{digest}"
@@ -29,6 +29,7 @@ def main() -> None:
 
     packages_table = ensure_packages_table(dynamodb)
     bookings_table = ensure_bookings_table(dynamodb)
+    availability_table = ensure_availability_table(dynamodb)
     bucket_name = ensure_bucket(s3, region)
     queue_url = ensure_queue(sqs)
     topic_arn = ensure_topic(sns)
@@ -37,16 +38,28 @@ def main() -> None:
     print(f"AWS_DEFAULT_REGION={region}")
     print(f"DDB_PACKAGES_TABLE_NAME={packages_table}")
     print(f"DDB_BOOKINGS_TABLE_NAME={bookings_table}")
+    print(f"DDB_AVAILABILITY_TABLE_NAME={availability_table}")
     print(f"S3_BUCKET_NAME={bucket_name}")
     print(f"SQS_BOOKING_QUEUE_URL={queue_url}")
     print(f"SNS_BOOKING_TOPIC_ARN={topic_arn}")
 
 
+PACKAGES_CATEGORY_INDEX = {
+    "IndexName": "category-index",
+    "KeySchema": [
+        {"AttributeName": "category", "KeyType": "HASH"},
+        {"AttributeName": "package_id", "KeyType": "RANGE"},
+    ],
+    "Projection": {"ProjectionType": "ALL"},
+}
+
+
 def ensure_packages_table(dynamodb):
     table_name = "adventurestay_packages"
     try:
         table = dynamodb.Table(table_name)
         table.load()
+        ensure_category_index(table)
         return table_name
     except ClientError as exc:
         if exc.response["Error"]["Code"] != "ResourceNotFoundException":
@@ -55,18 +68,57 @@ def ensure_packages_table(dynamodb):
     table = dynamodb.create_table(
         TableName=table_name,
         KeySchema=[{"AttributeName": "package_id", "KeyType": "HASH"}],
-        AttributeDefinitions=[{"AttributeName": "package_id", "AttributeType": "S"}],
+        AttributeDefinitions=[
+            {"AttributeName": "package_id", "AttributeType": "S"},
+            {"AttributeName": "category", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexes=[PACKAGES_CATEGORY_INDEX],
         BillingMode="PAY_PER_REQUEST",
     )
     table.wait_until_exists()
     return table_name
 
 
+def ensure_category_index(table) -> None:
+    """Add the category GSI to a packages table created before it existed."""
+
+    existing = {index["IndexName"] for index in table.global_secondary_indexes or []}
+    if PACKAGES_CATEGORY_INDEX["IndexName"] in existing:
+        return
+
+    table.meta.client.update_table(
+        TableName=table.name,
+        AttributeDefinitions=[
+            {"AttributeName": "package_id", "AttributeType": "S"},
+            {"AttributeName": "category", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexUpdates=[{"Create": PACKAGES_CATEGORY_INDEX}],
+    )
+    print(f"Creating {PACKAGES_CATEGORY_INDEX['IndexName']} on {table.name}; it backfills in the background.")
+
+
+BOOKINGS_PACKAGE_INDEX = {
+    "IndexName": "package_id-start_date-index",
+    "KeySchema": [
+        {"AttributeName": "package_id", "KeyType": "HASH"},
+        {"AttributeName": "start_date", "KeyType": "RANGE"},
+    ],
+    "Projection": {"ProjectionType": "ALL"},
+}
+
+BOOKINGS_ATTRIBUTE_DEFINITIONS = [
+    {"AttributeName": "booking_id", "AttributeType": "S"},
+    {"AttributeName": "package_id", "AttributeType": "S"},
+    {"AttributeName": "start_date", "AttributeType": "S"},
+]
+
+
 def ensure_bookings_table(dynamodb):
     table_name = "adventurestay_bookings"
     try:
         table = dynamodb.Table(table_name)
         table.load()
+        ensure_bookings_package_index(table)
         return table_name
     except ClientError as exc:
         if exc.response["Error"]["Code"] != "ResourceNotFoundException":
@@ -75,23 +127,54 @@ def ensure_bookings_table(dynamodb):
     table = dynamodb.create_table(
         TableName=table_name,
         KeySchema=[{"AttributeName": "booking_id", "KeyType": "HASH"}],
-        AttributeDefinitions=[
-            {"AttributeName": "booking_id", "AttributeType": "S"},
-            {"AttributeName": "package_id", "AttributeType": "S"},
-        ],
-        GlobalSecondaryIndexes=[
-            {
-                "IndexName": "package_id-index",
-                "KeySchema": [{"AttributeName": "package_id", "KeyType": "HASH"}],
-                "Projection": {"ProjectionType": "ALL"},
-            }
-        ],
+        AttributeDefinitions=BOOKINGS_ATTRIBUTE_DEFINITIONS,
+        GlobalSecondaryIndexes=[BOOKINGS_PACKAGE_INDEX],
         BillingMode="PAY_PER_REQUEST",
     )
     table.wait_until_exists()
     return table_name
 
 
+def ensure_bookings_package_index(table) -> None:
+    """Add the package/start-date GSI to a bookings table created before it existed.
+
+    The older hash-only package_id-index is left in place; drop it once
+    nothing reads it.
+    """
+
+    existing = {index["IndexName"] for index in table.global_secondary_indexes or []}
+    if BOOKINGS_PACKAGE_INDEX["IndexName"] in existing:
+        return
+
+    table.meta.client.update_table(
+        TableName=table.name,
+        AttributeDefinitions=BOOKINGS_ATTRIBUTE_DEFINITIONS,
+        GlobalSecondaryIndexUpdates=[{"Create": BOOKINGS_PACKAGE_INDEX}],
+    )
+    print(f"Creating {BOOKINGS_PACKAGE_INDEX['IndexName']} on {table.name}; it backfills in the background.")
+
+
+AVAILABILITY_TABLE_SCHEMA = {
+    "KeySchema": [{"AttributeName": "pk", "KeyType": "HASH"}],
+    "AttributeDefinitions": [{"AttributeName": "pk", "AttributeType": "S"}],
+    "BillingMode": "PAY_PER_REQUEST",
+}
+
+
+def ensure_availability_table(dynamodb):
+    table_name = "adventurestay_availability"
+    try:
+        dynamodb.Table(table_name).load()
+        return table_name
+    except ClientError as exc:
+        if exc.response["Error"]["Code"] != "ResourceNotFoundException":
+            raise
+
+    table = dynamodb.create_table(TableName=table_name, **AVAILABILITY_TABLE_SCHEMA)
+    table.wait_until_exists()
+    return table_name
+
+
 def ensure_bucket(s3, region: str) -> str:
     bucket_name = f"adventurestay-images-{uuid.uuid4().hex[:8]}"
     kwargs = {"Bucket": bucket_name}
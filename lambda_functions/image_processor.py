@@ -1,80 +1,351 @@
+import hashlib
 import json
 import io
 import logging
 import os
-from typing import Any, Dict
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Iterator, List, Tuple
+from urllib.parse import unquote_plus
 
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 from PIL import Image
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-s3 = boto3.client("s3")
-dynamodb = boto3.resource("dynamodb")
-
 DDB_TABLE = os.getenv("DDB_PACKAGES_TABLE_NAME", "adventurestay_packages")
 THUMB_PREFIX = os.getenv("THUMBNAIL_PREFIX", "thumbnails/")
 THUMB_WIDTH = int(os.getenv("THUMBNAIL_WIDTH", "300"))
+MAX_WORKERS = int(os.getenv("IMAGE_PROCESSOR_WORKERS", "8"))
+RENDITION_WIDTHS = [int(width) for width in os.getenv("RENDITION_WIDTHS", "300,640,1280").split(",") if width]
+RENDITION_FORMATS = [fmt.strip().lower() for fmt in os.getenv("RENDITION_FORMATS", "jpeg,webp").split(",") if fmt]
+MAX_SOURCE_BYTES = int(os.getenv("MAX_SOURCE_BYTES", str(25 * 1024 * 1024)))
+MAX_SOURCE_PIXELS = int(os.getenv("MAX_SOURCE_PIXELS", str(40_000_000)))
+SOURCE_SPOOL_BYTES = int(os.getenv("SOURCE_SPOOL_BYTES", str(4 * 1024 * 1024)))
+READ_CHUNK_BYTES = 256 * 1024
+
+# Pillow's own decompression-bomb check, as a backstop for _create_renditions.
+Image.MAX_IMAGE_PIXELS = MAX_SOURCE_PIXELS
+
+FORMATS = {
+    "jpeg": {
+        "extension": "jpg",
+        "content_type": "image/jpeg",
+        "options": {"quality": 85, "optimize": True, "progressive": True},
+    },
+    "webp": {
+        "extension": "webp",
+        "content_type": "image/webp",
+        "options": {"quality": 80, "method": 4},
+    },
+}
+
+
+class SourceRejected(Exception):
+    """The source is too large to process; retrying will not help."""
+
+
+# Clients are created once per container and shared by the worker threads
+# (boto3 clients are thread-safe; resources are not, hence the DynamoDB client).
+_client_config = Config(max_pool_connections=MAX_WORKERS * 2)
+s3 = boto3.client("s3", config=_client_config)
+dynamodb = boto3.client("dynamodb", config=_client_config)
+
 
+def handler(event: Dict[str, Any], _context) -> Dict[str, List[Dict[str, str]]]:
+    """Process every S3 record in the event on a bounded thread pool.
+
+    Accepts direct S3 notifications or SQS messages wrapping them. Returns
+    a partial batch response: with an SQS event source mapping configured
+    for ReportBatchItemFailures, only the messages listed are retried.
+    """
 
-def handler(event: Dict[str, Any], _context) -> None:
     logger.info("Received event: %s", event)
 
+    tasks = [task for task in _iter_tasks(event) if _is_package_key(task[2])]
+    failed: List[str] = []
+    if tasks:
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(tasks))) as executor:
+            futures = {
+                executor.submit(_process_image, bucket, key): (item_id, bucket, key)
+                for item_id, bucket, key in tasks
+            }
+            for future in as_completed(futures):
+                item_id, bucket, key = futures[future]
+                try:
+                    future.result()
+                except Exception:
+                    logger.exception("Failed to process %s/%s", bucket, key)
+                    if item_id not in failed:
+                        failed.append(item_id)
+
+    return {"batchItemFailures": [{"itemIdentifier": item_id} for item_id in failed]}
+
+
+def _iter_tasks(event: Dict[str, Any]) -> Iterator[Tuple[str, str, str]]:
+    """Yield (item id, bucket, key) for each S3 object in the event.
+
+    The item id is the SQS messageId for wrapped notifications and the
+    object key for direct S3 invocations.
+    """
+
     for record in event.get("Records", []):
-        bucket = record["s3"]["bucket"]["name"]
-        key = record["s3"]["object"]["key"]
+        if record.get("eventSource") == "aws:sqs":
+            body = json.loads(record.get("body") or "{}")
+            for s3_record in body.get("Records", []):
+                yield (record["messageId"], *_bucket_and_key(s3_record))
+        elif "s3" in record:
+            bucket, key = _bucket_and_key(record)
+            yield key, bucket, key
 
-        if not key.startswith("packages/"):
-            logger.info("Skipping non-package key: %s", key)
-            continue
 
-        try:
-            _process_image(bucket, key)
-        except Exception:
-            logger.exception("Failed to process %s/%s", bucket, key)
+def _bucket_and_key(record: Dict[str, Any]) -> Tuple[str, str]:
+    return record["s3"]["bucket"]["name"], unquote_plus(record["s3"]["object"]["key"])
+
+
+def _is_package_key(key: str) -> bool:
+    if key.startswith("packages/"):
+        return True
+    logger.info("Skipping non-package key: %s", key)
+    return False
 
 
 def _process_image(bucket: str, key: str) -> None:
     logger.info("Processing s3://%s/%s", bucket, key)
 
-    # download
-    original = s3.get_object(Bucket=bucket, Key=key)
-    image_bytes = original["Body"].read()
+    # skip sources whose renditions were already made with these settings
+    head = s3.head_object(Bucket=bucket, Key=key)
+    source_etag = head["ETag"]
+    if head.get("ContentLength", 0) > MAX_SOURCE_BYTES:
+        logger.warning("Rejecting s3://%s/%s: %s bytes exceeds %s", bucket, key, head["ContentLength"],
+                       MAX_SOURCE_BYTES)
+        return
+    package_codes = _package_codes(key, head)
+    metadata = {
+        "source-etag": source_etag.strip('"'),
+        "processing": _processing_signature(),
+        "packages": hashlib.sha256(",".join(package_codes).encode("utf-8")).hexdigest()[:16],
+    }
+    stem = os.path.splitext(os.path.basename(key))[0]
+    marker_key = _marker_key(stem)
+    if _renditions_current(bucket, marker_key, metadata):
+        logger.info("Skipping unchanged s3://%s/%s (etag %s)", bucket, key, metadata["source-etag"])
+        return
+
+    # download; IfMatch fails the record if the source changed since the HEAD
+    original = s3.get_object(Bucket=bucket, Key=key, IfMatch=source_etag)
+
+    # decode once, encode every rendition from it
+    renditions: Dict[str, List[Dict[str, Any]]] = {fmt: [] for fmt in RENDITION_FORMATS}
+    try:
+        with _spool(original["Body"]) as source:
+            for width, fmt, body in _create_renditions(source):
+                rendition_key = _rendition_key(stem, width, fmt)
+                renditions[fmt].append({"width": width, "key": rendition_key})
+                _put_rendition(bucket, rendition_key, fmt, body, metadata)
+    except SourceRejected as exc:
+        logger.warning("Rejecting s3://%s/%s: %s", bucket, key, exc)
+        return
+    logger.info("Uploaded %s renditions of s3://%s/%s", sum(map(len, renditions.values())), bucket, key)
+
+    # update DynamoDB
+    if DDB_TABLE:
+        for package_code in package_codes:
+            _update_package(package_code, _thumbnail_key(renditions), renditions, metadata["source-etag"])
+
+    # The marker goes last, after DynamoDB, so it only ever vouches for a
+    # fully processed source. It does not depend on which widths the
+    # source was wide enough for.
+    s3.put_object(Bucket=bucket, Key=marker_key, Body=b"", ContentType="text/plain", Metadata=metadata)
+
+
+def _package_codes(key: str, head: Dict[str, Any]) -> List[str]:
+    """Packages using this image.
+
+    refresh_package_images uploads an image shared by several packages once
+    and lists them in the package-codes metadata. Otherwise the code comes
+    from the file name.
+    """
+
+    listed = head.get("Metadata", {}).get("package-codes", "")
+    if listed:
+        return [code.strip().upper() for code in listed.split(",") if code.strip()]
+
+    # extract package_code TREK-001 from trek-001-abc123.jpg
+    base = os.path.basename(key).split("-")[0:2]
+    package_code = "-".join(base).upper()
+    return [package_code] if package_code else []
+
 
-    # create thumb
-    thumb_bytes = _create_thumbnail(image_bytes)
-    thumb_key = f"{THUMB_PREFIX}{os.path.basename(key)}"
+def _processing_signature() -> str:
+    """Short hash of every setting that changes the renditions' bytes or keys."""
 
+    params = {
+        "widths": sorted(RENDITION_WIDTHS),
+        "formats": {fmt: FORMATS[fmt]["options"] for fmt in RENDITION_FORMATS},
+        "prefix": THUMB_PREFIX,
+        "thumbnail_width": THUMB_WIDTH,
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def _rendition_key(stem: str, width: int, fmt: str) -> str:
+    return f"{THUMB_PREFIX}{stem}-{width}w.{FORMATS[fmt]['extension']}"
+
+
+def _marker_key(stem: str) -> str:
+    """Empty object whose metadata records the source last processed for stem."""
+
+    return f"{THUMB_PREFIX}{stem}.processed"
+
+
+def _renditions_current(bucket: str, marker_key: str, metadata: Dict[str, str]) -> bool:
+    try:
+        head = s3.head_object(Bucket=bucket, Key=marker_key)
+    except ClientError as exc:
+        code = exc.response.get("Error", {}).get("Code")
+        if code in ("404", "NoSuchKey", "NotFound"):
+            return False
+        if code in ("403", "AccessDenied"):
+            # A role without s3:ListBucket gets 403 for a missing key, so
+            # this cannot tell a missing marker from a forbidden one.
+            logger.warning("HEAD s3://%s/%s was denied; processing the source again", bucket, marker_key)
+            return False
+        raise
+    stored = head.get("Metadata", {})
+    return all(stored.get(name) == value for name, value in metadata.items())
+
+
+def _put_rendition(bucket: str, key: str, fmt: str, body: BinaryIO, metadata: Dict[str, str]) -> None:
     # upload (NO ACL!)
     s3.put_object(
         Bucket=bucket,
-        Key=thumb_key,
-        Body=thumb_bytes,
-        ContentType="image/jpeg",
+        Key=key,
+        Body=body,
+        ContentType=FORMATS[fmt]["content_type"],
+        Metadata=metadata,
     )
-    logger.info("Uploaded thumbnail to s3://%s/%s", bucket, thumb_key)
 
-    # extract package_code TREK-001 from trek-001-abc123.jpg
-    base = os.path.basename(key).split("-")[0:2]
-    package_code = "-".join(base).upper()
 
-    # update DynamoDB
-    if package_code and DDB_TABLE:
-        table = dynamodb.Table(DDB_TABLE)
-        table.update_item(
-            Key={"package_code": package_code},
-            UpdateExpression="SET thumbnail_key = :thumb",
-            ExpressionAttributeValues={":thumb": thumb_key},
+def _update_package(
+    package_code: str, thumb_key: str, renditions: Dict[str, List[Dict[str, Any]]], source_etag: str
+) -> None:
+    """Write the rendition keys to an existing package unless it already holds them.
+
+    An image named after a package that is not in the table is skipped
+    rather than creating an item that holds nothing but rendition keys.
+    """
+
+    try:
+        dynamodb.update_item(
+            TableName=DDB_TABLE,
+            Key={"package_id": {"S": package_code}},
+            UpdateExpression=(
+                "SET thumbnail_key = :thumb, image_renditions = :renditions, image_source_etag = :etag"
+            ),
+            ConditionExpression=(
+                "attribute_exists(package_id) AND (attribute_not_exists(image_source_etag)"
+                " OR image_source_etag <> :etag OR thumbnail_key <> :thumb OR image_renditions <> :renditions)"
+            ),
+            ExpressionAttributeValues={
+                ":thumb": {"S": thumb_key},
+                ":renditions": _renditions_attribute(renditions),
+                ":etag": {"S": source_etag},
+            },
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
         )
-        logger.info("Updated DynamoDB %s thumbnail %s", package_code, thumb_key)
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        if "Item" in exc.response:
+            logger.info("DynamoDB %s already up to date", package_code)
+        else:
+            logger.warning("DynamoDB has no package %s; skipped thumbnail %s", package_code, thumb_key)
+        return
+    logger.info("Updated DynamoDB %s thumbnail %s", package_code, thumb_key)
+
+
+@contextmanager
+def _spool(body: BinaryIO) -> Iterator[BinaryIO]:
+    """Stream an S3 body into a seekable file, refusing more than MAX_SOURCE_BYTES.
+
+    Up to SOURCE_SPOOL_BYTES stay in memory; larger sources spill to /tmp,
+    so the compressed original never has to sit in memory whole.
+    """
+
+    received = 0
+    with tempfile.SpooledTemporaryFile(max_size=SOURCE_SPOOL_BYTES) as spooled:
+        try:
+            while True:
+                chunk = body.read(READ_CHUNK_BYTES)
+                if not chunk:
+                    break
+                received += len(chunk)
+                if received > MAX_SOURCE_BYTES:
+                    raise SourceRejected(f"body exceeds {MAX_SOURCE_BYTES} bytes")
+                spooled.write(chunk)
+        finally:
+            body.close()
+        spooled.seek(0)
+        yield spooled
+
+
+def _create_renditions(source: BinaryIO) -> Iterator[Tuple[int, str, BinaryIO]]:
+    """Yield (width, format, encoded buffer) for every configured rendition.
+
+    The source is decoded once. For JPEGs, draft mode lets libjpeg decode
+    straight to the smallest DCT scale that still covers the largest
+    rendition, so a 1600px original is never expanded in full when only
+    640px is needed. Widths wider than the source are not upscaled. The
+    pixel count is checked from the header, before anything is decoded.
+    """
+
+    with Image.open(source) as img:
+        if img.width * img.height > MAX_SOURCE_PIXELS:
+            raise SourceRejected(f"{img.width}x{img.height} exceeds {MAX_SOURCE_PIXELS} pixels")
+        widths = _target_widths(img.width)
+        target = (widths[-1], max(1, round(img.height * widths[-1] / img.width)))
+        img.draft("RGB", target)
+        decoded = img.convert("RGB")
+
+    for width in widths:
+        height = max(1, round(decoded.height * width / decoded.width))
+        resized = decoded if (width, height) == decoded.size else decoded.resize(
+            (width, height), Image.LANCZOS, reducing_gap=3.0
+        )
+        for fmt in RENDITION_FORMATS:
+            buffer = io.BytesIO()
+            resized.save(buffer, format=fmt.upper(), **FORMATS[fmt]["options"])
+            buffer.seek(0)
+            yield width, fmt, buffer
+        del resized
+
+
+def _target_widths(source_width: int) -> List[int]:
+    widths = sorted({width for width in RENDITION_WIDTHS if width <= source_width})
+    return widths or [source_width]
+
+
+def _thumbnail_key(renditions: Dict[str, List[Dict[str, Any]]]) -> str:
+    """The JPEG rendition closest to THUMB_WIDTH, kept for older readers."""
+
+    candidates = renditions.get("jpeg") or next(iter(renditions.values()))
+    return min(candidates, key=lambda rendition: abs(rendition["width"] - THUMB_WIDTH))["key"]
 
 
-def _create_thumbnail(image_bytes: bytes) -> bytes:
-    with Image.open(io.BytesIO(image_bytes)) as img:
-        img = img.convert("RGB")
-        img.thumbnail((THUMB_WIDTH, THUMB_WIDTH * 10000), Image.LANCZOS)
-        buffer = io.BytesIO()
-        img.save(buffer, format="JPEG", quality=85)
-        buffer.seek(0)
-        return buffer.read()
+def _renditions_attribute(renditions: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    return {
+        "M": {
+            fmt: {
+                "L": [
+                    {"M": {"width": {"N": str(item["width"])}, "key": {"S": item["key"]}}}
+                    for item in items
+                ]
+            }
+            for fmt, items in renditions.items()
+        }
+    }
@@ -0,0 +1,209 @@
+"""Run image_processor locally against a directory standing in for S3.
+
+Objects live under <root>/<bucket>/<key> and DynamoDB updates are kept in
+memory, so the handler can be exercised and benchmarked without AWS:
+
+    python lambda_functions/local_harness.py ./sample-images --workers 1 4 8 --latency 0.05
+
+Every image under <root>/<bucket>/packages/ becomes one record of a single
+SQS-wrapped batch. --latency adds a per-call delay to approximate network
+round trips, which is where the thread pool earns its keep.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import image_processor  # noqa: E402
+
+
+class DirectoryS3:
+    """The subset of the S3 client image_processor uses, backed by a directory.
+
+    User metadata lives in memory for the life of the instance, so each
+    benchmark run starts from unprocessed sources. ETags are the MD5 of the
+    file, as for single-part S3 uploads. With list_bucket=False a HEAD on a
+    missing key fails with 403, as it does for a role without s3:ListBucket.
+    """
+
+    def __init__(self, root: str, latency: float = 0.0, list_bucket: bool = True):
+        self.root = root
+        self.list_bucket = list_bucket
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self.metadata: Dict[tuple, dict] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, bucket: str, key: str) -> str:
+        return os.path.join(self.root, bucket, *key.split("/"))
+
+    def _call(self, operation: str) -> None:
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _stat(self, bucket: str, key: str, operation: str) -> dict:
+        path = self._path(bucket, key)
+        if not os.path.exists(path):
+            if self.list_bucket:
+                code = "404" if operation == "HeadObject" else "NoSuchKey"
+            else:
+                code = "403" if operation == "HeadObject" else "AccessDenied"
+            raise ClientError({"Error": {"Code": code}}, operation)
+        digest = hashlib.md5()
+        with open(path, "rb") as handle:
+            for chunk in iter(lambda: handle.read(256 * 1024), b""):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()}"'
+        metadata = self.metadata.get((bucket, key), {})
+        return {"ContentLength": os.path.getsize(path), "ETag": etag, "Metadata": dict(metadata)}
+
+    def get_object(self, Bucket: str, Key: str, IfMatch: Optional[str] = None, **_kwargs) -> dict:
+        self._call("get_object")
+        head = self._stat(Bucket, Key, "GetObject")
+        if IfMatch is not None and IfMatch != head["ETag"]:
+            raise ClientError({"Error": {"Code": "PreconditionFailed"}}, "GetObject")
+        # An open file streams like botocore's StreamingBody; the caller closes it.
+        return {**head, "Body": open(self._path(Bucket, Key), "rb")}
+
+    def head_object(self, Bucket: str, Key: str, **_kwargs) -> dict:
+        self._call("head_object")
+        return self._stat(Bucket, Key, "HeadObject")
+
+    def put_object(self, Bucket: str, Key: str, Body, Metadata: Optional[dict] = None, **_kwargs) -> dict:
+        self._call("put_object")
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as handle:
+            if isinstance(Body, (bytes, bytearray)):
+                handle.write(Body)
+            else:
+                shutil.copyfileobj(Body, handle)
+        with self._lock:
+            self.metadata[(Bucket, Key)] = dict(Metadata or {})
+        return {}
+
+
+class MemoryDynamoDB:
+    """Applies update_item SETs to in-memory items.
+
+    ConditionExpression is not parsed: an update fails with
+    ConditionalCheckFailedException when its package is unknown or its
+    values all equal the stored ones, which is what image_processor's
+    "existing package, only if something differs" condition amounts to.
+    Without package_ids every package counts as existing.
+    """
+
+    def __init__(self, latency: float = 0.0, package_ids: Optional[List[str]] = None):
+        self.latency = latency
+        self.package_ids = None if package_ids is None else set(package_ids)
+        self.items: Dict[str, dict] = {}
+        self.updates: List[dict] = []
+        self._lock = threading.Lock()
+
+    def update_item(self, **kwargs) -> dict:
+        if self.latency:
+            time.sleep(self.latency)
+        item_key = json.dumps(kwargs["Key"], sort_keys=True)
+        assignments = kwargs["UpdateExpression"].removeprefix("SET ").split(", ")
+        values = {
+            name.strip(): kwargs["ExpressionAttributeValues"][placeholder.strip()]
+            for name, placeholder in (assignment.split("=") for assignment in assignments)
+        }
+        package_id = kwargs["Key"]["package_id"]["S"]
+        with self._lock:
+            if self.package_ids is not None and package_id not in self.package_ids:
+                raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem")
+            item = self.items.setdefault(item_key, {})
+            if "ConditionExpression" in kwargs and all(item.get(name) == value for name, value in values.items()):
+                error = {"Error": {"Code": "ConditionalCheckFailedException"}, "Item": dict(item)}
+                raise ClientError(error, "UpdateItem")
+            item.update(values)
+            self.updates.append(kwargs)
+        return {}
+
+
+def s3_record(bucket: str, key: str) -> dict:
+    return {"eventSource": "aws:s3", "s3": {"bucket": {"name": bucket}, "object": {"key": key}}}
+
+
+def sqs_event(bucket: str, keys: List[str]) -> dict:
+    """One SQS record per key, each wrapping an S3 ObjectCreated notification."""
+
+    return {
+        "Records": [
+            {
+                "messageId": f"msg-{index}",
+                "eventSource": "aws:sqs",
+                "body": json.dumps({"Records": [s3_record(bucket, key)]}),
+            }
+            for index, key in enumerate(keys)
+        ]
+    }
+
+
+def package_keys(root: str, bucket: str) -> List[str]:
+    base = os.path.join(root, bucket)
+    keys = []
+    for directory, _dirs, files in os.walk(os.path.join(base, "packages")):
+        for name in files:
+            keys.append(os.path.relpath(os.path.join(directory, name), base).replace(os.sep, "/"))
+    return sorted(keys)
+
+
+def run(root: str, bucket: str, workers: int, latency: float = 0.0, keys: Optional[List[str]] = None) -> Dict:
+    """Invoke the handler once with local stand-ins and return timing stats."""
+
+    keys = package_keys(root, bucket) if keys is None else keys
+    image_processor.s3 = DirectoryS3(root, latency)
+    image_processor.dynamodb = MemoryDynamoDB(latency)
+    image_processor.MAX_WORKERS = workers
+
+    started = time.perf_counter()
+    response = image_processor.handler(sqs_event(bucket, keys), None)
+    elapsed = time.perf_counter() - started
+    return {
+        "workers": workers,
+        "records": len(keys),
+        "failed": len(response["batchItemFailures"]),
+        "seconds": elapsed,
+        "per_second": len(keys) / elapsed if elapsed else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", help="Directory holding <bucket>/packages/*.jpg")
+    parser.add_argument("--bucket", default="adventurestay-local")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to each S3/DynamoDB call.")
+    args = parser.parse_args(argv)
+
+    keys = package_keys(args.root, args.bucket)
+    if not keys:
+        parser.error(f"No images under {os.path.join(args.root, args.bucket, 'packages')}")
+
+    for workers in args.workers:
+        stats = run(args.root, args.bucket, workers, args.latency, keys)
+        print(
+            f"workers={stats['workers']:>3} records={stats['records']} failed={stats['failed']} "
+            f"{stats['seconds']:.2f}s {stats['per_second']:.1f} records/s"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import pytest
+from django.core.cache import cache
+
+from experiences.models import AdventurePackageModel
+from experiences.services import aws_clients, catalog_cache, catalog_snapshot, catalog_version
+
+
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix, tmp_path_factory):
+    # A file-backed SQLite test database keeps normal write locking, so the
+    # concurrent booking tests wait for locks instead of failing the way the
+    # shared in-memory database does. It lives in a temp dir, not the repo.
+    from django.conf import settings
+
+    test_settings = settings.DATABASES["default"].setdefault("TEST", {})
+    if settings.DATABASES["default"]["ENGINE"].endswith("sqlite3") and not test_settings.get("NAME"):
+        test_settings["NAME"] = str(tmp_path_factory.mktemp("db") / "test_db.sqlite3")
+
+
+@pytest.fixture(autouse=True)
+def clear_catalog_cache(settings, tmp_path_factory):
+    # Keep the shared tier out of the real cache directory in the system temp dir.
+    settings.CATALOG_CACHE_DIR = str(tmp_path_factory.mktemp("catalog-cache"))
+    settings.CACHES = {
+        **settings.CACHES,
+        "catalog_shared": {**settings.CACHES["catalog_shared"], "LOCATION": settings.CATALOG_CACHE_DIR},
+    }
+    catalog_cache.clear()
+    catalog_snapshot.reset()
+    catalog_version.reset()
+    yield
+    catalog_cache.clear()
+    catalog_snapshot.reset()
+    catalog_version.reset()
+
+
+@pytest.fixture(autouse=True)
+def reset_aws_clients():
+    aws_clients.reset()
+    yield
+    aws_clients.reset()
+
+
+@pytest.fixture(autouse=True)
+def clear_default_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def package_factory():
+    """Create a lodging package; keyword arguments override the defaults."""
+
+    def create(**overrides):
+        fields = {
+            "package_code": "PKG200",
+            "category": AdventurePackageModel.LODGING,
+            "name": "Forest Lodge",
+            "location": "Coorg",
+            "base_price_per_night": 100,
+            "max_guests": 4,
+            "min_nights": 1,
+            "max_nights": 5,
+        }
+        fields.update(overrides)
+        return AdventurePackageModel.objects.create(**fields)
+
+    return create
@@ -1,11 +1,33 @@
+import json
+import threading
+import time
 from datetime import date, timedelta
 from unittest import mock
 
+import boto3
 import pytest
+from adventurestay_utils import PackageNotAvailableError
+from botocore.exceptions import ClientError, ReadTimeoutError
+from django.db import transaction
+from moto import mock_aws
 
 from experiences.models import AdventurePackageModel, AdventureBookingModel
-from experiences.services import aws_sns, aws_sqs, dynamodb_repository, packages_repository
+from experiences.services import (
+    availability_store,
+    aws_clients,
+    aws_s3,
+    aws_sns,
+    aws_sqs,
+    catalog_version,
+    booking_events,
+    bookings_sync,
+    dynamodb_repository,
+    occupancy,
+    packages_repository,
+)
 from experiences.services.aws_s3 import resolve_image_url
+from experiences.services.batch_publisher import MAX_BATCH_BYTES, BatchPublisher
+from infra import bootstrap_aws
 
 
 @pytest.fixture
@@ -34,14 +56,14 @@ def sample_booking(db):
     )
 
 
-@mock.patch("experiences.services.dynamodb_repository.boto3.resource")
+@mock.patch("experiences.services.dynamodb_repository.aws_clients.resource")
 def test_dynamodb_skips_when_disabled(mock_resource, settings, sample_booking):
     settings.USE_AWS = False
     dynamodb_repository.save_booking_to_dynamodb(sample_booking)
     mock_resource.assert_not_called()
 
 
-@mock.patch("experiences.services.dynamodb_repository.boto3.resource")
+@mock.patch("experiences.services.dynamodb_repository.aws_clients.resource")
 def test_dynamodb_puts_item_when_enabled(mock_resource, settings, sample_booking):
     settings.USE_AWS = True
     settings.DDB_BOOKINGS_TABLE_NAME = "bookings"
@@ -50,7 +72,7 @@ def test_dynamodb_puts_item_when_enabled(mock_resource, settings, sample_booking
     table.put_item.assert_called_once()
 
 
-@mock.patch("experiences.services.aws_sqs.boto3.client")
+@mock.patch("experiences.services.aws_sqs.aws_clients.client")
 def test_sqs_sends_message_when_enabled(mock_client, settings, sample_booking):
     settings.USE_AWS = True
     settings.SQS_BOOKING_QUEUE_URL = "https://sqs.mock/queue"
@@ -58,7 +80,7 @@ def test_sqs_sends_message_when_enabled(mock_client, settings, sample_booking):
     mock_client.return_value.send_message.assert_called_once()
 
 
-@mock.patch("experiences.services.aws_sns.boto3.client")
+@mock.patch("experiences.services.aws_sns.aws_clients.client")
 def test_sns_publishes_message_when_enabled(mock_client, settings, sample_booking):
     settings.USE_AWS = True
     settings.SNS_BOOKING_TOPIC_ARN = "arn:aws:sns:region:acct:topic"
@@ -113,3 +135,725 @@ def test_resolve_image_url_for_s3_key(settings):
     settings.AWS_REGION = "ap-south-1"
     result = resolve_image_url("gallery/photo.jpg")
     assert result == "https://adventurestay-images.s3.ap-south-1.amazonaws.com/gallery/photo.jpg"
+
+
+@pytest.fixture
+def packages_table(settings, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    settings.USE_AWS = True
+    settings.AWS_REGION = "us-east-1"
+    settings.DDB_PACKAGES_TABLE_NAME = "packages-test"
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName="packages-test",
+            KeySchema=[{"AttributeName": "package_id", "KeyType": "HASH"}],
+            AttributeDefinitions=[
+                {"AttributeName": "package_id", "AttributeType": "S"},
+                {"AttributeName": "category", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexes=[bootstrap_aws.PACKAGES_CATEGORY_INDEX],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield table
+
+
+def _seed_packages(table, count, category="LODGING"):
+    with table.batch_writer() as batch:
+        for index in range(count):
+            batch.put_item(
+                Item={
+                    "package_id": f"{category[:4]}-{index:03d}",
+                    "name": f"Package {index}",
+                    "category": category,
+                    "location": "Wayanad",
+                    "base_price_per_night": 1000,
+                    "max_guests": 4,
+                    "internal_notes": "x" * 200,
+                }
+            )
+
+
+def test_package_scan_follows_pagination(packages_table):
+    _seed_packages(packages_table, 25)
+
+    packages = list(dynamodb_repository.iter_packages_from_dynamodb(page_size=7))
+
+    assert sorted(p["package_code"] for p in packages) == [f"LODG-{i:03d}" for i in range(25)]
+    assert packages[0]["location"] == "Wayanad"
+
+
+def test_package_scan_projects_only_dto_attributes(packages_table):
+    _seed_packages(packages_table, 1)
+
+    response = packages_table.scan(**dynamodb_repository._package_projection())
+    assert "internal_notes" not in response["Items"][0]
+    assert response["Items"][0]["name"] == "Package 0"
+
+
+def test_parallel_package_scan_reads_every_segment(packages_table):
+    _seed_packages(packages_table, 40)
+
+    packages = dynamodb_repository.iter_packages_from_dynamodb(segments=4, page_size=5)
+
+    assert len({p["package_code"] for p in packages}) == 40
+
+
+def test_parallel_scans_reuse_worker_resources(packages_table):
+    _seed_packages(packages_table, 20)
+
+    with mock.patch.object(aws_clients, "_session_locked", wraps=aws_clients._session_locked) as session:
+        for _ in range(5):
+            packages = list(dynamodb_repository.iter_packages_from_dynamodb(segments=4, page_size=5))
+            assert len(packages) == 20
+
+    # At most one resource per pool thread plus the caller's, not one per
+    # segment per scan.
+    assert session.call_count <= 5
+    assert aws_clients.executor("ddb-scan", 4) is aws_clients.executor("ddb-scan", 4)
+
+
+def test_packages_by_category_queries_index_with_limit(packages_table):
+    for category in ("TREKKING", "HILLS_STAYCATION", "JUNGLE_SAFARI", "LODGING"):
+        _seed_packages(packages_table, 8, category)
+
+    with mock.patch.object(
+        dynamodb_repository, "iter_packages_from_dynamodb", side_effect=AssertionError("scanned")
+    ):
+        grouped = packages_repository.get_packages_by_category()
+
+    assert {category: len(packages) for category, packages in grouped.items()} == {
+        "TREKKING": 5,
+        "HILLS_STAYCATION": 5,
+        "JUNGLE_SAFARI": 5,
+        "LODGING": 5,
+    }
+    assert [p["package_code"] for p in grouped["TREKKING"]] == [f"TREK-{i:03d}" for i in range(5)]
+
+
+def test_resolve_image_url_signs_each_key_once(settings, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setattr(aws_s3, "_presigned_urls", aws_s3.OrderedDict())
+    settings.S3_BUCKET_NAME = "adventurestay-images"
+    settings.AWS_REGION = "us-east-1"
+
+    with mock.patch.object(aws_clients, "_config", wraps=aws_clients._config) as build_config:
+        client = aws_clients.client("s3")
+        with mock.patch.object(client, "generate_presigned_url", wraps=client.generate_presigned_url) as sign:
+            urls = [resolve_image_url(key) for key in ["packages/a.jpg", "packages/b.jpg"] * 10]
+
+    assert build_config.call_count == 1
+    assert sign.call_count == 2
+    assert urls[0] == urls[2] and urls[0] != urls[1]
+    assert "packages/a.jpg" in urls[0]
+
+
+def test_aws_client_registry_shares_clients_and_isolates_resources(settings, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    settings.AWS_REGION = "us-east-1"
+    settings.AWS_MAX_POOL_CONNECTIONS = 64
+
+    sqs = aws_clients.client("sqs")
+    resources = {}
+
+    def grab(name):
+        resources[name] = (aws_clients.resource("dynamodb"), aws_clients.client("sqs"))
+
+    threads = [threading.Thread(target=grab, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert aws_clients.client("sqs") is sqs
+    assert sqs.meta.config.max_pool_connections == 64
+    assert sqs.meta.config.tcp_keepalive is True
+    assert resources["a"][1] is resources["b"][1] is sqs
+    assert resources["a"][0] is not resources["b"][0]
+    assert aws_clients.resource("dynamodb") is aws_clients.resource("dynamodb")
+
+
+def test_aws_client_registry_resets_after_fork(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    parent_client = aws_clients.client("sns")
+
+    monkeypatch.setattr(aws_clients.os, "getpid", lambda: -1)
+
+    assert aws_clients.client("sns") is not parent_client
+
+
+@pytest.fixture
+def booking_queue(settings, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    settings.USE_AWS = True
+    settings.AWS_REGION = "us-east-1"
+    with mock_aws():
+        client = aws_clients.client("sqs")
+        settings.SQS_BOOKING_QUEUE_URL = client.create_queue(QueueName="bookings-test")["QueueUrl"]
+        yield client, settings.SQS_BOOKING_QUEUE_URL
+
+
+def _send_booking_events(client, queue_url, count):
+    for start in range(0, count, 10):
+        client.send_message_batch(
+            QueueUrl=queue_url,
+            Entries=[
+                {"Id": str(i), "MessageBody": json.dumps({"event_type": "booking_created", "booking_id": str(i)})}
+                for i in range(start, min(start + 10, count))
+            ],
+        )
+
+
+def _queue_depth(client, queue_url):
+    attributes = client.get_queue_attributes(
+        QueueUrl=queue_url,
+        AttributeNames=["ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible"],
+    )["Attributes"]
+    return int(attributes["ApproximateNumberOfMessages"]) + int(
+        attributes["ApproximateNumberOfMessagesNotVisible"]
+    )
+
+
+def test_booking_event_consumer_drains_queue_in_batches(booking_queue):
+    client, queue_url = booking_queue
+    _send_booking_events(client, queue_url, 25)
+    seen = []
+    lock = threading.Lock()
+
+    def handler(event):
+        with lock:
+            seen.append(event["booking_id"])
+
+    consumer = booking_events.BookingEventConsumer(queue_url, client=client, handler=handler, wait_time_seconds=0)
+    with mock.patch.object(client, "delete_message_batch", wraps=client.delete_message_batch) as delete:
+        stats = consumer.run(stop_when_empty=True)
+
+    assert sorted(seen, key=int) == [str(i) for i in range(25)]
+    assert (stats.received, stats.processed, stats.failed) == (25, 25, 0)
+    assert all(len(call.kwargs["Entries"]) <= 10 for call in delete.call_args_list)
+    assert _queue_depth(client, queue_url) == 0
+
+
+def test_booking_event_consumer_keeps_failed_messages(booking_queue):
+    client, queue_url = booking_queue
+    _send_booking_events(client, queue_url, 3)
+
+    def handler(event):
+        if event["booking_id"] == "1":
+            raise RuntimeError("boom")
+
+    consumer = booking_events.BookingEventConsumer(
+        queue_url, client=client, handler=handler, wait_time_seconds=0, visibility_timeout=60
+    )
+    stats = consumer.run(stop_when_empty=True)
+
+    assert (stats.processed, stats.failed) == (2, 1)
+    assert _queue_depth(client, queue_url) == 1
+
+
+def test_booking_event_consumer_extends_visibility_for_slow_messages(booking_queue):
+    client, queue_url = booking_queue
+    _send_booking_events(client, queue_url, 2)
+
+    def handler(event):
+        if event["booking_id"] == "0":
+            time.sleep(0.3)
+
+    consumer = booking_events.BookingEventConsumer(
+        queue_url, client=client, handler=handler, wait_time_seconds=0, heartbeat_interval=0.05
+    )
+    with mock.patch.object(
+        client, "change_message_visibility_batch", wraps=client.change_message_visibility_batch
+    ) as extend:
+        stats = consumer.run(stop_when_empty=True)
+
+    assert stats.processed == 2
+    assert extend.called
+    assert {len(call.kwargs["Entries"]) for call in extend.call_args_list} == {1}
+
+
+def test_booking_event_consumer_receives_while_a_slow_message_runs(booking_queue):
+    client, queue_url = booking_queue
+    _send_booking_events(client, queue_url, 1)
+    others_done = threading.Event()
+    others, slow_result = [], []
+    slow_started = threading.Event()
+
+    def handler(event):
+        if not slow_started.is_set():
+            slow_started.set()
+            # Only finishes early if the consumer receives while it runs.
+            _send_booking_events(client, queue_url, 3)
+            slow_result.append(others_done.wait(5))
+            return
+        others.append(event["booking_id"])
+        if len(others) == 3:
+            others_done.set()
+
+    consumer = booking_events.BookingEventConsumer(
+        queue_url, client=client, handler=handler, max_workers=12, wait_time_seconds=0
+    )
+    stats = consumer.run(stop_when_empty=True)
+
+    assert slow_result == [True]
+    assert (stats.received, stats.processed) == (4, 4)
+
+
+def test_booking_event_consumer_keeps_polling_after_a_receive_timeout(booking_queue):
+    client, queue_url = booking_queue
+    _send_booking_events(client, queue_url, 2)
+    receive = client.receive_message
+    responses = iter([ReadTimeoutError(endpoint_url=queue_url)])
+
+    def flaky_receive(**kwargs):
+        error = next(responses, None)
+        if error is not None:
+            raise error
+        return receive(**kwargs)
+
+    consumer = booking_events.BookingEventConsumer(queue_url, client=client, handler=lambda event: None)
+    with mock.patch.object(client, "receive_message", side_effect=flaky_receive), mock.patch.object(
+        booking_events.time, "sleep"
+    ) as sleep:
+        stats = consumer.run(max_messages=2)
+
+    sleep.assert_called_once_with(booking_events.RECEIVE_BACKOFF_SECONDS)
+    assert stats.processed == 2
+
+
+def test_consumer_client_read_timeout_outlasts_the_long_poll(booking_queue, settings):
+    settings.AWS_READ_TIMEOUT = 10
+    client = booking_events.aws_sqs.get_sqs_client(read_timeout=20 + booking_events.LONG_POLL_READ_MARGIN)
+
+    assert client.meta.config.read_timeout > 20
+    assert aws_clients.client("sqs").meta.config.read_timeout == 10
+
+
+def test_booking_event_consumer_survives_sqs_errors(booking_queue, caplog):
+    client, queue_url = booking_queue
+    _send_booking_events(client, queue_url, 2)
+
+    def handler(event):
+        if event["booking_id"] == "0":
+            time.sleep(0.2)
+
+    error = ClientError({"Error": {"Code": "InternalError"}}, "DeleteMessageBatch")
+    consumer = booking_events.BookingEventConsumer(
+        queue_url, client=client, handler=handler, wait_time_seconds=0, heartbeat_interval=0.05
+    )
+    failed = {"Successful": [], "Failed": [{"Id": "0", "Code": "ReceiptHandleIsInvalid", "SenderFault": True}]}
+    with mock.patch.object(client, "delete_message_batch", side_effect=error), mock.patch.object(
+        client, "change_message_visibility_batch", return_value=failed
+    ):
+        stats = consumer.run(stop_when_empty=True)
+
+    assert (stats.processed, stats.failed) == (2, 0)
+    assert "Could not delete" in caplog.text
+    assert "ReceiptHandleIsInvalid" in caplog.text
+
+
+def _recording_publisher(fail=None):
+    """A BatchPublisher whose send_batch records batches and fails chosen bodies once."""
+
+    batches = []
+    fail = dict(fail or {})
+
+    def send_batch(entries):
+        batches.append([entry["Body"] for entry in entries])
+        failed = [
+            {"Id": entry["Id"], "SenderFault": fail.pop(entry["Body"]), "Code": "Err"}
+            for entry in entries
+            if entry["Body"] in fail
+        ]
+        failed_ids = {f["Id"] for f in failed}
+        return {
+            "Successful": [{"Id": e["Id"]} for e in entries if e["Id"] not in failed_ids],
+            "Failed": failed,
+        }
+
+    publisher = BatchPublisher(send_batch, size_of=lambda entry: len(entry["Body"]), backoff_seconds=0)
+    return publisher, batches
+
+
+def test_batch_publisher_packs_by_entry_count_and_size():
+    publisher, batches = _recording_publisher()
+    with publisher:
+        for i in range(23):
+            publisher.add({"Body": f"m{i:02d}"})
+        publisher.add({"Body": "x" * (MAX_BATCH_BYTES - 5)})
+        publisher.add({"Body": "y" * 20})
+
+    assert [len(batch) for batch in batches] == [10, 10, 3, 1, 1]
+    assert publisher.sent == 25 and publisher.failed == []
+
+
+def test_batch_publisher_retries_only_transient_failures():
+    publisher, batches = _recording_publisher(fail={"m1": False, "m2": True})
+    with publisher:
+        for i in range(4):
+            publisher.add({"Body": f"m{i}"})
+
+    assert batches == [["m0", "m1", "m2", "m3"], ["m1"]]
+    assert publisher.sent == 3
+    assert [entry["Body"] for entry in publisher.failed] == ["m2"]
+
+
+def test_batch_publisher_rejects_oversized_entry():
+    publisher, _ = _recording_publisher()
+    with pytest.raises(ValueError):
+        publisher.add({"Body": "x" * (MAX_BATCH_BYTES + 1)})
+
+
+def test_send_booking_created_messages_uses_batches(booking_queue, sample_booking):
+    client, queue_url = booking_queue
+    with mock.patch.object(client, "send_message_batch", wraps=client.send_message_batch) as send_batch:
+        sent = aws_sqs.send_booking_created_messages([sample_booking] * 12)
+
+    assert sent == 12
+    assert [len(call.kwargs["Entries"]) for call in send_batch.call_args_list] == [10, 2]
+    assert _queue_depth(client, queue_url) == 12
+
+
+@mock.patch("experiences.services.aws_sns.aws_clients.client")
+def test_publish_booking_confirmations_uses_publish_batch(mock_client, settings, sample_booking):
+    settings.USE_AWS = True
+    settings.SNS_BOOKING_TOPIC_ARN = "arn:aws:sns:us-east-1:123:topic"
+    mock_client.return_value.publish_batch.side_effect = lambda TopicArn, PublishBatchRequestEntries: {
+        "Successful": [{"Id": entry["Id"]} for entry in PublishBatchRequestEntries],
+        "Failed": [],
+    }
+
+    assert aws_sns.publish_booking_confirmations([sample_booking] * 3) == 3
+    entries = mock_client.return_value.publish_batch.call_args.kwargs["PublishBatchRequestEntries"]
+    assert [entry["Id"] for entry in entries] == ["0", "1", "2"]
+    assert entries[0]["Subject"] == aws_sns.CONFIRMATION_SUBJECT
+
+
+@pytest.fixture
+def bookings_table(settings, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    settings.USE_AWS = True
+    settings.AWS_REGION = "us-east-1"
+    settings.DDB_BOOKINGS_TABLE_NAME = "bookings-test"
+    monkeypatch.setattr(bookings_sync, "BASE_BACKOFF_SECONDS", 0)
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        yield dynamodb.create_table(
+            TableName="bookings-test",
+            KeySchema=[{"AttributeName": "booking_id", "KeyType": "HASH"}],
+            AttributeDefinitions=bootstrap_aws.BOOKINGS_ATTRIBUTE_DEFINITIONS,
+            GlobalSecondaryIndexes=[bootstrap_aws.BOOKINGS_PACKAGE_INDEX],
+            BillingMode="PAY_PER_REQUEST",
+        )
+
+
+def _bulk_bookings(package, count):
+    return [
+        AdventureBookingModel.objects.create(
+            package=package,
+            guest_name=f"Guest {i}",
+            guest_email=f"guest{i}@example.com",
+            start_date=date.today() + timedelta(days=i),
+            end_date=date.today() + timedelta(days=i + 1),
+            num_guests=1,
+            total_price="150.00",
+        )
+        for i in range(count)
+    ]
+
+
+def test_booking_backfill_writes_every_booking(bookings_table, sample_booking):
+    _bulk_bookings(sample_booking.package, 59)
+
+    stats = bookings_sync.backfill(workers=3, range_size=20)
+
+    assert stats.written == 60
+    assert bookings_table.scan(Select="COUNT")["Count"] == 60
+
+
+def test_booking_reconcile_rewrites_only_diverged_ranges(bookings_table, sample_booking):
+    bookings = [sample_booking, *_bulk_bookings(sample_booking.package, 59)]
+    bookings_sync.backfill(range_size=20)
+
+    assert bookings_sync.reconcile(range_size=20).diverged == 0
+
+    drifted, deleted = next(
+        (a, b) for a, b in zip(bookings[20:], bookings[21:]) if a.pk // 20 == b.pk // 20
+    )
+    bookings_table.put_item(Item={"booking_id": str(drifted.pk), "num_guests": 9})
+    bookings_table.delete_item(Key={"booking_id": str(deleted.pk)})
+    with mock.patch.object(bookings_sync, "write_items", wraps=bookings_sync.write_items) as write:
+        stats = bookings_sync.reconcile(range_size=20)
+
+    same_range = [str(b.pk) for b in bookings if b.pk // 20 == drifted.pk // 20]
+    assert (stats.diverged, stats.written) == (1, len(same_range))
+    assert sorted(item["booking_id"] for item in write.call_args.args[1]) == sorted(same_range)
+    assert bookings_table.get_item(Key={"booking_id": str(drifted.pk)})["Item"]["package_code"] == "AWS-TST"
+    assert bookings_sync.reconcile(range_size=20).diverged == 0
+
+
+def test_batch_write_retries_unprocessed_items(bookings_table):
+    client = aws_clients.resource("dynamodb")
+    real = client.batch_write_item
+    calls = []
+
+    def flaky(RequestItems):
+        calls.append(len(RequestItems["bookings-test"]))
+        if len(calls) == 1:
+            requests = RequestItems["bookings-test"]
+            real(RequestItems={"bookings-test": requests[:5]})
+            return {"UnprocessedItems": {"bookings-test": requests[5:]}}
+        return real(RequestItems=RequestItems)
+
+    items = [{"booking_id": str(i)} for i in range(8)]
+    with mock.patch.object(client, "batch_write_item", side_effect=flaky):
+        bookings_sync.write_items("bookings-test", items)
+
+    assert calls == [8, 3]
+    assert bookings_table.scan(Select="COUNT")["Count"] == 8
+
+
+def test_bookings_for_package_query_index_across_pages(bookings_table, sample_booking):
+    bookings = [sample_booking, *_bulk_bookings(sample_booking.package, 11)]
+    other = AdventurePackageModel.objects.create(
+        package_code="AWS-OTHER", category=AdventurePackageModel.LODGING, name="Other",
+        location="Elsewhere", base_price_per_night=100, max_guests=4,
+    )
+    _bulk_bookings(other, 3)
+    bookings_sync.backfill(range_size=5)
+
+    with mock.patch.object(aws_clients.resource("dynamodb").meta.client, "scan") as scan:
+        found = list(dynamodb_repository.iter_bookings_for_package("AWS-TST", page_size=4))
+
+    assert not scan.called
+    assert sorted(item["booking_id"] for item in found) == sorted(str(b.pk) for b in bookings)
+    assert {item["package_id"] for item in found} == {"AWS-TST"}
+    assert len(dynamodb_repository.list_bookings_for_package("AWS-TST")) == 12
+
+
+def test_bookings_for_package_narrowed_to_date_range(bookings_table, sample_booking):
+    _bulk_bookings(sample_booking.package, 10)
+    bookings_sync.backfill()
+    start = date.today() + timedelta(days=3)
+
+    found = dynamodb_repository.iter_bookings_for_package(
+        "AWS-TST", start_date=start, end_date=start + timedelta(days=2)
+    )
+
+    assert sorted(item["start_date"] for item in found) == [
+        (start + timedelta(days=offset)).isoformat() for offset in (0, 1)
+    ]
+
+
+@pytest.fixture
+def availability_table(settings, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    settings.USE_AWS = True
+    settings.AWS_REGION = "us-east-1"
+    settings.DDB_AVAILABILITY_TABLE_NAME = "availability-test"
+    settings.DDB_AVAILABILITY_SHARDS = 4
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        yield dynamodb.create_table(TableName="availability-test", **bootstrap_aws.AVAILABILITY_TABLE_SCHEMA)
+
+
+def _night_total(package, night):
+    return availability_store.booked_guests(package.package_code, night, availability_store.shard_count(package))
+
+
+def test_availability_store_spreads_guests_over_shards(availability_table, sample_booking):
+    package = sample_booking.package
+    package.max_guests = 6
+    start = date.today()
+    bookings = [
+        AdventureBookingModel.objects.create(
+            package=package, guest_name="G", guest_email="g@example.com", start_date=start,
+            end_date=start + timedelta(days=2), num_guests=guests, total_price="1.00",
+        )
+        for guests in (4, 2, 1)
+    ]
+
+    assert availability_store.shard_capacities(package) == [2, 2, 1, 1]
+    first = availability_store.reserve(bookings[0])
+    availability_store.reserve(bookings[1])
+    with pytest.raises(PackageNotAvailableError):
+        availability_store.reserve(bookings[2])
+
+    assert sum(first.values()) == 8 and len({key.split("#")[1] for key in first}) == 2
+    assert _night_total(package, start) == _night_total(package, start + timedelta(days=1)) == 6
+    assert availability_store.release(bookings[0].pk) is True
+    assert availability_store.release(bookings[0].pk) is False
+    assert _night_total(package, start) == 2
+    availability_store.reserve(bookings[2])
+
+
+def test_availability_store_uses_the_shared_client(availability_table, sample_booking):
+    with mock.patch.object(aws_clients, "resource", side_effect=AssertionError("per-thread resource")):
+        threads = [threading.Thread(target=availability_store.reserve, args=(sample_booking,)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert availability_store.release(sample_booking.pk) is True
+
+
+def test_availability_store_holds_under_concurrent_reservations(availability_table, sample_booking):
+    package = sample_booking.package
+    package.max_guests = 5
+    bookings = [
+        AdventureBookingModel.objects.create(
+            package=package, guest_name="G", guest_email="g@example.com", start_date=date.today(),
+            end_date=date.today() + timedelta(days=1), num_guests=1, total_price="1.00",
+        )
+        for _ in range(12)
+    ]
+    barrier = threading.Barrier(len(bookings))
+    results = []
+    # moto does not serialize concurrent transactions the way DynamoDB does.
+    serialized = threading.Lock()
+    transact = availability_store._transact
+
+    def serializable_transact(actions):
+        with serialized:
+            transact(actions)
+
+    def attempt(booking):
+        barrier.wait()
+        try:
+            availability_store.reserve(booking)
+            results.append("booked")
+        except PackageNotAvailableError:
+            results.append("full")
+
+    threads = [threading.Thread(target=attempt, args=(booking,)) for booking in bookings]
+    with mock.patch.object(availability_store, "_transact", serializable_transact):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert results.count("booked") == 5
+    assert _night_total(package, date.today()) == 5
+
+
+def test_reserve_booking_takes_and_cancellation_releases_dynamodb_nights(
+    availability_table, sample_booking, django_capture_on_commit_callbacks
+):
+    package = sample_booking.package
+    start = date.today() + timedelta(days=30)
+    booking = occupancy.reserve_booking(
+        package, guest_name="G", guest_email="g@example.com", start_date=start,
+        end_date=start + timedelta(days=1), num_guests=3, total_price="1.00",
+    )
+    assert _night_total(package, start) == 3
+
+    with pytest.raises(PackageNotAvailableError):
+        with mock.patch.object(occupancy, "peak_occupancy", return_value=0):
+            occupancy.reserve_booking(
+                package, guest_name="H", guest_email="h@example.com", start_date=start,
+                end_date=start + timedelta(days=1), num_guests=2, total_price="1.00",
+            )
+    assert AdventureBookingModel.objects.filter(guest_name="H").count() == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        booking.status = AdventureBookingModel.CANCELLED
+        booking.save()
+    assert _night_total(package, start) == 0
+
+
+def test_rolled_back_booking_releases_dynamodb_nights(availability_table, sample_booking):
+    package = sample_booking.package
+    start = date.today() + timedelta(days=40)
+
+    with pytest.raises(RuntimeError):
+        with occupancy.releasing_reservations_on_error(), transaction.atomic():
+            occupancy.reserve_booking(
+                package, guest_name="G", guest_email="g@example.com", start_date=start,
+                end_date=start + timedelta(days=1), num_guests=3, total_price="1.00",
+            )
+            assert _night_total(package, start) == 3
+            raise RuntimeError("outbox write failed")
+
+    assert AdventureBookingModel.objects.filter(start_date=start).count() == 0
+    assert _night_total(package, start) == 0
+
+
+def test_reconfirmed_booking_reserves_dynamodb_nights_again(
+    availability_table, sample_booking, django_capture_on_commit_callbacks
+):
+    package = sample_booking.package
+    start = date.today() + timedelta(days=50)
+    booking = occupancy.reserve_booking(
+        package, guest_name="G", guest_email="g@example.com", start_date=start,
+        end_date=start + timedelta(days=1), num_guests=3, total_price="1.00",
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        booking.status = AdventureBookingModel.CANCELLED
+        booking.save()
+    assert _night_total(package, start) == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        booking.status = AdventureBookingModel.CONFIRMED
+        booking.save()
+    assert _night_total(package, start) == 3
+
+    with django_capture_on_commit_callbacks(execute=True):
+        booking.num_guests = 2
+        booking.save()
+    assert _night_total(package, start) == 2
+
+
+def test_edit_without_shared_room_keeps_old_nights_and_flags_booking(
+    availability_table, sample_booking, django_capture_on_commit_callbacks
+):
+    package = sample_booking.package
+    start = date.today() + timedelta(days=60)
+    moved = start + timedelta(days=5)
+    booking = occupancy.reserve_booking(
+        package, guest_name="G", guest_email="g@example.com", start_date=start,
+        end_date=start + timedelta(days=1), num_guests=3, total_price="1.00",
+    )
+    # Another instance already holds most of the target night in the shared store.
+    other = AdventureBookingModel(
+        pk=10_000, package=package, start_date=moved, end_date=moved + timedelta(days=1), num_guests=2
+    )
+    availability_store.reserve(other)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        booking.start_date, booking.end_date = moved, moved + timedelta(days=1)
+        booking.save()
+
+    booking.refresh_from_db()
+    assert booking.status == AdventureBookingModel.CONFIRMED and booking.capacity_conflict
+    assert _night_total(package, start) == 3
+    assert _night_total(package, moved) == 2
+
+    with django_capture_on_commit_callbacks(execute=True):
+        booking.start_date, booking.end_date = start, start + timedelta(days=1)
+        booking.num_guests = 4
+        booking.save()
+
+    booking.refresh_from_db()
+    assert not booking.capacity_conflict
+    assert _night_total(package, start) == 4
+
+
+def test_catalog_version_item_lives_in_packages_table(packages_table, settings):
+    settings.CATALOG_VERSION_CHECK_INTERVAL = 0
+    _seed_packages(packages_table, 3)
+
+    assert catalog_version.current().version == 0
+    catalog_version.bump()
+    stamp = catalog_version.bump()
+
+    assert stamp.version == 2 and stamp.changed_at is not None
+    assert catalog_version.current() == stamp
+    assert len(list(dynamodb_repository.iter_packages_from_dynamodb())) == 3
+    assert dynamodb_repository.get_package_from_dynamodb(dynamodb_repository.CATALOG_VERSION_ITEM_ID) is None
@@ -0,0 +1,119 @@
+import threading
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from adventurestay_utils import PackageNotAvailableError
+from django.db import connection
+
+from experiences.models import AdventureBookingModel
+from experiences.services import occupancy
+
+THREADS = 24
+
+
+def _hammer(requests):
+    """Run every (package, start, end, guests) request at once on its own thread."""
+
+    barrier = threading.Barrier(len(requests))
+    outcomes = []
+    lock = threading.Lock()
+
+    def attempt(package, start, end, guests):
+        barrier.wait()
+        try:
+            occupancy.reserve_booking(
+                package,
+                guest_name="Stress",
+                guest_email="stress@example.com",
+                start_date=start,
+                end_date=end,
+                num_guests=guests,
+                total_price=Decimal("100"),
+            )
+            result = "booked"
+        except PackageNotAvailableError:
+            result = "full"
+        finally:
+            connection.close()
+        with lock:
+            outcomes.append((package.package_code, result))
+
+    threads = [threading.Thread(target=attempt, args=request) for request in requests]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_reservations_never_overbook(package_factory):
+    package = package_factory(package_code="STRESS-1", max_guests=5)
+    requests = [
+        (package, date(2025, 8, 1 + (i % 3)), date(2025, 8, 4 + (i % 3)), 1 + (i % 2))
+        for i in range(THREADS)
+    ]
+
+    outcomes = _hammer(requests)
+
+    assert len(outcomes) == THREADS
+    assert any(result == "full" for _, result in outcomes)
+    totals = AdventureBookingModel.objects.filter(package=package).nightly_guest_totals(
+        date(2025, 8, 1), date(2025, 8, 7)
+    )
+    assert max(totals.values()) <= package.max_guests
+    ledger = dict(package.night_occupancy.values_list("night", "guests_booked"))
+    assert all(ledger.get(night, 0) == guests for night, guests in totals.items())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_reservations_on_separate_packages_all_succeed(package_factory):
+    packages = [package_factory(package_code=f"STRESS-{i}", max_guests=2) for i in range(THREADS)]
+    requests = [(package, date(2025, 9, 1), date(2025, 9, 3), 2) for package in packages]
+
+    outcomes = _hammer(requests)
+
+    assert sorted(result for _, result in outcomes) == ["booked"] * THREADS
+
+
+@pytest.mark.django_db(transaction=True)
+def test_cancellations_racing_reservations_keep_the_ledger_exact(package_factory):
+    package = package_factory(package_code="STRESS-R", max_guests=THREADS)
+    start, end = date(2025, 10, 1), date(2025, 10, 4)
+    cancelling = [
+        occupancy.reserve_booking(
+            package, guest_name="Early", guest_email="early@example.com", start_date=start,
+            end_date=end, num_guests=1, total_price=Decimal("100"),
+        )
+        for _ in range(THREADS // 2)
+    ]
+    barrier = threading.Barrier(THREADS)
+
+    def cancel(booking):
+        barrier.wait()
+        try:
+            booking.status = AdventureBookingModel.CANCELLED
+            booking.save()
+        finally:
+            connection.close()
+
+    def reserve():
+        barrier.wait()
+        try:
+            occupancy.reserve_booking(
+                package, guest_name="Late", guest_email="late@example.com", start_date=start,
+                end_date=end, num_guests=1, total_price=Decimal("100"),
+            )
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=cancel, args=(booking,)) for booking in cancelling]
+    threads += [threading.Thread(target=reserve) for _ in range(THREADS - len(cancelling))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ledger = dict(package.night_occupancy.values_list("night", "guests_booked"))
+    assert ledger == {night: THREADS // 2 for night in occupancy.nights_between(start, end)}
@@ -1,7 +1,18 @@
+from datetime import date
+from io import StringIO
+from unittest import mock
+
 import pytest
+from django.core.management import call_command
+from django.http import HttpResponse
 from django.urls import reverse
+from django.utils import timezone
 
-from experiences.models import AdventurePackageModel, AdventureBookingModel
+from experiences import views
+from experiences.forms import BookingForm
+from experiences.models import AdventurePackageModel, AdventureBookingModel, BookingOutboxEvent
+from experiences.page_cache import catalog_page, page_key
+from experiences.services import booking_outbox, catalog_cache, packages_repository
 
 
 @pytest.mark.django_db
@@ -42,3 +53,254 @@ def test_booking_flow_creates_record(client, monkeypatch):
     assert AdventureBookingModel.objects.count() == 1
     booking = AdventureBookingModel.objects.first()
     assert booking.total_price > 0
+    assert booking.itinerary
+
+
+def _create_booking(package, start, end, guests, status=AdventureBookingModel.CONFIRMED):
+    return AdventureBookingModel.objects.create(
+        package=package,
+        guest_name="Ledger Guest",
+        guest_email="ledger@example.com",
+        start_date=start,
+        end_date=end,
+        num_guests=guests,
+        total_price=100,
+        status=status,
+    )
+
+
+@pytest.mark.django_db
+def test_occupancy_ledger_tracks_create_and_cancel(package_factory):
+    package = package_factory()
+    booking = _create_booking(package, date(2025, 6, 1), date(2025, 6, 4), 3)
+
+    nights = dict(package.night_occupancy.values_list("night", "guests_booked"))
+    assert nights == {date(2025, 6, 1): 3, date(2025, 6, 2): 3, date(2025, 6, 3): 3}
+
+    booking.status = AdventureBookingModel.CANCELLED
+    booking.save()
+    assert set(package.night_occupancy.values_list("guests_booked", flat=True)) == {0}
+
+
+@pytest.mark.django_db
+def test_booking_form_reads_ledger_for_requested_nights(package_factory):
+    package = package_factory()
+    _create_booking(package, date(2025, 6, 1), date(2025, 6, 3), 3)
+    _create_booking(package, date(2025, 6, 10), date(2025, 6, 12), 1, AdventureBookingModel.CANCELLED)
+
+    data = {"guest_name": "A", "guest_email": "a@example.com", "num_guests": 2}
+    overlapping = BookingForm(package, {**data, "start_date": "2025-06-02", "end_date": "2025-06-04"})
+    adjacent = BookingForm(package, {**data, "start_date": "2025-06-03", "end_date": "2025-06-05"})
+    after_cancel = BookingForm(
+        package, {**data, "num_guests": 4, "start_date": "2025-06-10", "end_date": "2025-06-12"}
+    )
+
+    assert not overlapping.is_valid()
+    assert adjacent.is_valid()
+    assert after_cancel.is_valid()
+
+
+@pytest.mark.django_db
+def test_nightly_guest_totals_skips_cancelled_and_non_overlapping(package_factory):
+    package = package_factory()
+    _create_booking(package, date(2025, 6, 1), date(2025, 6, 3), 2)
+    _create_booking(package, date(2025, 6, 2), date(2025, 6, 5), 1)
+    _create_booking(package, date(2025, 6, 2), date(2025, 6, 4), 3, AdventureBookingModel.CANCELLED)
+    _create_booking(package, date(2025, 7, 1), date(2025, 7, 3), 4)
+
+    totals = AdventureBookingModel.objects.filter(package=package).nightly_guest_totals(
+        date(2025, 6, 1), date(2025, 6, 5)
+    )
+
+    assert totals == {
+        date(2025, 6, 1): 2,
+        date(2025, 6, 2): 3,
+        date(2025, 6, 3): 1,
+        date(2025, 6, 4): 1,
+    }
+
+
+@pytest.mark.django_db
+def test_editing_booking_dates_rebuilds_both_windows(package_factory):
+    package = package_factory()
+    booking = _create_booking(package, date(2025, 6, 1), date(2025, 6, 3), 2)
+
+    booking.start_date, booking.end_date = date(2025, 6, 10), date(2025, 6, 11)
+    booking.save()
+
+    nights = dict(package.night_occupancy.filter(guests_booked__gt=0).values_list("night", "guests_booked"))
+    assert nights == {date(2025, 6, 10): 2}
+
+
+@pytest.mark.django_db
+def test_package_list_shows_five_packages_per_category(client, settings, package_factory):
+    settings.USE_AWS = False
+    for index in range(7):
+        package_factory(package_code=f"LODGE-{index}", name=f"Lodge {index}")
+
+    response = client.get(reverse("experiences:package_list"))
+
+    assert response.status_code == 200
+    lodging = next(s for s in response.context["sections"] if s["key"] == "lodging")
+    assert [card["package"]["package_code"] for card in lodging["packages"]] == [
+        f"LODGE-{index}" for index in range(5)
+    ]
+
+
+@pytest.mark.django_db
+def test_package_list_emits_srcset_for_renditions(client):
+    package = {
+        "package_code": "TREK-001",
+        "name": "Ridge Trek",
+        "base_price_per_night": 100,
+        "image_url": "https://img.example/trek.jpg",
+        "image_srcset": {
+            "jpeg": "https://img.example/t-300w.jpg 300w, https://img.example/t-640w.jpg 640w",
+            "webp": "https://img.example/t-300w.webp 300w",
+        },
+    }
+    with mock.patch.object(packages_repository, "get_packages_by_category", return_value={"TREKKING": [package]}):
+        response = client.get(reverse("experiences:package_list"))
+
+    content = response.content.decode()
+    assert 'srcset="https://img.example/t-300w.jpg 300w, https://img.example/t-640w.jpg 640w"' in content
+    assert '<source type="image/webp" srcset="https://img.example/t-300w.webp 300w"' in content
+
+
+@pytest.mark.django_db
+def test_booking_success_page_rendered_once_per_status(client, package_factory):
+    booking = _create_booking(package_factory(), date(2025, 6, 1), date(2025, 6, 3), 2)
+    booking.itinerary = "Two nights at Forest Lodge"
+    booking.save(update_fields=["itinerary"])
+    url = reverse("experiences:booking_success", args=[booking.pk])
+
+    first = client.get(url)
+    with mock.patch("experiences.views.render") as render:
+        again = client.get(url)
+    render.assert_not_called()
+    assert again.content == first.content
+    assert b"Two nights at Forest Lodge" in first.content
+
+    booking.status = AdventureBookingModel.CANCELLED
+    booking.save()
+    with mock.patch("experiences.views.render", wraps=views.render) as render:
+        client.get(url)
+    render.assert_called_once()
+    assert client.get(reverse("experiences:booking_success", args=[booking.pk + 1])).status_code == 404
+
+
+@pytest.mark.django_db
+def test_edited_booking_gets_a_fresh_itinerary_and_success_page(client, package_factory):
+    booking = _create_booking(package_factory(), date(2025, 6, 1), date(2025, 6, 3), 2)
+    booking.itinerary = views.build_itinerary_summary(views.to_domain_booking(booking))
+    booking.save(update_fields=["itinerary"])
+    url = reverse("experiences:booking_success", args=[booking.pk])
+    assert b"2 nights for 2 guest(s)" in client.get(url).content
+
+    booking.end_date = date(2025, 6, 5)
+    booking.num_guests = 3
+    booking.save(update_fields=["end_date", "num_guests"])
+
+    booking.refresh_from_db()
+    assert "4 nights for 3 guest(s)" in booking.itinerary
+    assert b"4 nights for 3 guest(s)" in client.get(url).content
+
+
+@pytest.mark.django_db
+def test_package_list_page_is_cached_until_catalog_changes(client, settings, package_factory):
+    settings.USE_AWS = False
+    package = package_factory(package_code="LODGE-A", name="Lodge A")
+    url = reverse("experiences:package_list")
+
+    first = client.get(url)
+    etag = first["ETag"]
+    with mock.patch.object(packages_repository, "get_packages_by_category") as load:
+        assert client.get(url).content == first.content
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    load.assert_not_called()
+    # Presigned image URLs in the body expire while the catalog is unchanged,
+    # so a date alone must not revalidate the page.
+    assert not first.has_header("Last-Modified")
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT").status_code == 200
+
+    packages_repository.ensure_package_model(
+        {**packages_repository._model_to_dto(package), "name": "Lodge A Deluxe"}
+    )
+    refreshed = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert refreshed.status_code == 200
+    assert b"Lodge A Deluxe" in refreshed.content
+    assert refreshed["ETag"] != etag
+
+
+def test_uncacheable_page_is_rendered_once_and_not_cached(rf):
+    calls = []
+
+    @catalog_page("flaky")
+    def flaky(request):
+        calls.append(request)
+        return HttpResponse("try later", status=503)
+
+    for _ in range(2):
+        response = flaky(rf.get("/flaky/"))
+        assert response.status_code == 503 and not response.has_header("ETag")
+    assert len(calls) == 2
+    assert catalog_cache.lookup(page_key("flaky")) is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_booking_post_queues_side_effects_instead_of_calling_aws(client, monkeypatch, package_factory):
+    package = package_factory()
+    called = []
+    for path in [
+        "experiences.services.dynamodb_repository.save_booking_to_dynamodb",
+        "experiences.services.aws_sqs.send_booking_created_message",
+        "experiences.services.aws_sns.publish_booking_confirmation",
+    ]:
+        monkeypatch.setattr(path, lambda *args, path=path, **kwargs: called.append(path))
+
+    response = client.post(
+        reverse("experiences:booking_form", args=[package.package_code]),
+        {
+            "guest_name": "Outbox Guest",
+            "guest_email": "outbox@example.com",
+            "start_date": "2025-06-01",
+            "end_date": "2025-06-03",
+            "num_guests": 2,
+        },
+    )
+
+    assert response.status_code == 302
+    assert called == []
+    booking = AdventureBookingModel.objects.get()
+    assert sorted(booking.outbox_events.values_list("kind", flat=True)) == ["DYNAMODB", "SNS", "SQS"]
+
+    call_command("dispatch_booking_outbox", "--once", stdout=StringIO())
+
+    assert len(called) == 3
+    assert set(booking.outbox_events.values_list("status", flat=True)) == {BookingOutboxEvent.DELIVERED}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_outbox_retries_with_backoff_then_dead_letters(monkeypatch, package_factory):
+    package = package_factory()
+    booking = _create_booking(package, date(2025, 6, 1), date(2025, 6, 3), 1)
+    event = BookingOutboxEvent.objects.create(booking=booking, kind=BookingOutboxEvent.SQS)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("queue unavailable")
+
+    monkeypatch.setattr("experiences.services.aws_sqs.send_booking_created_message", fail)
+
+    assert booking_outbox.dispatch_due_events(max_attempts=2) == {"delivered": 0, "failed": 1}
+    event.refresh_from_db()
+    assert event.status == BookingOutboxEvent.PENDING
+    assert event.next_attempt_at > timezone.now()
+    assert booking_outbox.dispatch_due_events(max_attempts=2) == {"delivered": 0, "failed": 0}
+
+    BookingOutboxEvent.objects.filter(pk=event.pk).update(next_attempt_at=timezone.now())
+    booking_outbox.dispatch_due_events(max_attempts=2)
+    event.refresh_from_db()
+    assert event.status == BookingOutboxEvent.DEAD
+    assert event.attempts == 2
+    assert "queue unavailable" in event.last_error
@@ -0,0 +1,364 @@
+import os
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from experiences.models import AdventurePackageModel
+from django.core.management import call_command
+from django.db.models import QuerySet
+
+from experiences.models import CatalogVersion
+from experiences.services import catalog_cache, catalog_snapshot, catalog_version, packages_repository
+
+
+@mock.patch("experiences.services.packages_repository._should_use_dynamodb", return_value=True)
+@mock.patch("experiences.services.packages_repository.dynamodb_repository.list_packages_from_dynamodb")
+def test_get_all_packages_served_from_cache(mock_list, mock_flag):
+    mock_list.return_value = [{"package_code": "DYN-1"}]
+
+    first = packages_repository.get_all_packages()
+    second = packages_repository.get_all_packages()
+
+    assert first == second == [{"package_code": "DYN-1"}]
+    mock_list.assert_called_once()
+
+
+@mock.patch("experiences.services.packages_repository._should_use_dynamodb", return_value=True)
+@mock.patch("experiences.services.packages_repository.dynamodb_repository.list_packages_from_dynamodb")
+def test_shared_tier_refills_local_tier(mock_list, mock_flag):
+    mock_list.return_value = [{"package_code": "DYN-1"}]
+    packages_repository.get_all_packages()
+
+    catalog_cache.caches[catalog_cache.LOCAL_ALIAS].clear()
+
+    assert packages_repository.get_all_packages() == [{"package_code": "DYN-1"}]
+    mock_list.assert_called_once()
+    assert catalog_cache.caches[catalog_cache.LOCAL_ALIAS].get(catalog_cache.ALL_PACKAGES_KEY)
+
+
+@pytest.mark.django_db
+@mock.patch("experiences.services.packages_repository._should_use_dynamodb", return_value=True)
+@mock.patch("experiences.services.packages_repository.dynamodb_repository.get_package_from_dynamodb")
+def test_unknown_package_code_is_cached_negatively(mock_get, mock_flag):
+    mock_get.return_value = None
+
+    assert packages_repository.get_package_by_code("NOPE") is None
+    assert packages_repository.get_package_by_code("NOPE") is None
+    mock_get.assert_called_once_with("NOPE")
+
+
+@mock.patch("experiences.services.packages_repository._should_use_dynamodb", return_value=True)
+@mock.patch("experiences.services.packages_repository.dynamodb_repository._package_table")
+@mock.patch("experiences.services.packages_repository.dynamodb_repository.get_package_from_dynamodb")
+def test_update_package_image_url_invalidates_cache(mock_get, mock_table, mock_flag):
+    mock_get.side_effect = [{"package_code": "DYN-2", "image_url": "old"}, {"package_code": "DYN-2", "image_url": "new"}]
+
+    assert packages_repository.get_package_by_code("DYN-2")["image_url"] == "old"
+    packages_repository.update_package_image_url("DYN-2", "new")
+
+    assert packages_repository.get_package_by_code("DYN-2")["image_url"] == "new"
+    mock_table.return_value.update_item.assert_any_call(
+        Key={"package_id": "DYN-2"},
+        UpdateExpression="SET image_url = :url",
+        ExpressionAttributeValues={":url": "new"},
+    )
+
+
+@pytest.mark.django_db
+def test_ensure_package_model_invalidates_only_on_change(settings):
+    settings.USE_AWS = False
+    dto = {
+        "package_code": "LOCAL-2",
+        "category": AdventurePackageModel.LODGING,
+        "name": "Lake Hut",
+        "location": "Nainital",
+        "base_price_per_night": 80.0,
+        "max_guests": 3,
+        "min_nights": 1,
+        "max_nights": 4,
+        "image_url": "",
+    }
+    packages_repository.ensure_package_model(dto)
+    assert packages_repository.get_package_by_code("LOCAL-2")["name"] == "Lake Hut"
+
+    with mock.patch.object(catalog_cache, "invalidate_package") as mock_invalidate:
+        packages_repository.ensure_package_model(dto)
+    mock_invalidate.assert_not_called()
+
+    packages_repository.ensure_package_model({**dto, "name": "Lake Hut Deluxe"})
+    assert packages_repository.get_package_by_code("LOCAL-2")["name"] == "Lake Hut Deluxe"
+
+
+@pytest.mark.django_db
+@mock.patch("experiences.services.packages_repository._should_use_dynamodb", return_value=True)
+def test_mirroring_dynamodb_changes_does_not_bump_catalog_version(mock_flag):
+    dto = {"package_code": "DYN-9", "category": AdventurePackageModel.TREKKING, "name": "Ridge Walk"}
+
+    with mock.patch.object(catalog_version, "bump") as mock_bump:
+        packages_repository.ensure_package_model(dto)
+        packages_repository.ensure_package_model({**dto, "name": "Ridge Walk II"})
+
+    # The row only mirrors DynamoDB; other nodes never cached it.
+    mock_bump.assert_not_called()
+    assert AdventurePackageModel.objects.get(package_code="DYN-9").name == "Ridge Walk II"
+
+
+@pytest.mark.django_db
+def test_batched_bumps_collapse_to_one(settings):
+    settings.USE_AWS = False
+    before = catalog_version.current()
+
+    with mock.patch.object(catalog_version, "_bump_local", wraps=catalog_version._bump_local) as write:
+        with catalog_version.batched():
+            for code in ("A-1", "A-2", "A-3"):
+                catalog_cache.invalidate_package(code)
+            with catalog_version.batched():
+                catalog_cache.invalidate_package("A-4")
+        assert write.call_count == 1
+        with catalog_version.batched():
+            pass
+        assert write.call_count == 1
+
+    assert catalog_version.current() != before
+
+
+def test_shared_tier_lives_under_the_test_cache_dir(settings):
+    catalog_cache.store("probe", [1])
+
+    assert catalog_cache.caches[catalog_cache.SHARED_ALIAS]._dir == settings.CATALOG_CACHE_DIR
+    assert os.listdir(settings.CATALOG_CACHE_DIR)
+
+
+@pytest.mark.django_db
+def test_orm_package_edits_and_deletes_invalidate_the_cache(settings):
+    settings.USE_AWS = False
+    package = AdventurePackageModel.objects.create(
+        package_code="ADMIN-1", category=AdventurePackageModel.LODGING, name="Old Name", location="Coorg",
+        base_price_per_night=50, max_guests=2, min_nights=1, max_nights=3,
+    )
+    assert packages_repository.get_package_by_code("ADMIN-1")["name"] == "Old Name"
+
+    package.name = "New Name"
+    package.save()
+    assert packages_repository.get_package_by_code("ADMIN-1")["name"] == "New Name"
+
+    package.delete()
+    assert packages_repository.get_package_by_code("ADMIN-1") is None
+
+
+def _expire(key):
+    entry = catalog_cache.lookup(key)
+    expired = catalog_cache.CacheEntry(value=entry.value, fresh_until=0)
+    catalog_cache.caches[catalog_cache.LOCAL_ALIAS].set(key, expired)
+    catalog_cache.caches[catalog_cache.SHARED_ALIAS].set(key, expired)
+
+
+def test_concurrent_misses_load_once():
+    calls = []
+    release = threading.Event()
+
+    def slow_loader():
+        calls.append(1)
+        release.wait(5)
+        return [{"package_code": "DYN-1"}]
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(catalog_cache.get_or_load("stampede", slow_loader)))
+        for _ in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [[{"package_code": "DYN-1"}]] * 20
+
+
+def test_stale_entry_served_while_refreshing_in_background(settings):
+    settings.CATALOG_CACHE_STALE_WHILE_REVALIDATE = True
+    catalog_cache.store("swr", ["old"])
+    _expire("swr")
+    loader = mock.Mock(return_value=["new"])
+
+    assert catalog_cache.get_or_load("swr", loader) == ["old"]
+
+    deadline = time.time() + 5
+    while catalog_cache.lookup("swr").value != ["new"] and time.time() < deadline:
+        time.sleep(0.01)
+    assert catalog_cache.get_or_load("swr", loader) == ["new"]
+    loader.assert_called_once()
+
+
+def test_stale_entry_refreshed_inline_without_swr(settings):
+    settings.CATALOG_CACHE_STALE_WHILE_REVALIDATE = False
+    catalog_cache.store("inline", ["old"])
+    _expire("inline")
+
+    assert catalog_cache.get_or_load("inline", lambda: ["new"]) == ["new"]
+
+
+@pytest.mark.django_db
+def test_ensure_package_model_skips_writes_when_hash_matches(settings, django_assert_num_queries):
+    settings.USE_AWS = False
+    dto = {"package_code": "LOCAL-3", "category": AdventurePackageModel.LODGING, "name": "Pine", "max_guests": 2}
+    packages_repository.ensure_package_model(dto)
+
+    with django_assert_num_queries(1):
+        package = packages_repository.ensure_package_model(dto)
+    assert package.name == "Pine"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_ensure_package_model_tolerates_a_concurrent_first_create(settings):
+    settings.USE_AWS = False
+    dto = {"package_code": "RACE-1", "category": AdventurePackageModel.LODGING, "name": "Race", "max_guests": 2}
+    real_get = QuerySet.get
+    lookups = []
+
+    def get_after_other_request_created(queryset, *args, **kwargs):
+        if kwargs == {"package_code": "RACE-1"}:
+            lookups.append(kwargs)
+        if len(lookups) == 1 and not AdventurePackageModel.objects.filter(package_code="RACE-1").exists():
+            # The other request's insert lands after our lookup missed.
+            AdventurePackageModel.objects.create(package_code="RACE-1", name="Race", max_guests=2)
+            raise AdventurePackageModel.DoesNotExist
+        return real_get(queryset, *args, **kwargs)
+
+    with mock.patch.object(QuerySet, "get", get_after_other_request_created):
+        package = packages_repository.ensure_package_model(dto)
+
+    assert package.package_code == "RACE-1" and len(lookups) == 2
+    assert AdventurePackageModel.objects.filter(package_code="RACE-1").count() == 1
+
+
+@pytest.mark.django_db
+def test_rotating_presigned_image_url_does_not_change_source_hash(settings, django_assert_num_queries):
+    settings.USE_AWS = False
+    dto = {
+        "package_code": "S3-1",
+        "category": AdventurePackageModel.LODGING,
+        "name": "Signed",
+        "image_key": "packages/s3-1.jpg",
+        "image_url": "https://bucket.s3.amazonaws.com/packages/s3-1.jpg?X-Amz-Signature=aaa",
+    }
+    packages_repository.ensure_package_model(dto)
+
+    with django_assert_num_queries(1), mock.patch.object(catalog_cache, "invalidate_package") as invalidate:
+        package = packages_repository.ensure_package_model(
+            {**dto, "image_url": "https://bucket.s3.amazonaws.com/packages/s3-1.jpg?X-Amz-Signature=bbb"}
+        )
+    invalidate.assert_not_called()
+    assert package.image_url == "packages/s3-1.jpg"
+
+
+@pytest.mark.django_db
+def test_sync_package_models_bulk_writes_only_changes(settings):
+    settings.USE_AWS = False
+    dtos = [
+        {"package_code": f"BULK-{i}", "category": AdventurePackageModel.TREKKING, "name": f"Trail {i}", "max_guests": 6}
+        for i in range(5)
+    ]
+    assert packages_repository.sync_package_models(dtos) == {"created": 5, "updated": 0, "unchanged": 0}
+
+    dtos[2] = {**dtos[2], "name": "Trail Two"}
+    with mock.patch.object(AdventurePackageModel.objects, "bulk_update", wraps=AdventurePackageModel.objects.bulk_update) as update:
+        result = packages_repository.sync_package_models(dtos)
+
+    assert result == {"created": 0, "updated": 1, "unchanged": 4}
+    assert [package.package_code for package in update.call_args.args[0]] == ["BULK-2"]
+    assert AdventurePackageModel.objects.get(package_code="BULK-2").name == "Trail Two"
+
+
+def _snapshot_package(code, name, category=AdventurePackageModel.LODGING):
+    return {"package_code": code, "category": category, "name": name, "image_url": "https://img.example/x.jpg"}
+
+
+@pytest.fixture
+def snapshot_file(settings, tmp_path):
+    settings.CATALOG_SNAPSHOT_PATH = str(tmp_path / "catalog.json")
+    settings.CATALOG_SNAPSHOT_CHECK_INTERVAL = 0
+    return settings.CATALOG_SNAPSHOT_PATH
+
+
+@pytest.mark.django_db
+def test_catalog_served_from_snapshot_without_backend_reads(snapshot_file, settings, django_assert_num_queries):
+    settings.USE_AWS = False
+    AdventurePackageModel.objects.create(
+        package_code="SNAP-1",
+        category=AdventurePackageModel.LODGING,
+        name="Snapshot Lodge",
+        location="Coorg",
+        max_guests=4,
+    )
+    call_command("export_catalog_snapshot")
+
+    with django_assert_num_queries(0), mock.patch.object(packages_repository, "_load_all_packages") as load:
+        packages = packages_repository.get_all_packages()
+        package = packages_repository.get_package_by_code("SNAP-1")
+        grouped = packages_repository.get_packages_by_category()
+
+    load.assert_not_called()
+    assert [p["package_code"] for p in packages] == ["SNAP-1"]
+    assert package["name"] == "Snapshot Lodge"
+    assert [p["package_code"] for p in grouped[AdventurePackageModel.LODGING]] == ["SNAP-1"]
+
+
+def test_snapshot_hot_reloads_after_atomic_swap(snapshot_file):
+    first = catalog_snapshot.export([_snapshot_package("A", "Alpha")])
+    assert catalog_snapshot.current().version == first.version
+
+    second = catalog_snapshot.export([_snapshot_package("A", "Alpha"), _snapshot_package("B", "Beta")])
+
+    assert second.version != first.version
+    assert catalog_snapshot.current().version == second.version
+    assert packages_repository.get_package_by_code("B")["name"] == "Beta"
+    assert os.listdir(os.path.dirname(snapshot_file)) == ["catalog.json"]
+
+
+def test_unreadable_snapshot_keeps_previous_one(snapshot_file):
+    good = catalog_snapshot.export([_snapshot_package("A", "Alpha")])
+    catalog_snapshot.current()
+
+    with open(snapshot_file, "w") as handle:
+        handle.write("{not json")
+
+    assert catalog_snapshot.current().version == good.version
+
+
+@pytest.mark.django_db
+def test_catalog_version_bump_from_another_node_invalidates_cached_entries(settings):
+    settings.USE_AWS = False
+    settings.CATALOG_VERSION_CHECK_INTERVAL = 60
+    catalog_version.bump()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return [{"package_code": f"V-{len(loads)}"}]
+
+    assert catalog_cache.get_or_load("versioned", loader) == [{"package_code": "V-1"}]
+    CatalogVersion.objects.update(version=CatalogVersion.objects.get().version + 1)
+
+    # Within the check interval this node keeps trusting its stamp.
+    assert catalog_cache.get_or_load("versioned", loader) == [{"package_code": "V-1"}]
+
+    settings.CATALOG_VERSION_CHECK_INTERVAL = 0
+    assert catalog_cache.get_or_load("versioned", loader) == [{"package_code": "V-2"}]
+    assert len(loads) == 2
+
+
+@pytest.mark.django_db
+def test_catalog_version_read_is_throttled(settings, django_assert_num_queries):
+    settings.USE_AWS = False
+    settings.CATALOG_VERSION_CHECK_INTERVAL = 60
+    stamp = catalog_version.bump()
+
+    with django_assert_num_queries(0):
+        for _ in range(5):
+            assert catalog_version.current() == stamp
@@ -0,0 +1,270 @@
+import io
+import json
+import os
+import tracemalloc
+
+import pytest
+from PIL import Image
+from PIL.JpegImagePlugin import JpegImageFile
+
+from lambda_functions import local_harness
+from lambda_functions.local_harness import DirectoryS3, MemoryDynamoDB, image_processor
+
+BUCKET = "adventurestay-local"
+
+
+@pytest.fixture
+def bucket_dir(tmp_path, monkeypatch):
+    # local_harness.run swaps the module clients; put the originals back afterwards.
+    for name in ("s3", "dynamodb", "MAX_WORKERS"):
+        monkeypatch.setattr(image_processor, name, getattr(image_processor, name))
+    (tmp_path / BUCKET / "packages").mkdir(parents=True)
+    return tmp_path
+
+
+def _write_jpeg(root, key, size=(800, 600)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (40, 120, 200)).save(buffer, format="JPEG")
+    (root / BUCKET / key).write_bytes(buffer.getvalue())
+
+
+def test_handler_reports_only_failed_records(bucket_dir):
+    _write_jpeg(bucket_dir, "packages/trek-001-abc.jpg")
+    _write_jpeg(bucket_dir, "packages/lodge-002-def.jpg")
+    (bucket_dir / BUCKET / "packages" / "trek-003-bad.jpg").write_bytes(b"not an image")
+    image_processor.s3 = DirectoryS3(str(bucket_dir))
+    image_processor.dynamodb = MemoryDynamoDB()
+
+    event = local_harness.sqs_event(
+        BUCKET,
+        ["packages/trek-001-abc.jpg", "packages/trek-003-bad.jpg", "packages/lodge-002-def.jpg", "misc/readme.txt"],
+    )
+    response = image_processor.handler(event, None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "msg-1"}]}
+    with Image.open(bucket_dir / BUCKET / "thumbnails" / "trek-001-abc-300w.jpg") as thumb:
+        assert thumb.width == image_processor.THUMB_WIDTH
+    updated = sorted(update["Key"]["package_id"]["S"] for update in image_processor.dynamodb.updates)
+    assert updated == ["LODGE-002", "TREK-001"]
+
+
+def test_handler_accepts_direct_s3_events(bucket_dir):
+    image_processor.s3 = DirectoryS3(str(bucket_dir))
+    image_processor.dynamodb = MemoryDynamoDB()
+    _write_jpeg(bucket_dir, "packages/trek 001.jpg")
+
+    event = {"Records": [local_harness.s3_record(BUCKET, "packages/trek+001.jpg"),
+                         local_harness.s3_record(BUCKET, "packages/missing-001.jpg")]}
+    response = image_processor.handler(event, None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "packages/missing-001.jpg"}]}
+    assert (bucket_dir / BUCKET / "thumbnails" / "trek 001-300w.webp").exists()
+
+
+def test_records_are_processed_concurrently(bucket_dir):
+    for index in range(8):
+        _write_jpeg(bucket_dir, f"packages/trek-{index:03d}-x.jpg", size=(400, 300))
+
+    # Seven 0.1s round trips per record (two heads, get, three puts,
+    # update): ~5.6s serially, ~0.7s on eight workers.
+    stats = local_harness.run(str(bucket_dir), BUCKET, workers=8, latency=0.1)
+
+    assert stats["records"] == 8
+    assert stats["failed"] == 0
+    assert stats["seconds"] < 2.0
+    assert len(image_processor.dynamodb.updates) == 8
+
+
+def test_renditions_decode_once_at_draft_scale(bucket_dir, monkeypatch):
+    monkeypatch.setattr(image_processor, "RENDITION_WIDTHS", [300, 640, 2400])
+    image_processor.s3 = DirectoryS3(str(bucket_dir))
+    image_processor.dynamodb = MemoryDynamoDB()
+    _write_jpeg(bucket_dir, "packages/trek-001-abc.jpg", size=(1600, 1200))
+    decoded_sizes = []
+    original_draft = JpegImageFile.draft
+
+    def draft(img, mode, size):
+        result = original_draft(img, mode, size)
+        decoded_sizes.append(img.size)
+        return result
+
+    monkeypatch.setattr(JpegImageFile, "draft", draft)
+
+    image_processor._process_image(BUCKET, "packages/trek-001-abc.jpg")
+
+    # 2400 is wider than the source, so 640px is the largest rendition and
+    # libjpeg decodes at half scale instead of the full 1600px.
+    assert decoded_sizes == [(800, 600)]
+    thumbs = bucket_dir / BUCKET / "thumbnails"
+    assert sorted(path.name for path in thumbs.iterdir()) == [
+        "trek-001-abc-300w.jpg", "trek-001-abc-300w.webp", "trek-001-abc-640w.jpg", "trek-001-abc-640w.webp",
+        "trek-001-abc.processed",
+    ]
+    with Image.open(thumbs / "trek-001-abc-640w.webp") as webp:
+        assert (webp.format, webp.size) == ("WEBP", (640, 480))
+
+    (update,) = image_processor.dynamodb.updates
+    assert update["Key"] == {"package_id": {"S": "TREK-001"}}
+    values = update["ExpressionAttributeValues"]
+    assert values[":thumb"] == {"S": "thumbnails/trek-001-abc-300w.jpg"}
+    jpeg = values[":renditions"]["M"]["jpeg"]["L"]
+    assert [item["M"]["width"]["N"] for item in jpeg] == ["300", "640"]
+
+
+def test_unchanged_source_is_skipped_after_head(bucket_dir):
+    image_processor.s3 = s3 = DirectoryS3(str(bucket_dir))
+    image_processor.dynamodb = dynamodb = MemoryDynamoDB()
+    _write_jpeg(bucket_dir, "packages/trek-001-abc.jpg")
+    event = local_harness.sqs_event(BUCKET, ["packages/trek-001-abc.jpg"])
+
+    image_processor.handler(event, None)
+    source = s3.head_object(Bucket=BUCKET, Key="packages/trek-001-abc.jpg")
+    marker = s3.head_object(Bucket=BUCKET, Key="thumbnails/trek-001-abc.processed")
+    assert marker["Metadata"]["source-etag"] == source["ETag"].strip('"')
+    calls = dict(s3.calls)
+
+    assert image_processor.handler(event, None) == {"batchItemFailures": []}
+    assert s3.calls["head_object"] == calls["head_object"] + 2
+    assert (s3.calls["get_object"], s3.calls["put_object"]) == (calls["get_object"], calls["put_object"])
+    assert len(dynamodb.updates) == 1
+
+
+def test_source_narrower_than_every_width_is_skipped_when_redelivered(bucket_dir):
+    image_processor.s3 = s3 = DirectoryS3(str(bucket_dir))
+    image_processor.dynamodb = MemoryDynamoDB()
+    _write_jpeg(bucket_dir, "packages/trek-001-tiny.jpg", size=(200, 150))
+    event = local_harness.sqs_event(BUCKET, ["packages/trek-001-tiny.jpg"])
+
+    image_processor.handler(event, None)
+    assert (bucket_dir / BUCKET / "thumbnails" / "trek-001-tiny-200w.jpg").exists()
+    calls = dict(s3.calls)
+
+    image_processor.handler(event, None)
+    assert (s3.calls["get_object"], s3.calls["put_object"]) == (calls["get_object"], calls["put_object"])
+
+
+def test_marker_head_denied_without_list_bucket_still_processes(bucket_dir):
+    image_processor.s3 = DirectoryS3(str(bucket_dir), list_bucket=False)
+    image_processor.dynamodb = dynamodb = MemoryDynamoDB()
+    _write_jpeg(bucket_dir, "packages/trek-001-abc.jpg")
+    event = local_harness.sqs_event(BUCKET, ["packages/trek-001-abc.jpg"])
+
+    assert image_processor.handler(event, None) == {"batchItemFailures": []}
+    assert len(dynamodb.updates) == 1
+    assert (bucket_dir / BUCKET / "thumbnails" / "trek-001-abc.processed").exists()
+
+
+def test_reprocessing_skips_dynamodb_write_when_values_match(bucket_dir, monkeypatch):
+    image_processor.s3 = s3 = DirectoryS3(str(bucket_dir))
+    image_processor.dynamodb = dynamodb = MemoryDynamoDB()
+    _write_jpeg(bucket_dir, "packages/trek-001-abc.jpg")
+    image_processor._process_image(BUCKET, "packages/trek-001-abc.jpg")
+    puts = s3.calls["put_object"]
+
+    # New encoder settings change the signature, so the renditions are
+    # re-encoded, but the keys in DynamoDB are unchanged and not rewritten.
+    monkeypatch.setitem(image_processor.FORMATS["webp"], "options", {"quality": 60})
+    image_processor._process_image(BUCKET, "packages/trek-001-abc.jpg")
+
+    assert s3.calls["put_object"] == 2 * puts
+    assert len(dynamodb.updates) == 1
+
+    # A new upload under the same key changes the ETag and is written through.
+    _write_jpeg(bucket_dir, "packages/trek-001-abc.jpg", size=(900, 600))
+    image_processor._process_image(BUCKET, "packages/trek-001-abc.jpg")
+    assert len(dynamodb.updates) == 2
+
+
+def test_images_for_unknown_packages_do_not_create_items(bucket_dir, caplog):
+    image_processor.s3 = DirectoryS3(str(bucket_dir))
+    image_processor.dynamodb = dynamodb = MemoryDynamoDB(package_ids=["TREK-001"])
+    _write_jpeg(bucket_dir, "packages/trek-001-abc.jpg")
+    _write_jpeg(bucket_dir, "packages/ghost-404-abc.jpg")
+    event = local_harness.sqs_event(BUCKET, ["packages/trek-001-abc.jpg", "packages/ghost-404-abc.jpg"])
+
+    assert image_processor.handler(event, None) == {"batchItemFailures": []}
+    assert [update["Key"]["package_id"]["S"] for update in dynamodb.updates] == ["TREK-001"]
+    assert "attribute_exists(package_id)" in dynamodb.updates[0]["ConditionExpression"]
+    assert len(dynamodb.items) == 1
+    assert "no package GHOST-404" in caplog.text
+
+
+def test_oversized_and_bomb_sources_are_rejected_without_retry(bucket_dir, monkeypatch):
+    image_processor.s3 = s3 = DirectoryS3(str(bucket_dir))
+    image_processor.dynamodb = MemoryDynamoDB()
+    _write_jpeg(bucket_dir, "packages/trek-001-big.jpg", size=(1200, 900))
+    _write_jpeg(bucket_dir, "packages/trek-002-wide.jpg", size=(4000, 100))
+    size = os.path.getsize(bucket_dir / BUCKET / "packages" / "trek-001-big.jpg")
+    monkeypatch.setattr(image_processor, "MAX_SOURCE_BYTES", size - 1)
+    monkeypatch.setattr(image_processor, "MAX_SOURCE_PIXELS", 300_000)
+
+    event = local_harness.sqs_event(BUCKET, ["packages/trek-001-big.jpg", "packages/trek-002-wide.jpg"])
+    assert image_processor.handler(event, None) == {"batchItemFailures": []}
+
+    # The byte limit is enforced from the HEAD, the pixel limit from the header.
+    assert s3.calls["get_object"] == 1
+    assert "put_object" not in s3.calls
+    assert not image_processor.dynamodb.updates
+
+
+def test_spool_refuses_bodies_longer_than_announced(monkeypatch):
+    monkeypatch.setattr(image_processor, "MAX_SOURCE_BYTES", 1000)
+    with pytest.raises(image_processor.SourceRejected):
+        with image_processor._spool(io.BytesIO(b"x" * 1001)):
+            pass
+
+
+def test_peak_python_memory_stays_below_source_size(bucket_dir, monkeypatch):
+    monkeypatch.setattr(image_processor, "RENDITION_WIDTHS", [300, 640])
+    monkeypatch.setattr(image_processor, "SOURCE_SPOOL_BYTES", 256 * 1024)
+    image_processor.s3 = DirectoryS3(str(bucket_dir))
+    image_processor.dynamodb = MemoryDynamoDB()
+    # Noise barely compresses, giving a multi-megabyte JPEG.
+    noise = Image.frombytes("RGB", (2400, 1600), os.urandom(2400 * 1600 * 3))
+    noise.save(bucket_dir / BUCKET / "packages" / "trek-001-noise.jpg", quality=95)
+    del noise
+    source_size = os.path.getsize(bucket_dir / BUCKET / "packages" / "trek-001-noise.jpg")
+    # Warm up first so Pillow's lazily imported plugins are not counted.
+    _write_jpeg(bucket_dir, "packages/trek-002-warm.jpg")
+    image_processor._process_image(BUCKET, "packages/trek-002-warm.jpg")
+
+    tracemalloc.start()
+    try:
+        image_processor._process_image(BUCKET, "packages/trek-001-noise.jpg")
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # Pixel buffers are allocated by Pillow outside tracemalloc; this tracks
+    # the Python-side copies of the source and the encoded renditions.
+    assert len(image_processor.dynamodb.updates) == 2
+    assert source_size > 3 * 1024 * 1024
+    assert peak < source_size / 4, (peak, source_size)
+
+
+def test_shared_upload_updates_every_listed_package(bucket_dir):
+    image_processor.s3 = s3 = DirectoryS3(str(bucket_dir))
+    image_processor.dynamodb = dynamodb = MemoryDynamoDB()
+    _write_jpeg(bucket_dir, "packages/trek-001-abc.jpg")
+    s3.metadata[(BUCKET, "packages/trek-001-abc.jpg")] = {"package-codes": "TREK-001,TREK-004"}
+
+    image_processor._process_image(BUCKET, "packages/trek-001-abc.jpg")
+
+    assert sorted(update["Key"]["package_id"]["S"] for update in dynamodb.updates) == ["TREK-001", "TREK-004"]
+
+    # A re-upload listing another package is not skipped as unchanged.
+    s3.metadata[(BUCKET, "packages/trek-001-abc.jpg")] = {"package-codes": "TREK-001,TREK-004,TREK-007"}
+    image_processor._process_image(BUCKET, "packages/trek-001-abc.jpg")
+    assert dynamodb.updates[-1]["Key"] == {"package_id": {"S": "TREK-007"}}
+    assert len(dynamodb.updates) == 3
+
+
+def test_sqs_message_with_several_notifications_fails_as_a_unit(bucket_dir):
+    image_processor.s3 = DirectoryS3(str(bucket_dir))
+    image_processor.dynamodb = MemoryDynamoDB()
+    _write_jpeg(bucket_dir, "packages/trek-001-abc.jpg")
+    body = {"Records": [local_harness.s3_record(BUCKET, "packages/trek-001-abc.jpg"),
+                        local_harness.s3_record(BUCKET, "packages/gone-002.jpg")]}
+    event = {"Records": [{"messageId": "m1", "eventSource": "aws:sqs", "body": json.dumps(body)}]}
+
+    assert image_processor.handler(event, None) == {"batchItemFailures": [{"itemIdentifier": "m1"}]}
@@ -1,9 +1,12 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from unittest import mock
 
 import pytest
 
-from experiences.management.commands.refresh_package_images import Command
-from experiences.services import packages_repository
+from experiences.management.commands.refresh_package_images import Checkpoint, Command
+from experiences.services import catalog_version, image_fetcher
 from experiences.services.aws_s3 import resolve_image_url
 
 
@@ -31,3 +34,147 @@ def test_refresh_updates_missing_images(mock_enabled, mock_list, mock_update, mo
 def test_resolve_image_url_handles_https():
     url = "https://example.com/photo.jpg"
     assert resolve_image_url(url) == url
+
+
+def _refresh_patches():
+    base = "experiences.management.commands.refresh_package_images"
+    return (
+        mock.patch(f"{base}.aws_enabled", return_value=True),
+        mock.patch("experiences.services.dynamodb_repository.list_packages_from_dynamodb"),
+        mock.patch("experiences.services.packages_repository.update_package_image_url"),
+        mock.patch(f"{base}.upload_package_image"),
+        mock.patch(f"{base}.image_fetcher.fetch_image_for_category"),
+    )
+
+
+def test_refresh_uploads_each_distinct_image_once():
+    enabled, listing, update, upload, fetch = _refresh_patches()
+    with enabled, listing as mock_list, update as mock_update, upload as mock_upload, fetch as mock_fetch:
+        mock_list.return_value = [
+            {"package_code": "TREK-1", "category": "TREKKING", "image_url": ""},
+            {"package_code": "TREK-2", "category": "TREKKING", "image_url": ""},
+            {"package_code": "LODGE-1", "category": "LODGING", "image_url": ""},
+        ]
+        mock_fetch.side_effect = lambda category: f"{category}-bytes".encode()
+        mock_upload.side_effect = lambda image_bytes, filename, metadata: f"packages/{filename}"
+
+        Command().handle(fetch_workers=3, upload_workers=2)
+
+    assert mock_fetch.call_count == 3
+    assert mock_upload.call_count == 2
+    trek_upload = next(c for c in mock_upload.call_args_list if c.args[0] == b"TREKKING-bytes")
+    assert trek_upload.kwargs["metadata"] == {"package-codes": "TREK-1,TREK-2"}
+    assert trek_upload.args[1].startswith("trek-1-")
+    trek_key = f"packages/{trek_upload.args[1]}"
+    assert sorted(c.args for c in mock_update.call_args_list if c.args[1] == trek_key) == [
+        ("TREK-1", trek_key),
+        ("TREK-2", trek_key),
+    ]
+    assert mock_update.call_count == 3
+
+
+def test_refresh_bumps_catalog_version_once_per_run():
+    enabled, listing, _update, upload, fetch = _refresh_patches()
+    bump = mock.patch("experiences.services.catalog_version._bump_dynamodb")
+    use_dynamodb = mock.patch("experiences.services.catalog_version._use_dynamodb", return_value=True)
+    flag = mock.patch("experiences.services.packages_repository._should_use_dynamodb", return_value=True)
+    table = mock.patch("experiences.services.packages_repository.dynamodb_repository._package_table")
+    with flag, enabled, listing as mock_list, upload as mock_upload, fetch as mock_fetch, bump as mock_bump, use_dynamodb, table:
+        mock_list.return_value = [
+            {"package_code": f"TREK-{index}", "category": "TREKKING", "image_url": ""} for index in range(5)
+        ]
+        mock_fetch.side_effect = lambda category: f"{category}-bytes".encode()
+        mock_upload.side_effect = lambda image_bytes, filename, metadata: f"packages/{filename}"
+        mock_bump.return_value = catalog_version.current()
+
+        Command().handle()
+
+    mock_bump.assert_called_once()
+
+
+def test_refresh_uploads_while_fetches_are_still_running():
+    events = []
+    enabled, listing, _update, upload, fetch = _refresh_patches()
+    with enabled, listing as mock_list, _update, upload as mock_upload, fetch as mock_fetch:
+        mock_list.return_value = [
+            {"package_code": f"TREK-{index}", "category": f"CAT-{index}", "image_url": ""} for index in range(8)
+        ]
+
+        def fetch_image(category):
+            events.append(("fetch", category))
+            return f"{category}-bytes".encode()
+
+        def upload_image(image_bytes, filename, metadata):
+            events.append(("upload", filename))
+            return f"packages/{filename}"
+
+        mock_fetch.side_effect = fetch_image
+        mock_upload.side_effect = upload_image
+
+        Command().handle(fetch_workers=1, upload_workers=1)
+
+    # Eight distinct images, but at most two wait for upload at a time.
+    assert mock_upload.call_count == 8
+    kinds = [kind for kind, _name in events]
+    assert kinds.index("upload") < len(kinds) - 1 - kinds[::-1].index("fetch")
+
+
+def test_checkpoint_save_removes_temp_file_on_failure(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "refresh.json"))
+
+    with mock.patch("os.replace", side_effect=OSError("disk full")):
+        with pytest.raises(OSError):
+            checkpoint.record("TREK-1", "packages/trek-1.jpg")
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_refresh_resumes_from_checkpoint(tmp_path):
+    checkpoint = tmp_path / "refresh.json"
+    packages = [
+        {"package_code": "TREK-1", "category": "TREKKING", "image_url": ""},
+        {"package_code": "LODGE-1", "category": "LODGING", "image_url": ""},
+    ]
+
+    def flaky_upload(image_bytes, filename, metadata):
+        if image_bytes == b"LODGING-bytes":
+            raise RuntimeError("S3 unavailable")
+        return f"packages/{filename}"
+
+    enabled, listing, update, upload, fetch = _refresh_patches()
+    with enabled, listing as mock_list, update as mock_update, upload as mock_upload, fetch as mock_fetch:
+        mock_list.return_value = packages
+        mock_fetch.side_effect = lambda category: f"{category}-bytes".encode()
+        mock_upload.side_effect = flaky_upload
+
+        Command().handle(checkpoint=str(checkpoint))
+        assert json.loads(checkpoint.read_text())["done"].keys() == {"TREK-1"}
+
+        mock_fetch.reset_mock()
+        mock_update.reset_mock()
+        mock_upload.side_effect = lambda image_bytes, filename, metadata: f"packages/{filename}"
+        Command().handle(checkpoint=str(checkpoint))
+
+    mock_fetch.assert_called_once_with("LODGING")
+    mock_update.assert_called_once()
+    assert mock_update.call_args.args[0] == "LODGE-1"
+    assert not checkpoint.exists()
+
+
+def test_fetch_image_downloads_each_url_once_across_threads():
+    image_fetcher.reset()
+    release = threading.Event()
+
+    def slow_get(url, timeout):
+        release.wait(1)
+        return mock.Mock(content=b"jpeg", raise_for_status=mock.Mock())
+
+    with mock.patch.object(image_fetcher.get_session(), "get", side_effect=slow_get) as get:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = [executor.submit(image_fetcher.fetch_image, "https://img.example/a.jpg") for _ in range(4)]
+            release.set()
+            assert [future.result() for future in results] == [b"jpeg"] * 4
+        assert image_fetcher.fetch_image("https://img.example/a.jpg") == b"jpeg"
+
+    get.assert_called_once()
+    image_fetcher.reset()